@@ -4,41 +4,281 @@
 # =============================================================================
 # Este módulo contiene funciones para generar animaciones mejoradas del movimiento durante la colisión
 
+import base64
+import hashlib
+import json
 import numpy as np
-import matplotlib.pyplot as plt
+import matplotlib as mpl
 import matplotlib.animation as animation
+import multiprocessing
 import os
+import queue
+import re
+import shutil
+import subprocess
+import threading
+import time
 import uuid
 from matplotlib.patches import Ellipse, Rectangle
+from graficos import liberar_figura, nueva_figura
+from metricas import medir_etapa
 
-def generar_animacion(tiempo_detencion, aceleracion, velocidad_inicial, nombre_archivo, con_cinturon):
+# =============================================================================
+# CACHÉ DE ANIMACIONES EN DISCO
+# =============================================================================
+# Los MP4 se nombran con un hash de sus entradas y ajustes de render, así que
+# una animación ya generada se reutiliza. El directorio se mantiene dentro de
+# una cuota de bytes y un tiempo de vida, expulsando primero lo menos usado.
+
+DIRECTORIO_ANIMACIONES = "animations"
+# Streams HLS: un subdirectorio por animación con la lista y sus segmentos
+DIRECTORIO_STREAMS = os.path.join(DIRECTORIO_ANIMACIONES, "hls")
+NOMBRE_LISTA = "lista.m3u8"
+# Se crea al terminar el render: la lista con #EXT-X-ENDLIST no basta, porque
+# ffmpeg también la cierra si el proceso que le envía frames muere a medias
+MARCA_COMPLETO = ".completo"
+# Duración de cada segmento: la reproducción empieza en cuanto hay uno listo.
+# HLS declara la duración máxima en segundos enteros, así que al menos 1
+SEGUNDOS_SEGMENTO = max(1, int(os.environ.get("SEGUNDOS_SEGMENTO", 1)))
+PATRON_SEGMENTO = re.compile(r"^segmento_\d{3,}\.ts$")
+FORMATOS_ANIMACION = ('mp4', 'hls')
+CUOTA_ANIMACIONES_BYTES = int(os.environ.get("CUOTA_ANIMACIONES_MB", 500)) * 1024 * 1024
+TTL_ANIMACIONES = int(os.environ.get("TTL_ANIMACIONES_HORAS", 24 * 7)) * 3600  # segundos
+SUFIJO_TEMPORAL = ".tmp.mp4"
+
+# =============================================================================
+# NIVELES DE CALIDAD
+# =============================================================================
+# Cada nivel fija frames, fps, resolución (tamaño × DPI) y ajustes de x264.
+# Todos duran lo mismo (frames / fps ≈ 3,3 s): cambian la fluidez y la nitidez,
+# no el ritmo de la animación. Con el servidor cargado, las peticiones nuevas
+# bajan a vista previa en lugar de esperar a renders de calidad completa.
+
+NIVELES_CALIDAD = {
+    'vista_previa': {'frames': 50, 'fps': 15, 'figsize': (10, 4), 'dpi': 64, 'preset': 'veryfast', 'crf': 28},
+    'estandar': {'frames': 100, 'fps': 30, 'figsize': (10, 4), 'dpi': 100, 'preset': 'veryfast', 'crf': 23},
+    'alta': {'frames': 200, 'fps': 60, 'figsize': (10, 4), 'dpi': 150, 'preset': 'slow', 'crf': 18}
+}
+CALIDAD_POR_DEFECTO = 'estandar'
+CALIDAD_BAJO_CARGA = 'vista_previa'
+# Renders de animaciones en curso (cada petición lanza dos) a partir de los que
+# las peticiones nuevas se generan en CALIDAD_BAJO_CARGA
+MAX_RENDERS_CALIDAD_COMPLETA = int(os.environ.get("MAX_RENDERS_CALIDAD_COMPLETA", 4))
+
+def elegir_calidad(calidad=None, renders=None):
     """
-    Genera una animación mejorada del movimiento del cuerpo durante la colisión y la guarda como MP4.
+    Elige el nivel de calidad de una petición según la carga del servidor
     
     Args:
-        tiempo_detencion (float): Tiempo de detención en segundos
-        aceleracion (float): Aceleración (negativa) en m/s²
-        velocidad_inicial (float): Velocidad inicial en m/s
-        nombre_archivo (str): Nombre base del archivo MP4 de salida
+        calidad (str, optional): Nivel pedido (por defecto, CALIDAD_POR_DEFECTO)
+        renders (int, optional): Renders en curso (por defecto, renders_en_curso())
+    
+    Returns:
+        str: El nivel pedido, o CALIDAD_BAJO_CARGA si el servidor está cargado
+    """
+    calidad = calidad or CALIDAD_POR_DEFECTO
+    if calidad not in NIVELES_CALIDAD:
+        raise ValueError(f"Calidad de animación desconocida: {calidad}")
+    renders = renders_en_curso() if renders is None else renders
+    if renders >= MAX_RENDERS_CALIDAD_COMPLETA:
+        return CALIDAD_BAJO_CARGA
+    return calidad
+
+def _ajustes_render(codificador='matplotlib', preset=None, crf=None, hilos=None, num_frames=None,
+                    calidad=CALIDAD_POR_DEFECTO, formato='mp4'):
+    """
+    Resuelve los ajustes de render de una animación: los del nivel de calidad,
+    salvo los que se fijen explícitamente. Forman parte del nombre del archivo.
+    
+    Returns:
+        dict: codificador, preset, crf, hilos, frames, fps, figsize y dpi
+    """
+    if calidad not in NIVELES_CALIDAD:
+        raise ValueError(f"Calidad de animación desconocida: {calidad}")
+    nivel = NIVELES_CALIDAD[calidad]
+    ajustes_render = {
+        'codificador': codificador,
+        'preset': nivel['preset'] if preset is None else preset,
+        'crf': nivel['crf'] if crf is None else crf,
+        'hilos': hilos,
+        'frames': nivel['frames'] if num_frames is None else num_frames,
+        'fps': nivel['fps'],
+        'figsize': nivel['figsize'],
+        'dpi': nivel['dpi']
+    }
+    if formato == 'hls':
+        ajustes_render['segundos_segmento'] = SEGUNDOS_SEGMENTO
+    return ajustes_render
+
+def ruta_animacion(nombre_archivo, perfil, con_cinturon, ajustes_render, formato='mp4'):
+    """
+    Calcula la ruta de una animación a partir de un hash de su contenido
+    
+    Args:
+        nombre_archivo (str): Prefijo legible del archivo
+        perfil (PerfilPulso): Pulso de deceleración animado
         con_cinturon (bool): Indica si se usa cinturón de seguridad
+        ajustes_render (dict): Ajustes que cambian el vídeo resultante
+        formato (str): "mp4" (un archivo) o "hls" (lista de segmentos)
     
     Returns:
-        str: Ruta al archivo MP4 generado
+        str: Ruta del MP4 dentro de DIRECTORIO_ANIMACIONES, o de la lista HLS
+            dentro de su propio subdirectorio de DIRECTORIO_STREAMS
     """
-    # Generar puntos de tiempo
-    t = np.linspace(0, tiempo_detencion, 100)
-    # Calcular posiciones usando x(t) = v0*t + (1/2)*a*t^2
-    posicion = velocidad_inicial * t + 0.5 * aceleracion * t**2
-    # Asegurar que las posiciones no sean negativas
-    posicion = np.maximum(posicion, 0)
-    # Calcular velocidades instantáneas: v(t) = v0 + a*t
-    velocidades = velocidad_inicial + aceleracion * t
-    # Calcular fuerzas instantáneas: F = m*a (usamos masa=70 kg para visualización)
-    fuerzas = 70 * abs(aceleracion) * np.where(t <= tiempo_detencion, 1, 0)
-    fuerzas_g = fuerzas / (70 * 9.81)
+    contenido = json.dumps({
+        'tiempo_detencion': perfil.tiempo_detencion,
+        'velocidad_inicial': perfil.velocidad_inicial,
+        'masa_cuerpo': perfil.masa_cuerpo,
+        'con_cinturon': bool(con_cinturon),
+        'ajustes_render': ajustes_render
+    }, sort_keys=True)
+    huella = hashlib.sha256(contenido.encode('utf-8')).hexdigest()[:20]
+    if formato == 'hls':
+        return os.path.join(DIRECTORIO_STREAMS, f"{nombre_archivo}_{huella}", NOMBRE_LISTA)
+    return os.path.join(DIRECTORIO_ANIMACIONES, f"{nombre_archivo}_{huella}.mp4")
 
-    # Crear figura y eje
-    fig, ax = plt.subplots(figsize=(10, 4))
+def limpiar_animaciones(directorio=None, cuota_bytes=None, ttl_segundos=None, conservar=None):
+    """
+    Expulsa animaciones del directorio por antigüedad y por cuota de disco.
+    
+    Primero se borran los archivos sin uso durante más de ttl_segundos; después,
+    si el total sigue superando la cuota, los usados hace más tiempo (LRU según
+    la fecha de modificación, que se actualiza en cada reutilización). Cada
+    stream HLS cuenta como una entrada con el tamaño de todos sus segmentos.
+    
+    Args:
+        directorio (str, optional): Directorio de animaciones
+        cuota_bytes (int, optional): Tamaño máximo del directorio en bytes
+        ttl_segundos (float, optional): Tiempo máximo sin uso de cada archivo
+        conservar (str, optional): Ruta que no debe borrarse (la recién generada)
+    
+    Returns:
+        int: Número de archivos borrados
+    """
+    directorio = directorio or DIRECTORIO_ANIMACIONES
+    cuota_bytes = CUOTA_ANIMACIONES_BYTES if cuota_bytes is None else cuota_bytes
+    ttl_segundos = TTL_ANIMACIONES if ttl_segundos is None else ttl_segundos
+    ahora = time.time()
+
+    archivos = []
+    try:
+        entradas = list(os.scandir(directorio))
+    except FileNotFoundError:
+        return 0
+    for entrada in entradas:
+        if not entrada.is_file() or not entrada.name.endswith('.mp4'):
+            continue
+        try:
+            info = entrada.stat()
+        except FileNotFoundError:
+            continue
+        if entrada.name.endswith(SUFIJO_TEMPORAL):
+            # Temporales huérfanos de renders interrumpidos
+            if ahora - info.st_mtime > TIEMPO_LIMITE_ANIMACION * 2:
+                archivos.append((0.0, info.st_size, entrada.path))
+            continue
+        archivos.append((info.st_mtime, info.st_size, entrada.path))
+    archivos += _entradas_streams(os.path.join(directorio, os.path.basename(DIRECTORIO_STREAMS)), ahora)
+
+    archivos.sort()
+    total = sum(tamano for _, tamano, _ in archivos)
+    borrados = 0
+    for fecha, tamano, ruta in archivos:
+        expirado = ahora - fecha > ttl_segundos
+        if not expirado and total <= cuota_bytes:
+            break
+        if conservar is not None and os.path.abspath(ruta) in (os.path.abspath(conservar),
+                                                                os.path.dirname(os.path.abspath(conservar))):
+            continue
+        try:
+            if os.path.isdir(ruta):
+                shutil.rmtree(ruta)
+            else:
+                os.remove(ruta)
+        except FileNotFoundError:
+            pass
+        total -= tamano
+        borrados += 1
+    return borrados
+
+def _entradas_streams(directorio_streams, ahora):
+    """
+    Lista los streams HLS terminados como entradas (fecha, tamaño, directorio) de
+    limpiar_animaciones; los que se están generando no se tocan, y los
+    incompletos abandonados se marcan para borrarlos primero
+    """
+    entradas = []
+    try:
+        subdirectorios = list(os.scandir(directorio_streams))
+    except FileNotFoundError:
+        return entradas
+    for subdirectorio in subdirectorios:
+        if not subdirectorio.is_dir() or os.path.join(subdirectorio.path, NOMBRE_LISTA) in _streams_en_curso:
+            continue
+        try:
+            archivos = [entrada.stat() for entrada in os.scandir(subdirectorio.path) if entrada.is_file()]
+            fecha = subdirectorio.stat().st_mtime
+            completo = os.path.exists(os.path.join(subdirectorio.path, MARCA_COMPLETO))
+        except FileNotFoundError:
+            continue
+        tamano = sum(info.st_size for info in archivos)
+        if completo:
+            entradas.append((fecha, tamano, subdirectorio.path))
+        elif ahora - max([fecha] + [info.st_mtime for info in archivos]) > TIEMPO_LIMITE_ANIMACION * 2:
+            entradas.append((0.0, tamano, subdirectorio.path))
+    return entradas
+
+def generar_trayectoria(perfil, con_cinturon, num_frames=100, fps=30):
+    """
+    Genera la trayectoria muestreada de la animación como carga compacta para
+    dibujarla en el navegador, sin renderizar ni codificar vídeo.
+    
+    Los cuatro campos se guardan como un único bloque float32 little-endian
+    (un campo tras otro) codificado en base64, que el navegador lee con un
+    Float32Array.
+    
+    Args:
+        perfil (PerfilPulso): Pulso de deceleración animado
+        con_cinturon (bool): Indica si se usa cinturón de seguridad
+        num_frames (int): Número de frames
+        fps (int): Frames por segundo de reproducción
+    
+    Returns:
+        dict: Carga serializable a JSON con la trayectoria y los datos de la escena
+    """
+    cinematica = perfil.muestrear(num_frames)
+    posicion = cinematica['posicion']
+    campos = ['posicion', 'velocidad', 'fuerza', 'fuerza_g']
+    series = [posicion, cinematica['velocidades'], cinematica['fuerzas'], cinematica['fuerzas_g']]
+    datos = np.concatenate(series).astype('<f4').tobytes()
+    
+    return {
+        'con_cinturon': bool(con_cinturon),
+        'frames': int(num_frames),
+        'fps': int(fps),
+        'xlim': [-0.5, float(max(posicion) * 1.5) if max(posicion) > 0 else 1.5],
+        'obstaculo_x': float(max(posicion) * 1.2) if max(posicion) > 0 else 1.0,
+        'campos': campos,
+        'datos': base64.b64encode(datos).decode('ascii')
+    }
+
+def construir_escena(ax, cinematica, con_cinturon):
+    """
+    Dibuja la escena estática (vehículo, obstáculo, figura humana) sobre un eje
+    
+    Args:
+        ax: Eje de matplotlib
+        cinematica (dict): Muestras de PerfilPulso.muestrear, una por frame
+        con_cinturon (bool): Indica si se usa cinturón de seguridad
+    
+    Returns:
+        tuple: (init, animate) funciones de inicialización y de actualización por frame
+    """
+    posicion = cinematica['posicion']
+    velocidades = cinematica['velocidades']
+    fuerzas = cinematica['fuerzas']
+    fuerzas_g = cinematica['fuerzas_g']
+    
     ax.set_xlim(-0.5, max(posicion) * 1.5 if max(posicion) > 0 else 1.5)
     ax.set_ylim(-1, 1)
     ax.set_xlabel('Distancia (m)', fontsize=12)
@@ -98,51 +338,583 @@ def generar_animacion(tiempo_detencion, aceleracion, velocidad_inicial, nombre_a
         )
         
         return [cabeza, cuerpo, texto_info] + ([cinturon] if con_cinturon else [])
+    
+    return init, animate
 
-    # Crear animación
-    ani = animation.FuncAnimation(fig, animate, frames=len(t), init_func=init, blit=True, interval=20)
+def argumentos_codificador(preset=None, crf=None, hilos=None):
+    """
+    Construye los argumentos de salida de ffmpeg para H.264
+    
+    Args:
+        preset (str, optional): Preset de x264 (ultrafast ... veryslow)
+        crf (int, optional): Factor de calidad constante (0-51, menor = mejor calidad)
+        hilos (int, optional): Hilos de codificación (0 = automático)
+    
+    Returns:
+        list: Argumentos de línea de comandos (vacía si no se fija ninguno)
+    """
+    argumentos = []
+    if preset is not None:
+        argumentos += ['-preset', str(preset)]
+    if crf is not None:
+        argumentos += ['-crf', str(crf)]
+    if hilos is not None:
+        argumentos += ['-threads', str(hilos)]
+    return argumentos
 
-    # Generar nombre de archivo único
-    unique_filename = f"{nombre_archivo}_{uuid.uuid4().hex[:8]}.mp4"
-    output_path = os.path.join("animations", unique_filename)
+def argumentos_hls(directorio, segundos_segmento=SEGUNDOS_SEGMENTO):
+    """
+    Construye los argumentos de salida de ffmpeg para escribir un stream HLS
+    
+    ffmpeg publica cada segmento MPEG-TS en la lista en cuanto lo termina, así
+    que la lista se puede servir mientras el vídeo todavía se está codificando.
+    Se fuerza un fotograma clave al inicio de cada segmento para que todos
+    duren lo mismo y se puedan reproducir por separado, y x264 codifica sin
+    retener frames para que cada segmento salga en cuanto se dibuja su último frame.
+    
+    Args:
+        directorio (str): Directorio de la lista y los segmentos
+        segundos_segmento (int): Duración de cada segmento en segundos
+    
+    Returns:
+        list: Argumentos de línea de comandos (la salida es la ruta de la lista)
+    """
+    return [
+        # Sin cola de anticipación ni fotogramas B: x264 entrega cada frame al recibirlo
+        '-tune', 'zerolatency',
+        '-force_key_frames', f'expr:gte(t,n_forced*{segundos_segmento})',
+        '-f', 'hls', '-hls_time', str(segundos_segmento), '-hls_list_size', '0',
+        '-hls_playlist_type', 'event', '-hls_flags', 'independent_segments+temp_file',
+        '-hls_segment_filename', os.path.join(directorio, 'segmento_%03d.ts')
+    ]
 
-    # Crear directorio si no existe
-    os.makedirs("animations", exist_ok=True)
+def codificar_por_tuberia(escenas, num_frames, output_path, fps=30, preset='veryfast', crf=23, hilos=0, cola_frames=2,
+                          argumentos_salida=None):
+    """
+    Dibuja los frames en lienzos Agg y los envía crudos (RGBA) a un proceso
+    ffmpeg por su entrada estándar.
+    
+    La escritura a ffmpeg se hace en un hilo aparte, de modo que dibujar el
+    frame N+1 se solapa con codificar el frame N. Para no copiar los píxeles,
+    cada frame se dibuja en una de varias figuras idénticas (anillo de
+    escenas) y una figura solo se reutiliza cuando ffmpeg ya consumió su buffer.
+    
+    Args:
+        escenas (list): Tuplas (figura, animate) idénticas, una por buffer en vuelo
+        num_frames (int): Número de frames a codificar
+        output_path (str): Ruta del archivo MP4 (o de la lista HLS) de salida
+        fps (int): Frames por segundo del vídeo
+        preset (str): Preset de x264
+        crf (int): Factor de calidad constante de x264
+        hilos (int): Hilos de codificación de ffmpeg (0 = automático)
+        cola_frames (int): Frames dibujados que pueden esperar a ffmpeg
+        argumentos_salida (list, optional): Argumentos extra de la salida (por ejemplo, argumentos_hls)
+    """
+    ancho, alto = escenas[0][0].canvas.get_width_height()
+    comando = [
+        mpl.rcParams['animation.ffmpeg_path'], '-y', '-loglevel', 'error',
+        '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{ancho}x{alto}', '-r', str(fps), '-i', '-',
+        # x264 con yuv420p necesita dimensiones pares
+        '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+        '-c:v', 'libx264', '-pix_fmt', 'yuv420p',
+        *argumentos_codificador(preset, crf, hilos),
+        *(argumentos_salida or []),
+        output_path
+    ]
+    proceso = subprocess.Popen(comando, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+    
+    escenas_libres = queue.Queue()
+    for escena in escenas:
+        escenas_libres.put(escena)
+    frames_pendientes = queue.Queue(maxsize=cola_frames)
+    errores = []
+    
+    def escribir_frames():
+        while True:
+            elemento = frames_pendientes.get()
+            if elemento is None:
+                break
+            escena, buffer = elemento
+            if not errores:
+                try:
+                    proceso.stdin.write(buffer)
+                except (BrokenPipeError, OSError) as e:
+                    errores.append(e)
+            # Liberar la escena aunque haya error, para no bloquear al hilo que dibuja
+            escenas_libres.put(escena)
+    
+    escritor = threading.Thread(target=escribir_frames, name='codificador-ffmpeg', daemon=True)
+    escritor.start()
+    try:
+        for i in range(num_frames):
+            escena = escenas_libres.get()
+            if errores:
+                break
+            fig, animate = escena
+            animate(i)
+            fig.canvas.draw()
+            frames_pendientes.put((escena, fig.canvas.buffer_rgba()))
+    finally:
+        frames_pendientes.put(None)
+        escritor.join()
+        try:
+            proceso.stdin.close()
+        except OSError:
+            pass
+        salida_error = proceso.stderr.read()
+        proceso.wait()
+    
+    if errores or proceso.returncode != 0:
+        raise RuntimeError(f"ffmpeg terminó con error: {salida_error.decode(errors='replace').strip()}")
 
-    # Guardar animación
-    ani.save(output_path, writer='ffmpeg', fps=30)
-    plt.close(fig)
+def stream_completo(ruta_lista):
+    """
+    Indica si un stream HLS terminó de generarse sin errores
+    
+    Args:
+        ruta_lista (str): Ruta de la lista HLS
+    
+    Returns:
+        bool: True si todos sus segmentos están escritos
+    """
+    return os.path.exists(os.path.join(os.path.dirname(ruta_lista), MARCA_COMPLETO))
 
+def generar_animacion(perfil, nombre_archivo, con_cinturon, codificador='matplotlib', preset=None, crf=None,
+                      hilos=None, num_frames=None, formato='mp4', calidad=CALIDAD_POR_DEFECTO):
+    """
+    Genera una animación mejorada del movimiento del cuerpo durante la colisión y la guarda como MP4
+    o como stream HLS.
+    
+    En formato HLS los segmentos se escriben directamente en su directorio
+    definitivo a medida que se codifican, para poder servirlos mientras tanto;
+    stream_completo indica cuándo ha terminado.
+    
+    Args:
+        perfil (PerfilPulso): Pulso de deceleración animado
+        nombre_archivo (str): Nombre base del archivo MP4 de salida
+        con_cinturon (bool): Indica si se usa cinturón de seguridad
+        codificador (str): "matplotlib" (FuncAnimation.save) o "tuberia" (frames
+            crudos a ffmpeg por stdin, dibujo y codificación solapados)
+        preset (str, optional): Preset de x264 (por defecto, el del nivel de calidad)
+        crf (int, optional): Calidad de x264 (por defecto, la del nivel de calidad)
+        hilos (int, optional): Hilos de ffmpeg (por defecto automático)
+        num_frames (int, optional): Número de frames (por defecto, los del nivel de calidad)
+        formato (str): "mp4" (un archivo) o "hls" (segmentos de SEGUNDOS_SEGMENTO)
+        calidad (str): Nivel de NIVELES_CALIDAD: fija frames, fps, resolución y ajustes de x264
+    
+    Returns:
+        str: Ruta al archivo MP4 generado, o a la lista HLS
+    """
+    if codificador not in ('matplotlib', 'tuberia'):
+        raise ValueError(f"Codificador desconocido: {codificador}")
+    if formato not in FORMATOS_ANIMACION:
+        raise ValueError(f"Formato de animación desconocido: {formato}")
+    
+    ajustes_render = _ajustes_render(codificador, preset, crf, hilos, num_frames, calidad, formato)
+    num_frames, fps = ajustes_render['frames'], ajustes_render['fps']
+    cinematica = perfil.muestrear(num_frames)
+
+    # El nombre depende solo del contenido: mismas entradas, mismo archivo
+    output_path = ruta_animacion(nombre_archivo, perfil, con_cinturon, ajustes_render, formato)
+    if formato == 'hls':
+        directorio_salida = os.path.dirname(output_path)
+        if stream_completo(output_path):
+            os.utime(directorio_salida)
+            return output_path
+        # Restos de un render interrumpido: se empieza de cero
+        shutil.rmtree(directorio_salida, ignore_errors=True)
+        os.makedirs(directorio_salida)
+        # La lista se publica mientras se escribe: no hay temporal que renombrar
+        ruta_escritura = output_path
+        argumentos_salida = argumentos_hls(directorio_salida)
+    else:
+        if os.path.exists(output_path):
+            # Reutilizar el archivo y marcarlo como usado recientemente para la expulsión LRU
+            os.utime(output_path)
+            return output_path
+
+        # Crear directorio si no existe
+        os.makedirs(DIRECTORIO_ANIMACIONES, exist_ok=True)
+
+        # Escribir en un temporal y renombrar: nunca se sirve un MP4 a medio escribir
+        ruta_escritura = os.path.join(
+            DIRECTORIO_ANIMACIONES,
+            f".{os.path.basename(output_path)}.{uuid.uuid4().hex[:8]}{SUFIJO_TEMPORAL}"
+        )
+        argumentos_salida = []
+    figuras = []
+    try:
+        # Solo se mide la codificación real (en el renderizado en paralelo ocurre en
+        # otro proceso y no llega a los histogramas del servidor)
+        with medir_etapa('codificacion'):
+            if codificador == 'tuberia':
+                # Dos figuras idénticas: mientras ffmpeg lee una, se dibuja la otra
+                escenas = []
+                for _ in range(2):
+                    fig = nueva_figura(ajustes_render['figsize'], ajustes_render['dpi'])
+                    figuras.append(fig)
+                    _, animate = construir_escena(fig.add_subplot(), cinematica, con_cinturon)
+                    escenas.append((fig, animate))
+                codificar_por_tuberia(
+                    escenas, num_frames, ruta_escritura, fps=fps,
+                    preset=ajustes_render['preset'],
+                    crf=ajustes_render['crf'],
+                    hilos=hilos if hilos is not None else 0,
+                    argumentos_salida=argumentos_salida
+                )
+            else:
+                # Crear figura y eje
+                fig = nueva_figura(ajustes_render['figsize'], ajustes_render['dpi'])
+                figuras.append(fig)
+                init, animate = construir_escena(fig.add_subplot(), cinematica, con_cinturon)
+
+                # Crear animación (el intervalo solo afecta a la vista interactiva; al guardar manda fps)
+                ani = animation.FuncAnimation(fig, animate, frames=num_frames, init_func=init, blit=True,
+                                              interval=1000 / fps)
+
+                # Guardar animación
+                ani.save(ruta_escritura, writer='ffmpeg', fps=fps, dpi=ajustes_render['dpi'],
+                         extra_args=argumentos_codificador(ajustes_render['preset'], ajustes_render['crf'], hilos)
+                         + argumentos_salida)
+        if formato == 'hls':
+            open(os.path.join(directorio_salida, MARCA_COMPLETO), 'w').close()
+        else:
+            os.replace(ruta_escritura, output_path)
+    except BaseException:
+        if formato == 'hls':
+            shutil.rmtree(directorio_salida, ignore_errors=True)
+        elif os.path.exists(ruta_escritura):
+            os.remove(ruta_escritura)
+        raise
+    finally:
+        for fig in figuras:
+            liberar_figura(fig)
+
+    limpiar_animaciones(conservar=output_path)
     return output_path
 
-def generar_animaciones_colision(parametros_sin, parametros_con, velocidad_ms):
+# Valores por defecto del renderizado en paralelo
+PROCESOS_ANIMACION = 2
+TIEMPO_LIMITE_ANIMACION = 120  # segundos
+# Cada cuánto se comprueba si se canceló un renderizado en curso
+INTERVALO_CANCELACION_S = 0.1
+
+class AnimacionCancelada(Exception):
     """
-    Genera animaciones para los escenarios con y sin cinturón.
+    Se lanza cuando se cancela un renderizado de animaciones en curso
+    """
+
+_contexto_animacion = None
+
+def _obtener_contexto_procesos():
+    """
+    Devuelve el contexto de multiprocessing para los procesos de renderizado.
+    
+    Se evita fork desde el servidor (que tiene hilos): en Linux se usa forkserver
+    con este módulo precargado, y spawn en el resto de plataformas.
+    
+    Returns:
+        multiprocessing.context.BaseContext: Contexto de procesos
+    """
+    global _contexto_animacion
+    if _contexto_animacion is None:
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            contexto = multiprocessing.get_context('forkserver')
+            contexto.set_forkserver_preload(['animacion'])
+        else:
+            contexto = multiprocessing.get_context('spawn')
+        _contexto_animacion = contexto
+    return _contexto_animacion
+
+def _argumentos_animaciones(perfil_sin, perfil_con, opciones_animacion=None):
+    """
+    Construye los argumentos de generar_animacion para ambos escenarios
+    
+    Args:
+        opciones_animacion (dict, optional): Argumentos extra de generar_animacion
+            (codificador, preset, crf, hilos, calidad)
+    
+    Returns:
+        list: Diccionarios de argumentos (sin cinturón, con cinturón)
+    """
+    opciones_animacion = opciones_animacion or {}
+    return [
+        dict(
+            perfil=perfil_sin,
+            nombre_archivo="sin_cinturon",
+            con_cinturon=False,
+            **opciones_animacion
+        ),
+        dict(
+            perfil=perfil_con,
+            nombre_archivo="con_cinturon",
+            con_cinturon=True,
+            **opciones_animacion
+        )
+    ]
+
+def generar_animaciones_paralelo(perfil_sin, perfil_con, procesos=PROCESOS_ANIMACION, tiempo_limite=TIEMPO_LIMITE_ANIMACION, opciones_animacion=None, cancelar=None):
+    """
+    Genera las dos animaciones a la vez, cada una en su propio proceso.
+    
+    matplotlib no es seguro entre hilos, así que cada animación se renderiza en
+    un proceso separado. Si no terminan dentro del tiempo límite, los procesos
+    se terminan (ffmpeg se cierra al perder su entrada) y se lanza TimeoutError;
+    si se cancelan, igual, pero se lanza AnimacionCancelada.
     
     Args:
-        parametros_sin (dict): Parámetros físicos sin cinturón
-        parametros_con (dict): Parámetros físicos con cinturón
-        velocidad_ms (float): Velocidad inicial en m/s
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        procesos (int): Número de procesos de renderizado (1 = una tras otra)
+        tiempo_limite (float, optional): Segundos máximos para ambas animaciones (None = sin límite)
+        opciones_animacion (dict, optional): Argumentos extra de generar_animacion
+        cancelar (threading.Event, optional): Si se activa, se abandona el renderizado
     
     Returns:
         tuple: Rutas a los archivos MP4 (sin cinturón, con cinturón)
     """
-    # Generar animación sin cinturón
-    anim_sin = generar_animacion(
-        tiempo_detencion=parametros_sin['tiempo'],
-        aceleracion=parametros_sin['aceleracion'],
-        velocidad_inicial=velocidad_ms,
-        nombre_archivo="sin_cinturon",
-        con_cinturon=False
-    )
-    
-    # Generar animación con cinturón
-    anim_con = generar_animacion(
-        tiempo_detencion=parametros_con['tiempo'],
-        aceleracion=parametros_con['aceleracion'],
-        velocidad_inicial=velocidad_ms,
-        nombre_archivo="con_cinturon",
-        con_cinturon=True
-    )
-    
-    return anim_sin, anim_con
\ No newline at end of file
+    if procesos < 1:
+        raise ValueError("El número de procesos debe ser al menos 1")
+    
+    argumentos = _argumentos_animaciones(perfil_sin, perfil_con, opciones_animacion)
+    pool = _obtener_contexto_procesos().Pool(min(procesos, len(argumentos)))
+    try:
+        tareas = [pool.apply_async(generar_animacion, kwds=kwds) for kwds in argumentos]
+        limite = None if tiempo_limite is None else time.monotonic() + tiempo_limite
+        rutas = []
+        for tarea in tareas:
+            # Se espera a trozos para atender una cancelación mientras tanto
+            while not tarea.ready():
+                if cancelar is not None and cancelar.is_set():
+                    raise AnimacionCancelada("Se canceló la generación de las animaciones")
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    raise TimeoutError(f"Las animaciones no terminaron en {tiempo_limite} segundos")
+                tarea.wait(INTERVALO_CANCELACION_S if restante is None else min(restante, INTERVALO_CANCELACION_S))
+            rutas.append(tarea.get())
+        pool.close()
+    finally:
+        # terminate() es inmediato si el pool ya terminó, y mata a los procesos atascados si no
+        pool.terminate()
+        pool.join()
+    
+    return tuple(rutas)
+
+# =============================================================================
+# STREAMING DE ANIMACIONES (HLS)
+# =============================================================================
+# Cada stream se genera en un proceso aparte, como en el renderizado en
+# paralelo, mientras el servidor va sirviendo los segmentos que ya están en
+# disco. Un hilo vigila cada proceso y lo termina si supera el tiempo límite.
+
+_streams_en_curso = {}  # ruta de la lista -> proceso que la está generando
+_videos_en_curso = 0    # animaciones MP4 que se están generando desde este proceso
+_lock_streams = threading.Lock()
+
+def renders_en_curso():
+    """
+    Devuelve cuántas animaciones (streams y MP4) se están renderizando ahora;
+    es la medida de carga con la que elegir_calidad baja a vista previa
+    
+    Returns:
+        int: Renders en curso lanzados desde este proceso
+    """
+    with _lock_streams:
+        return len(_streams_en_curso) + _videos_en_curso
+
+def iniciar_stream_animacion(perfil, nombre_archivo, con_cinturon, tiempo_limite=TIEMPO_LIMITE_ANIMACION,
+                             opciones_animacion=None):
+    """
+    Empieza a generar una animación como stream HLS sin esperar a que termine
+    
+    Si el stream ya está completo en disco o otra petición lo está generando,
+    no se lanza otro render: se devuelve la misma lista.
+    
+    Args:
+        perfil (PerfilPulso): Pulso de deceleración animado
+        nombre_archivo (str): Nombre base del stream
+        con_cinturon (bool): Indica si se usa cinturón de seguridad
+        tiempo_limite (float, optional): Segundos máximos de renderizado (None = sin límite)
+        opciones_animacion (dict, optional): Argumentos extra de generar_animacion
+            (codificador, preset, crf, hilos, num_frames, calidad)
+    
+    Returns:
+        str: Ruta de la lista HLS
+    """
+    argumentos = dict(perfil=perfil, nombre_archivo=nombre_archivo, con_cinturon=con_cinturon,
+                      **(opciones_animacion or {}), formato='hls')
+    ruta_lista = ruta_animacion(nombre_archivo, perfil, con_cinturon,
+                                _ajustes_render(formato='hls', **(opciones_animacion or {})), 'hls')
+    with _lock_streams:
+        if ruta_lista in _streams_en_curso:
+            return ruta_lista
+        if stream_completo(ruta_lista):
+            os.utime(os.path.dirname(ruta_lista))
+            return ruta_lista
+        proceso = _obtener_contexto_procesos().Process(target=generar_animacion, kwargs=argumentos,
+                                                       name=f'stream-{nombre_archivo}', daemon=True)
+        proceso.start()
+        _streams_en_curso[ruta_lista] = proceso
+    threading.Thread(target=_vigilar_stream, args=(ruta_lista, proceso, tiempo_limite),
+                     name='vigilancia-stream', daemon=True).start()
+    return ruta_lista
+
+def _vigilar_stream(ruta_lista, proceso, tiempo_limite):
+    # Espera al proceso del stream y lo termina si supera el tiempo límite
+    proceso.join(tiempo_limite)
+    if proceso.is_alive():
+        proceso.terminate()
+        proceso.join()
+    with _lock_streams:
+        _streams_en_curso.pop(ruta_lista, None)
+        if not stream_completo(ruta_lista):
+            # Un proceso terminado a la fuerza no limpia lo que dejó a medias
+            shutil.rmtree(os.path.dirname(ruta_lista), ignore_errors=True)
+
+def stream_en_curso(ruta_lista):
+    """
+    Indica si un stream HLS se está generando ahora en este proceso
+    
+    Args:
+        ruta_lista (str): Ruta de la lista HLS
+    
+    Returns:
+        bool: True mientras su proceso de renderizado sigue vivo
+    """
+    return ruta_lista in _streams_en_curso
+
+def cancelar_stream(ruta_lista):
+    """
+    Termina el proceso que genera un stream HLS; el hilo que lo vigila borra
+    lo que dejó a medias
+    
+    Args:
+        ruta_lista (str): Ruta de la lista HLS
+    
+    Returns:
+        bool: True si el stream estaba en curso
+    """
+    with _lock_streams:
+        proceso = _streams_en_curso.get(ruta_lista)
+    if proceso is None:
+        return False
+    proceso.terminate()
+    return True
+
+def leer_segmentos(ruta_lista):
+    """
+    Devuelve los segmentos publicados en una lista HLS, en orden
+    
+    Args:
+        ruta_lista (str): Ruta de la lista HLS
+    
+    Returns:
+        list: Nombres de archivo de los segmentos terminados
+    """
+    try:
+        with open(ruta_lista, encoding='utf-8') as lista:
+            lineas = lista.read().splitlines()
+    except FileNotFoundError:
+        return []
+    # Se ignora una última línea a medio escribir: solo valen nombres completos
+    return [linea for linea in lineas if PATRON_SEGMENTO.match(linea)]
+
+def segmentos_stream(ruta_lista, tiempo_limite=TIEMPO_LIMITE_ANIMACION, intervalo=0.05):
+    """
+    Recorre los segmentos de un stream HLS a medida que se publican
+    
+    Args:
+        ruta_lista (str): Ruta devuelta por iniciar_stream_animacion
+        tiempo_limite (float, optional): Segundos máximos de espera (None = sin límite)
+        intervalo (float): Segundos entre comprobaciones de la lista
+    
+    Yields:
+        str: Ruta de cada segmento nuevo, del primero al último
+    """
+    directorio = os.path.dirname(ruta_lista)
+    limite = None if tiempo_limite is None else time.monotonic() + tiempo_limite
+    emitidos = 0
+    while True:
+        # Primero si sigue en curso y después si está completo: si el proceso ya
+        # terminó, la marca de completo ya está escrita
+        en_curso = stream_en_curso(ruta_lista)
+        completo = stream_completo(ruta_lista)
+        segmentos = leer_segmentos(ruta_lista)
+        for segmento in segmentos[emitidos:]:
+            yield os.path.join(directorio, segmento)
+        emitidos = max(emitidos, len(segmentos))
+        if completo:
+            return
+        if not en_curso:
+            raise RuntimeError("La generación de la animación se interrumpió")
+        if limite is not None and time.monotonic() > limite:
+            raise TimeoutError(f"La animación no terminó en {tiempo_limite} segundos")
+        time.sleep(intervalo)
+
+def generar_animaciones_colision(perfil_sin, perfil_con, en_paralelo=False, procesos=PROCESOS_ANIMACION, tiempo_limite=TIEMPO_LIMITE_ANIMACION, opciones_animacion=None, salida='video', calidad=CALIDAD_POR_DEFECTO, cancelar=None):
+    """
+    Genera animaciones para los escenarios con y sin cinturón.
+    
+    Args:
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        en_paralelo (bool): Si renderizar ambas animaciones a la vez en procesos separados
+        procesos (int): Número de procesos de renderizado (solo en paralelo)
+        tiempo_limite (float, optional): Segundos máximos de renderizado (solo en paralelo)
+        opciones_animacion (dict, optional): Argumentos extra de generar_animacion
+            (codificador, preset, crf, hilos)
+        salida (str): "video" (archivos MP4), "stream" (listas HLS que se siguen
+            generando en segundo plano; ver segmentos_stream) o "trayectoria"
+            (cargas compactas para el reproductor del navegador; no usa
+            matplotlib ni ffmpeg)
+        calidad (str): Nivel de NIVELES_CALIDAD de ambas animaciones (ver elegir_calidad)
+        cancelar (threading.Event, optional): Si se activa, se abandona el vídeo en
+            curso y se lanza AnimacionCancelada (en paralelo, al momento; una tras
+            otra, antes de empezar la segunda). Los streams se cancelan con cancelar_stream
+    
+    Returns:
+        tuple: Rutas a los archivos MP4 o a las listas HLS, o trayectorias, (sin cinturón, con cinturón)
+    """
+    if calidad not in NIVELES_CALIDAD:
+        raise ValueError(f"Calidad de animación desconocida: {calidad}")
+    if salida == 'trayectoria':
+        nivel = NIVELES_CALIDAD[calidad]
+        with medir_etapa('animacion_trayectoria'):
+            return (
+                generar_trayectoria(perfil_sin, False, nivel['frames'], nivel['fps']),
+                generar_trayectoria(perfil_con, True, nivel['frames'], nivel['fps'])
+            )
+    opciones_animacion = {**(opciones_animacion or {}), 'calidad': calidad}
+    if salida == 'stream':
+        # Ambos streams a la vez, cada uno en su proceso; no se espera a que terminen
+        return (
+            iniciar_stream_animacion(perfil_sin, "sin_cinturon", False, tiempo_limite, opciones_animacion),
+            iniciar_stream_animacion(perfil_con, "con_cinturon", True, tiempo_limite, opciones_animacion)
+        )
+    if salida != 'video':
+        raise ValueError(f"Salida desconocida: {salida}")
+    
+    global _videos_en_curso
+    with _lock_streams:
+        _videos_en_curso += 2
+    try:
+        # La duración de ambas animaciones (incluida la codificación) se registra en metricas
+        with medir_etapa('animacion_video'):
+            if en_paralelo:
+                return generar_animaciones_paralelo(perfil_sin, perfil_con, procesos, tiempo_limite, opciones_animacion,
+                                                    cancelar)
+            
+            argumentos_sin, argumentos_con = _argumentos_animaciones(perfil_sin, perfil_con, opciones_animacion)
+            
+            # Generar animación sin cinturón
+            anim_sin = generar_animacion(**argumentos_sin)
+            if cancelar is not None and cancelar.is_set():
+                raise AnimacionCancelada("Se canceló la generación de las animaciones")
+            
+            # Generar animación con cinturón
+            anim_con = generar_animacion(**argumentos_con)
+            
+            return anim_sin, anim_con
+    finally:
+        with _lock_streams:
+            _videos_en_curso -= 2
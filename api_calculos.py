@@ -0,0 +1,435 @@
+# api_calculos.py
+# =============================================================================
+# API_CALCULOS.PY - API JSON DE CÁLCULOS FÍSICOS
+# =============================================================================
+# Este módulo expone los cálculos de calculos_fisica como una API HTTP en JSON
+# para paneles y clientes móviles, sin gráficos ni textos: no importa
+# matplotlib. Los lotes se calculan con las funciones vectorizadas y, si son
+# grandes, la respuesta se envía por bloques a medida que se calcula.
+#
+#   POST /api/simulacion        Un escenario (mismas entradas que simular_colision)
+#   POST /api/simulacion/lote   Lista de escenarios o columnas de valores
+#   GET  /api/simulacion/imagen Gráfico rasterizado (PNG/WebP) con ETag, cacheable
+#   POST   /api/animacion/trabajos       Encola las animaciones como streams HLS
+#   GET    /api/animacion/trabajos/{id}  Estado del trabajo y URLs de sus streams
+#   DELETE /api/animacion/trabajos/{id}  Cancela el trabajo
+#   GET    /api/animacion/hls/...        Listas y segmentos HLS, servidos mientras se generan
+#   GET    /api/recursos/hls.min.js      Copia local de hls.js para el reproductor de streams
+#
+# Las animaciones importan matplotlib, pero solo dentro de sus rutas.
+
+import json
+import os
+import re
+import numpy as np
+from typing import Optional
+from urllib.parse import urlencode
+from fastapi import APIRouter, Request
+from fastapi.responses import FileResponse, JSONResponse, Response, StreamingResponse
+from calculos_fisica import (TIPOS_IMAGEN, calcular_datos_simulacion, determinar_nivel_riesgo_lote, huella_imagen,
+                             renderizar_imagen_simulacion, simular_colision_lote_mixto)
+from cola_animaciones import ColaLlena, cola_animaciones
+from perfil_pulso import perfiles_simulacion
+from reproductor_web import RUTA_HLS, hls_verificado
+from tabla_realista import buscar_realista
+
+# Escenarios por bloque de cálculo: por encima de esto la respuesta se envía por bloques
+FILAS_POR_BLOQUE = 2000
+MAX_ESCENARIOS_LOTE = int(os.environ.get("MAX_ESCENARIOS_LOTE", 1_000_000))
+# Las imágenes dependen solo de la URL; tras este tiempo el navegador revalida con el ETag
+MAX_EDAD_IMAGENES_S = int(os.environ.get("MAX_EDAD_IMAGENES_S", 86400))
+# Espera máxima de una lista HLS recién pedida hasta que tenga su primer segmento
+ESPERA_PRIMER_SEGMENTO_S = float(os.environ.get("ESPERA_PRIMER_SEGMENTO_S", 30))
+PATRON_STREAM = re.compile(r"^(sin|con)_cinturon_[0-9a-f]{20}$")
+TIPOS_HLS = {'.m3u8': 'application/vnd.apple.mpegurl', '.ts': 'video/mp2t'}
+# Segundos que se sugiere esperar (Retry-After) cuando la cola de animaciones está llena
+REINTENTO_COLA_LLENA_S = 5
+
+router = APIRouter(prefix="/api", tags=["cálculos"])
+
+def _columna_numerica(valores, n):
+    """
+    Convierte una columna de entrada en un array float64 de longitud n; los
+    valores ausentes o no numéricos pasan a NaN y el escenario será inválido
+    """
+    if valores is None:
+        return np.full(n, np.nan)
+    if not isinstance(valores, list):
+        valores = [valores] * n
+    if len(valores) != n:
+        raise ValueError("Todas las columnas deben tener la misma longitud")
+    try:
+        return np.asarray(valores, dtype=np.float64)
+    except (TypeError, ValueError):
+        return np.array([float(v) if isinstance(v, (int, float)) else np.nan for v in valores])
+
+def leer_lote(cuerpo):
+    """
+    Convierte el cuerpo de una petición de lote en columnas
+
+    Acepta una lista de escenarios ([{...}, ...]), un objeto {"escenarios": [...]}
+    o columnas ({"masa_cuerpo": [...], "velocidad_kmh": [...], ...}). En
+    columnas, el número de escenarios lo da la columna que sea lista (un valor
+    suelto se repite en todos) y el modo manual se usa cuando vienen ambas
+    columnas de tiempos, salvo que "usar_tiempos_manuales" diga otra cosa.
+
+    Args:
+        cuerpo: JSON decodificado
+
+    Returns:
+        dict: Arrays masa_cuerpo, velocidad_kmh, tiempo_sin_cinturon, tiempo_con_cinturon y usar_tiempos_manuales
+    """
+    if isinstance(cuerpo, dict) and 'escenarios' in cuerpo:
+        cuerpo = cuerpo['escenarios']
+
+    if isinstance(cuerpo, list):
+        if not all(isinstance(e, dict) for e in cuerpo):
+            raise ValueError("Cada escenario debe ser un objeto JSON")
+        columnas = {
+            clave: [e.get(clave) for e in cuerpo]
+            for clave in ('masa_cuerpo', 'velocidad_kmh', 'tiempo_sin_cinturon', 'tiempo_con_cinturon')
+        }
+        columnas['usar_tiempos_manuales'] = [bool(e.get('usar_tiempos_manuales', False)) for e in cuerpo]
+    elif isinstance(cuerpo, dict):
+        columnas = dict(cuerpo)
+        if 'usar_tiempos_manuales' not in columnas:
+            columnas['usar_tiempos_manuales'] = (columnas.get('tiempo_sin_cinturon') is not None
+                                                 and columnas.get('tiempo_con_cinturon') is not None)
+    else:
+        raise ValueError("El lote debe ser una lista de escenarios o un objeto con columnas")
+
+    claves = ('masa_cuerpo', 'velocidad_kmh', 'tiempo_sin_cinturon', 'tiempo_con_cinturon', 'usar_tiempos_manuales')
+    n = max((len(columnas[clave]) for clave in claves if isinstance(columnas.get(clave), list)), default=1)
+    if n > MAX_ESCENARIOS_LOTE:
+        raise OverflowError(f"El lote supera el máximo de {MAX_ESCENARIOS_LOTE} escenarios")
+
+    manual = columnas['usar_tiempos_manuales']
+    if isinstance(manual, list) and len(manual) != n:
+        raise ValueError("Todas las columnas deben tener la misma longitud")
+    return {
+        'masa_cuerpo': _columna_numerica(columnas.get('masa_cuerpo'), n),
+        'velocidad_kmh': _columna_numerica(columnas.get('velocidad_kmh'), n),
+        'tiempo_sin_cinturon': _columna_numerica(columnas.get('tiempo_sin_cinturon'), n),
+        'tiempo_con_cinturon': _columna_numerica(columnas.get('tiempo_con_cinturon'), n),
+        'usar_tiempos_manuales': np.broadcast_to(np.asarray(manual, dtype=bool), (n,))
+    }
+
+def _argumentos_lote(columnas):
+    return (columnas['masa_cuerpo'], columnas['velocidad_kmh'], columnas['tiempo_sin_cinturon'],
+            columnas['tiempo_con_cinturon'], columnas['usar_tiempos_manuales'])
+
+def _lista(valores):
+    # NaN no es JSON válido: los escenarios inválidos llevan null
+    return [None if v != v else v for v in valores.tolist()]
+
+def filas_json(resultado, inicio, fin):
+    """
+    Convierte un tramo de un resultado en columnas en escenarios JSON
+
+    Args:
+        resultado (dict): Salida de simular_colision_lote_mixto
+        inicio (int): Primer escenario del tramo
+        fin (int): Escenario siguiente al último del tramo
+
+    Returns:
+        list: Un dict por escenario, con la estructura de datos_simulacion
+    """
+    tramo = slice(inicio, fin)
+    parametros = {}
+    for sufijo in ('sin', 'con'):
+        p = resultado[f'parametros_{sufijo}']
+        columnas = [_lista(p[c][tramo]) for c in ('aceleracion', 'fuerza', 'g_force', 'tiempo')]
+        columnas.append(determinar_nivel_riesgo_lote(p['g_force'][tramo]).tolist())
+        parametros[sufijo] = [
+            {'aceleracion': a, 'fuerza': f, 'g_force': g, 'tiempo': t, 'nivel_riesgo': r}
+            for a, f, g, t, r in zip(*columnas)
+        ]
+    return [
+        {
+            'valido': valido,
+            'modo_calculo': modo,
+            'masa_cuerpo': masa,
+            'velocidad_kmh': velocidad_kmh,
+            'velocidad_ms': velocidad_ms,
+            'tiempo_sin_cinturon': p_sin['tiempo'],
+            'tiempo_con_cinturon': p_con['tiempo'],
+            'parametros_sin': p_sin,
+            'parametros_con': p_con
+        }
+        for valido, modo, masa, velocidad_kmh, velocidad_ms, p_sin, p_con in zip(
+            resultado['valido'][tramo].tolist(), resultado['modo_calculo'][tramo].tolist(),
+            _lista(resultado['masa_cuerpo'][tramo]), _lista(resultado['velocidad_kmh'][tramo]),
+            _lista(resultado['velocidad_ms'][tramo]), parametros['sin'], parametros['con']
+        )
+    ]
+
+def generar_respuesta_por_bloques(columnas, formato='json'):
+    """
+    Calcula el lote bloque a bloque y va produciendo el texto de la respuesta
+
+    Args:
+        columnas (dict): Salida de leer_lote
+        formato (str): "json" (un array JSON) o "ndjson" (un escenario por línea)
+
+    Yields:
+        bytes: Fragmentos de la respuesta
+    """
+    n = len(columnas['masa_cuerpo'])
+    if formato == 'json':
+        yield b'['
+    for inicio in range(0, n, FILAS_POR_BLOQUE):
+        fin = min(inicio + FILAS_POR_BLOQUE, n)
+        bloque = simular_colision_lote_mixto(*_argumentos_lote({clave: valores[inicio:fin] for clave, valores in columnas.items()}))
+        filas = [json.dumps(fila, ensure_ascii=False) for fila in filas_json(bloque, 0, fin - inicio)]
+        if formato == 'json':
+            yield (("," if inicio else "") + ",".join(filas)).encode('utf-8')
+        else:
+            yield ("\n".join(filas) + "\n").encode('utf-8')
+    if formato == 'json':
+        yield b']'
+
+def _error(mensaje, codigo=422):
+    return JSONResponse({'error': mensaje}, status_code=codigo)
+
+async def _leer_json(request):
+    try:
+        return await request.json()
+    except ValueError:
+        return None
+
+@router.post("/simulacion")
+async def simulacion(request: Request):
+    """
+    Simula un escenario y devuelve datos_simulacion en JSON (sin gráfico ni texto)
+    """
+    cuerpo = await _leer_json(request)
+    if not isinstance(cuerpo, dict):
+        return _error("❌ Error: El cuerpo debe ser un objeto JSON", 400)
+    if cuerpo.get('masa_cuerpo') is None or cuerpo.get('velocidad_kmh') is None:
+        return _error("❌ Error: Masa y velocidad deben ser números")
+    try:
+        # Números en vivo (float64), idénticos a los de /simulacion/lote; la
+        # tabla float32 solo se usa para el nivel de riesgo
+        datos, mensaje_error = calcular_datos_simulacion(
+            cuerpo.get('masa_cuerpo'), cuerpo.get('velocidad_kmh'),
+            bool(cuerpo.get('usar_tiempos_manuales', False)),
+            cuerpo.get('tiempo_con_cinturon'), cuerpo.get('tiempo_sin_cinturon'),
+            usar_tabla=False
+        )
+    except (TypeError, ValueError) as e:
+        return _error(f"❌ Error en los cálculos: {str(e)}")
+    if datos is None:
+        return _error(mensaje_error)
+    # En la grilla del modo realista, el nivel de riesgo está precalculado
+    fila = None if datos['modo_calculo'] == 'manual' else buscar_realista(datos['masa_cuerpo'], datos['velocidad_kmh'])
+    for caso in ('sin', 'con'):
+        datos[f'parametros_{caso}']['nivel_riesgo'] = (
+            fila[f'nivel_riesgo_{caso}'] if fila is not None
+            else determinar_nivel_riesgo_lote([datos[f'parametros_{caso}']['g_force']])[0]
+        )
+    return datos
+
+@router.post("/simulacion/lote")
+async def simulacion_lote(request: Request, formato: str = 'json'):
+    """
+    Simula un lote de escenarios. Los escenarios inválidos no cortan el lote:
+    se devuelven con "valido": false y resultados null. Con más de
+    FILAS_POR_BLOQUE escenarios, o con formato=ndjson, la respuesta se envía
+    por bloques.
+    """
+    if formato not in ('json', 'ndjson'):
+        return _error("❌ Error: formato debe ser 'json' o 'ndjson'", 400)
+    cuerpo = await _leer_json(request)
+    try:
+        columnas = leer_lote(cuerpo)
+    except OverflowError as e:
+        return _error(f"❌ Error: {str(e)}", 413)
+    except ValueError as e:
+        return _error(f"❌ Error: {str(e)}", 400)
+
+    if formato == 'json' and len(columnas['masa_cuerpo']) <= FILAS_POR_BLOQUE:
+        return JSONResponse(filas_json(simular_colision_lote_mixto(*_argumentos_lote(columnas)), 0, len(columnas['masa_cuerpo'])))
+    tipo = 'application/json' if formato == 'json' else 'application/x-ndjson'
+    # Generador síncrono: Starlette lo recorre en su pool de hilos sin bloquear el bucle de eventos
+    return StreamingResponse(generar_respuesta_por_bloques(columnas, formato), media_type=tipo)
+
+def url_imagen(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales=False, tiempo_con_cinturon=None,
+               tiempo_sin_cinturon=None, nivel='pantalla', formato='png'):
+    """
+    Construye la URL relativa de la imagen de una simulación
+
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon (float, optional): Tiempo manual con cinturón
+        tiempo_sin_cinturon (float, optional): Tiempo manual sin cinturón
+        nivel (str): Nivel de resolución (miniatura, pantalla, impresion)
+        formato (str): "png" o "webp"
+
+    Returns:
+        str: URL de GET /api/simulacion/imagen
+    """
+    parametros = {'masa_cuerpo': masa_cuerpo, 'velocidad_kmh': velocidad_kmh, 'nivel': nivel, 'formato': formato}
+    if usar_tiempos_manuales:
+        parametros['usar_tiempos_manuales'] = 'true'
+        for nombre, valor in (('tiempo_sin_cinturon', tiempo_sin_cinturon), ('tiempo_con_cinturon', tiempo_con_cinturon)):
+            if valor is not None:
+                parametros[nombre] = valor
+    return f"{router.prefix}/simulacion/imagen?{urlencode(parametros)}"
+
+@router.get("/simulacion/imagen")
+def simulacion_imagen(request: Request, masa_cuerpo: float, velocidad_kmh: float, usar_tiempos_manuales: bool = False,
+                      tiempo_sin_cinturon: Optional[float] = None, tiempo_con_cinturon: Optional[float] = None,
+                      nivel: str = 'pantalla', formato: str = 'png'):
+    """
+    Devuelve el gráfico de la simulación ya rasterizado, con ETag.
+
+    El ETag depende solo de las entradas: si el cliente ya tiene la imagen
+    (If-None-Match) se responde 304 sin calcular ni dibujar nada. Función
+    síncrona: FastAPI la ejecuta en su pool de hilos.
+    """
+    if usar_tiempos_manuales and (tiempo_sin_cinturon is None or tiempo_con_cinturon is None):
+        return _error("❌ Error: Con tiempos manuales hay que indicar tiempo_sin_cinturon y tiempo_con_cinturon", 400)
+    argumentos = (masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon, tiempo_sin_cinturon)
+    try:
+        huella = huella_imagen(*argumentos, nivel, formato)
+    except ValueError as e:
+        return _error(f"❌ Error: {str(e)}", 400)
+    etag = f'"{huella}"'
+    cabeceras = {'ETag': etag, 'Cache-Control': f"public, max-age={MAX_EDAD_IMAGENES_S}"}
+    if etag in [v.strip() for v in request.headers.get('if-none-match', '').split(',')]:
+        return Response(status_code=304, headers=cabeceras)
+
+    imagen, mensaje_error = renderizar_imagen_simulacion(*argumentos, nivel, formato)
+    if imagen is None:
+        return _error(mensaje_error)
+    return Response(imagen, media_type=TIPOS_IMAGEN[formato], headers=cabeceras)
+
+# =============================================================================
+# STREAMS HLS DE ANIMACIONES
+# =============================================================================
+
+def url_stream(ruta_lista):
+    """
+    Construye la URL relativa de la lista HLS de una animación
+
+    Args:
+        ruta_lista (str): Ruta de una lista HLS de un trabajo de animación
+
+    Returns:
+        str: URL de GET /api/animacion/hls/{stream}/{archivo}
+    """
+    directorio, archivo = os.path.split(ruta_lista)
+    return f"{router.prefix}/animacion/hls/{os.path.basename(directorio)}/{archivo}"
+
+def _resumen_trabajo(resumen):
+    # Las rutas de las listas HLS se publican como URLs
+    resultado = resumen.pop('resultado')
+    resumen['sin_cinturon'], resumen['con_cinturon'] = (
+        (url_stream(resultado[0]), url_stream(resultado[1])) if resultado is not None else (None, None)
+    )
+    return resumen
+
+@router.post("/animacion/trabajos")
+async def animacion_trabajos(request: Request):
+    """
+    Encola la generación de las dos animaciones como streams HLS y devuelve el
+    trabajo al momento, sin esperar al render. Su estado se consulta en
+    GET /api/animacion/trabajos/{id}: en cuanto tiene URLs, un reproductor HLS
+    puede empezar con el primer segmento y seguir la lista mientras crece.
+
+    Mismas entradas que POST /api/simulacion, más "calidad" y "sesion"
+    (opcionales): un trabajo nuevo de una sesión cancela el anterior. Con la
+    cola llena responde 503 con Retry-After. Con el servidor cargado se genera
+    en vista previa aunque se pida otra calidad; "calidad" indica la que se usó.
+    """
+    from animacion import NIVELES_CALIDAD
+    cuerpo = await _leer_json(request)
+    if not isinstance(cuerpo, dict):
+        return _error("❌ Error: El cuerpo debe ser un objeto JSON", 400)
+    calidad = cuerpo.get('calidad')
+    if calidad is not None and calidad not in NIVELES_CALIDAD:
+        return _error(f"❌ Error: Calidad desconocida: {calidad}", 400)
+    if cuerpo.get('masa_cuerpo') is None or cuerpo.get('velocidad_kmh') is None:
+        return _error("❌ Error: Masa y velocidad deben ser números")
+    try:
+        datos, mensaje_error = calcular_datos_simulacion(
+            cuerpo.get('masa_cuerpo'), cuerpo.get('velocidad_kmh'),
+            bool(cuerpo.get('usar_tiempos_manuales', False)),
+            cuerpo.get('tiempo_con_cinturon'), cuerpo.get('tiempo_sin_cinturon')
+        )
+    except (TypeError, ValueError) as e:
+        return _error(f"❌ Error en los cálculos: {str(e)}")
+    if datos is None:
+        return _error(mensaje_error)
+    sesion = cuerpo.get('sesion')
+    try:
+        trabajo = cola_animaciones.enviar(*perfiles_simulacion(datos), sesion=None if sesion is None else str(sesion),
+                                          salida='stream', calidad=calidad)
+    except ColaLlena as e:
+        return JSONResponse({'error': str(e)}, status_code=503, headers={'Retry-After': str(REINTENTO_COLA_LLENA_S)})
+    return JSONResponse(_resumen_trabajo(cola_animaciones.consultar(trabajo.id)), status_code=202)
+
+@router.get("/animacion/trabajos/{id_trabajo}")
+def animacion_trabajo(id_trabajo: str):
+    """
+    Devuelve el estado de un trabajo de animación: en_cola (con su posición),
+    en_curso, completado, cancelado o error, y las URLs de sus streams
+    """
+    resumen = cola_animaciones.consultar(id_trabajo)
+    if resumen is None:
+        return _error("❌ Error: Trabajo no encontrado", 404)
+    return _resumen_trabajo(resumen)
+
+@router.delete("/animacion/trabajos/{id_trabajo}")
+def animacion_cancelar_trabajo(id_trabajo: str):
+    """
+    Cancela un trabajo de animación en cola o en curso
+    """
+    if not cola_animaciones.cancelar(id_trabajo):
+        return _error("❌ Error: Trabajo no encontrado", 404)
+    return _resumen_trabajo(cola_animaciones.consultar(id_trabajo))
+
+@router.get("/animacion/hls/{stream}/{archivo}")
+def animacion_hls(stream: str, archivo: str):
+    """
+    Sirve la lista o un segmento de un stream HLS, también mientras se genera.
+
+    Una lista en curso se pide sin caché (crece con cada segmento) y, si
+    todavía no tiene ninguno, se espera al primero. Los segmentos y las listas
+    terminadas no cambian nunca: el nombre del stream es un hash de su contenido.
+    """
+    from animacion import DIRECTORIO_STREAMS, NOMBRE_LISTA, PATRON_SEGMENTO, segmentos_stream, stream_completo
+    if not PATRON_STREAM.match(stream) or not (archivo == NOMBRE_LISTA or PATRON_SEGMENTO.match(archivo)):
+        return _error("❌ Error: Stream no encontrado", 404)
+    ruta = os.path.join(DIRECTORIO_STREAMS, stream, archivo)
+    ruta_lista = os.path.join(DIRECTORIO_STREAMS, stream, NOMBRE_LISTA)
+    completo = stream_completo(ruta_lista)
+    if archivo == NOMBRE_LISTA and not completo:
+        try:
+            next(segmentos_stream(ruta_lista, tiempo_limite=ESPERA_PRIMER_SEGMENTO_S), None)
+        except (RuntimeError, TimeoutError):
+            pass
+        completo = stream_completo(ruta_lista)
+    if not os.path.exists(ruta):
+        return _error("❌ Error: Stream no encontrado", 404)
+    if archivo == NOMBRE_LISTA and not completo:
+        cache = "no-cache"
+    else:
+        cache = f"public, max-age={MAX_EDAD_IMAGENES_S}, immutable"
+    return FileResponse(ruta, media_type=TIPOS_HLS[os.path.splitext(archivo)[1]], headers={'Cache-Control': cache})
+
+@router.get("/recursos/hls.min.js")
+def recurso_hls():
+    """
+    Sirve la copia local de hls.js (python reproductor_web.py la descarga),
+    solo si su huella coincide con HASH_HLS.
+
+    La URL lleva la versión, así que el archivo se puede cachear como inmutable.
+    """
+    if not hls_verificado(RUTA_HLS):
+        return _error("❌ Error: no hay una copia de hls.js que coincida con HASH_HLS "
+                      "(ejecuta python reproductor_web.py)", 404)
+    return FileResponse(RUTA_HLS, media_type="text/javascript",
+                        headers={'Cache-Control': f"public, max-age={MAX_EDAD_IMAGENES_S}, immutable"})
@@ -0,0 +1,177 @@
+# barrido.py
+# =============================================================================
+# BARRIDO.PY - MÓDULO DE BARRIDO DE PARÁMETROS
+# =============================================================================
+# Este módulo evalúa la física sobre grillas completas masa × velocidad × tiempo
+# de detención, repartiendo la grilla en bloques entre varios procesos. Los
+# procesos escriben directamente en un array de memoria compartida, de modo que
+# los resultados nunca se serializan con pickle. Los resultados que se devuelven
+# son vistas de esa misma memoria (sin copia): el bloque se libera cuando dejan
+# de usarse todas.
+
+import os
+import time
+import weakref
+import numpy as np
+from multiprocessing import get_context, shared_memory
+from calculos_fisica import calcular_parametros_fisica_lote
+
+# Magnitudes guardadas para cada punto de la grilla (primer eje del array compartido)
+CAMPOS_BARRIDO = ('aceleracion', 'fuerza', 'g_force')
+
+# Estado de cada proceso trabajador, fijado una sola vez por el inicializador
+_estado_trabajador = {}
+
+def _inicializar_trabajador(nombre_memoria, dtype, masas, velocidades_ms, tiempos):
+    """
+    Inicializa un proceso trabajador: abre la memoria compartida y guarda los ejes de la grilla
+
+    Args:
+        nombre_memoria (str): Nombre del bloque de memoria compartida
+        dtype (str): Tipo de dato del array de resultados
+        masas, velocidades_ms, tiempos (np.ndarray): Ejes de la grilla
+    """
+    memoria = shared_memory.SharedMemory(name=nombre_memoria)
+    forma_grilla = (len(masas), len(velocidades_ms), len(tiempos))
+    total = forma_grilla[0] * forma_grilla[1] * forma_grilla[2]
+    _estado_trabajador.update({
+        'memoria': memoria,
+        'salida': np.ndarray((len(CAMPOS_BARRIDO), total), dtype=dtype, buffer=memoria.buf),
+        'forma_grilla': forma_grilla,
+        'masas': masas,
+        'velocidades_ms': velocidades_ms,
+        'tiempos': tiempos
+    })
+
+def _liberar_trabajador():
+    """
+    Suelta las vistas sobre la memoria compartida y la cierra (solo en modo sin pool)
+    """
+    memoria = _estado_trabajador.get('memoria')
+    _estado_trabajador.clear()
+    if memoria is not None:
+        memoria.close()
+
+def _procesar_bloque(inicio, fin):
+    """
+    Calcula un tramo contiguo [inicio, fin) de la grilla aplanada y lo escribe en la memoria compartida
+
+    Args:
+        inicio (int): Primer índice plano del bloque
+        fin (int): Índice plano final (exclusivo)
+
+    Returns:
+        int: Número de puntos calculados
+    """
+    estado = _estado_trabajador
+    indice_masa, indice_velocidad, indice_tiempo = np.unravel_index(
+        np.arange(inicio, fin), estado['forma_grilla']
+    )
+    parametros = calcular_parametros_fisica_lote(
+        estado['masas'][indice_masa],
+        estado['velocidades_ms'][indice_velocidad],
+        estado['tiempos'][indice_tiempo]
+    )
+    for fila, campo in enumerate(CAMPOS_BARRIDO):
+        estado['salida'][fila, inicio:fin] = parametros[campo]
+    return fin - inicio
+
+def dividir_en_bloques(total, tamano_bloque):
+    """
+    Divide el rango [0, total) en tramos contiguos de como mucho tamano_bloque puntos
+
+    Args:
+        total (int): Número total de puntos
+        tamano_bloque (int): Tamaño máximo de cada bloque
+
+    Returns:
+        list: Lista de tuplas (inicio, fin)
+    """
+    return [(inicio, min(inicio + tamano_bloque, total)) for inicio in range(0, total, tamano_bloque)]
+
+def ejecutar_barrido(masas, velocidades_kmh, tiempos_detencion, procesos=None, tamano_bloque=1_000_000, dtype=np.float32):
+    """
+    Evalúa la física en todos los puntos de la grilla masa × velocidad × tiempo de detención.
+
+    Args:
+        masas (array-like): Eje de masas en kg
+        velocidades_kmh (array-like): Eje de velocidades en km/h
+        tiempos_detencion (array-like): Eje de tiempos de detención en segundos
+        procesos (int, optional): Número de procesos (por defecto, todos los núcleos; 1 = sin pool)
+        tamano_bloque (int): Puntos por bloque de trabajo
+        dtype: Tipo de dato de los resultados (float32 reduce a la mitad la memoria)
+
+    Returns:
+        dict: Ejes de la grilla, arrays de resultados con forma (masas, velocidades, tiempos)
+              y métricas de rendimiento ('puntos', 'segundos', 'puntos_por_segundo').
+              Los arrays de resultados son vistas de la memoria compartida, que
+              sigue viva mientras se use cualquiera de ellos
+    """
+    masas = np.asarray(masas, dtype=np.float64).ravel()
+    velocidades_kmh = np.asarray(velocidades_kmh, dtype=np.float64).ravel()
+    tiempos_detencion = np.asarray(tiempos_detencion, dtype=np.float64).ravel()
+
+    if min(len(masas), len(velocidades_kmh), len(tiempos_detencion)) == 0:
+        raise ValueError("Los ejes de la grilla no pueden estar vacíos")
+    if np.any(masas <= 0) or np.any(velocidades_kmh <= 0):
+        raise ValueError("La masa y velocidad deben ser mayores a cero")
+    if np.any(tiempos_detencion <= 0):
+        raise ValueError("Los tiempos de detención deben ser mayores a cero")
+    if tamano_bloque <= 0:
+        raise ValueError("El tamaño de bloque debe ser mayor a cero")
+
+    velocidades_ms = velocidades_kmh * 1000 / 3600
+    forma_grilla = (len(masas), len(velocidades_kmh), len(tiempos_detencion))
+    total = forma_grilla[0] * forma_grilla[1] * forma_grilla[2]
+    dtype = np.dtype(dtype)
+    bloques = dividir_en_bloques(total, tamano_bloque)
+    procesos = min(procesos or os.cpu_count() or 1, len(bloques))
+
+    memoria = shared_memory.SharedMemory(create=True, size=len(CAMPOS_BARRIDO) * total * dtype.itemsize)
+    try:
+        inicio_reloj = time.perf_counter()
+        argumentos_inicio = (memoria.name, dtype.str, masas, velocidades_ms, tiempos_detencion)
+        if procesos == 1:
+            _inicializar_trabajador(*argumentos_inicio)
+            try:
+                puntos = sum(_procesar_bloque(inicio, fin) for inicio, fin in bloques)
+            finally:
+                _liberar_trabajador()
+        else:
+            with get_context().Pool(procesos, initializer=_inicializar_trabajador, initargs=argumentos_inicio) as pool:
+                puntos = sum(pool.starmap(_procesar_bloque, bloques, chunksize=1))
+        segundos = time.perf_counter() - inicio_reloj
+    except BaseException:
+        memoria.close()
+        memoria.unlink()
+        raise
+    # El nombre se borra ya (los trabajadores terminaron); la memoria sigue mapeada
+    # en este proceso y se cierra cuando ya no queda ninguna vista de 'salida'
+    memoria.unlink()
+    salida = np.ndarray((len(CAMPOS_BARRIDO),) + forma_grilla, dtype=dtype, buffer=memoria.buf)
+    weakref.finalize(salida, memoria.close)
+    resultado = {campo: salida[fila] for fila, campo in enumerate(CAMPOS_BARRIDO)}
+    del salida
+
+    resultado.update({
+        'masas': masas,
+        'velocidades_kmh': velocidades_kmh,
+        'tiempos_detencion': tiempos_detencion,
+        'puntos': puntos,
+        'procesos': procesos,
+        'segundos': segundos,
+        'puntos_por_segundo': puntos / segundos if segundos > 0 else float('inf')
+    })
+    return resultado
+
+if __name__ == "__main__":
+    # Barrido de referencia para dimensionar los servidores
+    resultado = ejecutar_barrido(
+        masas=np.arange(20, 151, 1),
+        velocidades_kmh=np.arange(10, 201, 1),
+        tiempos_detencion=np.linspace(0.01, 2.0, 400)
+    )
+    print(f"📐 Puntos calculados: {resultado['puntos']:,}")
+    print(f"⚙️ Procesos: {resultado['procesos']}")
+    print(f"⏱️ Tiempo total: {resultado['segundos']:.2f} s")
+    print(f"🚀 Rendimiento: {resultado['puntos_por_segundo']:,.0f} puntos/segundo")
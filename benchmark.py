@@ -0,0 +1,402 @@
+# benchmark.py
+# =============================================================================
+# BENCHMARK.PY - SUITE DE BENCHMARKS DEL SIMULADOR
+# =============================================================================
+# Mide latencia, pico de memoria residente (RSS) y asignaciones de memoria de
+# cada etapa del pipeline de simulación sobre una grilla de entradas
+# representativa. Cada etapa se ejecuta en un proceso nuevo, para que el pico
+# de RSS de una no contamine a las demás. Los resultados se guardan en JSON y
+# pueden compararse contra una referencia guardada.
+#
+# Uso:
+#   python benchmark.py --salida resultados.json
+#   python benchmark.py --comparar referencia.json --umbral 0.15
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import warnings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Grilla de entradas representativa de los sliders de la interfaz
+MASAS = [50, 70, 100, 150]
+VELOCIDADES_KMH = [10, 50, 120, 200]
+TIEMPOS_MANUALES = [(0.05, 0.5), (0.1, 1.0), (0.3, 2.0)]  # (sin cinturón, con cinturón)
+
+# Llamadas medidas con tracemalloc por etapa (tracemalloc ralentiza, se mide aparte)
+LLAMADAS_ASIGNACIONES = 3
+
+# Duración mínima de cada medición: las funciones de microsegundos se repiten
+# en bucle y se divide entre el número de vueltas, como hace timeit
+DURACION_MINIMA_S = 0.01
+
+def _parametros_escenario(masa, velocidad_kmh):
+    """
+    Calcula los tiempos y parámetros físicos de un escenario en modo realista
+
+    Returns:
+        dict: datos_simulacion del escenario
+    """
+    from calculos_fisica import calcular_parametros_fisica, calcular_tiempo_detencion_realista
+    velocidad_ms = velocidad_kmh * 1000 / 3600
+    t_sin = calcular_tiempo_detencion_realista(velocidad_ms, "sin_cinturon")
+    t_con = calcular_tiempo_detencion_realista(velocidad_ms, "con_cinturon")
+    return {
+        'masa_cuerpo': masa,
+        'velocidad_kmh': velocidad_kmh,
+        'velocidad_ms': velocidad_ms,
+        'modo_calculo': 'realista',
+        'parametros_sin': calcular_parametros_fisica(masa, velocidad_ms, t_sin),
+        'parametros_con': calcular_parametros_fisica(masa, velocidad_ms, t_con),
+        'tiempo_sin_cinturon': t_sin,
+        'tiempo_con_cinturon': t_con
+    }
+
+def _entradas_graficos(datos):
+    from perfil_pulso import perfiles_simulacion
+    return perfiles_simulacion(datos)
+
+def preparar_etapa(nombre):
+    """
+    Devuelve la función a medir y la lista de argumentos de cada llamada de una etapa
+
+    Args:
+        nombre (str): Nombre de la etapa (ver ETAPAS)
+
+    Returns:
+        tuple: (función, lista de tuplas de argumentos)
+    """
+    escenarios = [(m, v) for m in MASAS for v in VELOCIDADES_KMH]
+
+    if nombre == 'calcular_parametros_fisica':
+        from calculos_fisica import calcular_parametros_fisica
+        return calcular_parametros_fisica, [(m, v * 1000 / 3600, t) for m, v in escenarios for t, _ in TIEMPOS_MANUALES]
+
+    if nombre == 'fisica_realista_en_vivo':
+        return _parametros_escenario, escenarios
+
+    if nombre == 'fisica_realista_tabla':
+        from tabla_realista import abrir_tabla, buscar_realista
+        abrir_tabla(construir_si_falta=True)
+        return buscar_realista, escenarios
+
+    if nombre == 'simular_colision_realista':
+        from calculos_fisica import simular_colision
+        return simular_colision, [(m, v, False, 0.5, 0.1) for m, v in escenarios]
+
+    if nombre == 'simular_colision_manual':
+        from calculos_fisica import simular_colision
+        return simular_colision, [(m, v, True, t_con, t_sin) for m, v in escenarios[::2] for t_sin, t_con in TIEMPOS_MANUALES]
+
+    if nombre == 'simular_colision_incremental':
+        # Arrastre del slider de masa: los tiempos, las aceleraciones y sus
+        # paneles no cambian entre llamadas y el grafo los reutiliza
+        from calculos_fisica import simular_colision_incremental
+        return simular_colision_incremental, [(m, 50, False, 0.5, 0.1) for m in range(50, 151, 5)]
+
+    if nombre == 'crear_graficos':
+        from graficos import crear_graficos
+        return crear_graficos, [_entradas_graficos(_parametros_escenario(m, v)) for m, v in escenarios]
+
+    if nombre == 'crear_graficos_png':
+        from graficos import crear_graficos, figura_a_png
+        def crear_y_renderizar(*entradas):
+            return figura_a_png(crear_graficos(*entradas), liberar=True)
+        return crear_y_renderizar, [_entradas_graficos(_parametros_escenario(m, v)) for m, v in escenarios]
+
+    if nombre == 'generar_analisis_completo':
+        from textos import generar_analisis_completo
+        return generar_analisis_completo, [(_parametros_escenario(m, v),) for m, v in escenarios]
+
+    if nombre in ETAPAS_FFMPEG:
+        import animacion
+        # Directorio temporal, y cada MP4 se borra tras medirlo: la caché en disco
+        # no debe convertir el render en un acierto
+        animacion.DIRECTORIO_ANIMACIONES = tempfile.mkdtemp(prefix='benchmark_animaciones_')
+        # generar_animacion usa el codificador de matplotlib y el nivel estándar;
+        # el resto de etapas, la tubería a ffmpeg con su nivel de calidad
+        codificador = 'matplotlib' if nombre == 'generar_animacion' else 'tuberia'
+        calidad = ETAPAS_CALIDAD.get(nombre, 'estandar')
+        argumentos = []
+        for m, v in [(70, 50), (70, 120)]:
+            perfiles = _entradas_graficos(_parametros_escenario(m, v))
+            for con_cinturon, perfil in zip((False, True), perfiles):
+                argumentos.append((perfil, 'benchmark', con_cinturon))
+        def generar(*args):
+            ruta = animacion.generar_animacion(*args, codificador=codificador, calidad=calidad)
+            generar.bytes_archivo.append(os.path.getsize(ruta))
+            os.remove(ruta)
+        generar.bytes_archivo = []
+        return generar, argumentos
+
+    raise ValueError(f"Etapa desconocida: {nombre}")
+
+ETAPAS = [
+    'calcular_parametros_fisica',
+    'fisica_realista_en_vivo',
+    'fisica_realista_tabla',
+    'simular_colision_realista',
+    'simular_colision_manual',
+    'simular_colision_incremental',
+    'crear_graficos',
+    'crear_graficos_png',
+    'generar_analisis_completo',
+    'generar_animacion',
+    'generar_animacion_tuberia',
+    'generar_animacion_vista_previa',
+    'generar_animacion_alta'
+]
+
+# Coste de cada nivel de calidad de animacion.NIVELES_CALIDAD (la tubería
+# en calidad estándar es generar_animacion_tuberia)
+ETAPAS_CALIDAD = {
+    'generar_animacion_vista_previa': 'vista_previa',
+    'generar_animacion_tuberia': 'estandar',
+    'generar_animacion_alta': 'alta'
+}
+
+ETAPAS_FFMPEG = {'generar_animacion'} | set(ETAPAS_CALIDAD)
+
+def _pico_rss_mb():
+    """
+    Devuelve el pico de memoria residente del proceso actual en MB (None si no se puede medir)
+    """
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa en KB y macOS en bytes
+    return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+def _resumen_latencias(latencias):
+    ordenadas = sorted(latencias)
+    def percentil(p):
+        return ordenadas[min(len(ordenadas) - 1, int(round(p * (len(ordenadas) - 1))))]
+    return {
+        'media': statistics.fmean(ordenadas),
+        'p50': percentil(0.50),
+        'p95': percentil(0.95),
+        'min': ordenadas[0],
+        'max': ordenadas[-1]
+    }
+
+def medir_etapa(nombre, repeticiones=3):
+    """
+    Mide una etapa en el proceso actual (pensado para ejecutarse en un proceso nuevo)
+
+    Args:
+        nombre (str): Nombre de la etapa
+        repeticiones (int): Veces que se recorre la grilla de entradas
+
+    Returns:
+        dict: Latencias (ms), pico de RSS (MB) y asignaciones (bytes) de la etapa
+    """
+    warnings.filterwarnings('ignore')
+    funcion, argumentos = preparar_etapa(nombre)
+
+    # Las animaciones tardan segundos: basta con recorrer la grilla una vez
+    if nombre in ETAPAS_FFMPEG:
+        repeticiones = 1
+
+    # Calentamiento: importaciones diferidas, cachés de fuentes, plantillas
+    inicio = time.perf_counter()
+    funcion(*argumentos[0])
+    duracion = time.perf_counter() - inicio
+    vueltas = max(1, int(DURACION_MINIMA_S / duracion)) if duracion > 0 else 1
+
+    latencias = []
+    for _ in range(repeticiones):
+        for args in argumentos:
+            inicio = time.perf_counter()
+            for _ in range(vueltas):
+                funcion(*args)
+            latencias.append((time.perf_counter() - inicio) * 1000 / vueltas)
+    pico_rss = _pico_rss_mb()
+
+    # Asignaciones: pico de memoria trazada por llamada y memoria retenida al terminar
+    picos, retenidos = [], []
+    tracemalloc.start()
+    try:
+        for args in argumentos[:LLAMADAS_ASIGNACIONES]:
+            antes = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            resultado = funcion(*args)
+            actual, pico = tracemalloc.get_traced_memory()
+            picos.append(pico - antes)
+            retenidos.append(actual - antes)
+            del resultado
+    finally:
+        tracemalloc.stop()
+
+    resultado = {
+        'llamadas': len(latencias) * vueltas,
+        'latencia_ms': _resumen_latencias(latencias),
+        'pico_rss_mb': pico_rss,
+        'asignaciones': {
+            'pico_bytes_por_llamada': max(picos),
+            'retenido_bytes_por_llamada': statistics.fmean(retenidos)
+        }
+    }
+    # Las animaciones anotan el tamaño de cada vídeo generado
+    bytes_archivo = getattr(funcion, 'bytes_archivo', None)
+    if bytes_archivo:
+        resultado['bytes_archivo'] = statistics.fmean(bytes_archivo)
+    return resultado
+
+def _medir_etapa_en_proceso(argumentos):
+    nombre, repeticiones = argumentos
+    return medir_etapa(nombre, repeticiones)
+
+def ejecutar_suite(etapas=None, repeticiones=3):
+    """
+    Ejecuta las etapas indicadas, cada una en un proceso nuevo
+
+    Args:
+        etapas (list, optional): Etapas a medir (por defecto, todas)
+        repeticiones (int): Veces que se recorre la grilla de entradas en cada etapa
+
+    Returns:
+        dict: Resultados serializables a JSON
+    """
+    import matplotlib
+    import numpy
+
+    etapas = etapas or ETAPAS
+    resultados = {}
+    contexto = multiprocessing.get_context('spawn')
+    for nombre in etapas:
+        if nombre in ETAPAS_FFMPEG and shutil.which('ffmpeg') is None:
+            resultados[nombre] = {'omitida': 'ffmpeg no está instalado'}
+            continue
+        print(f"⏱️ Midiendo {nombre}...", flush=True)
+        with contexto.Pool(1, maxtasksperchild=1) as pool:
+            resultados[nombre] = pool.apply(_medir_etapa_en_proceso, ((nombre, repeticiones),))
+
+    return {
+        'version': 1,
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'entorno': {
+            'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'matplotlib': matplotlib.__version__,
+            'plataforma': platform.platform(),
+            'cpus': os.cpu_count()
+        },
+        'repeticiones': repeticiones,
+        'etapas': resultados
+    }
+
+def comparar_resultados(actual, referencia, umbral=0.10):
+    """
+    Compara dos ejecuciones de la suite y detecta regresiones
+
+    Args:
+        actual (dict): Resultados actuales
+        referencia (dict): Resultados de referencia
+        umbral (float): Empeoramiento relativo tolerado (0.10 = 10 %)
+
+    Returns:
+        list: Filas (etapa, métrica, referencia, actual, variación relativa, es_regresion)
+    """
+    metricas = [
+        ('latencia p50 (ms)', lambda r: r['latencia_ms']['p50']),
+        ('latencia p95 (ms)', lambda r: r['latencia_ms']['p95']),
+        ('pico RSS (MB)', lambda r: r['pico_rss_mb']),
+        ('pico asignado (bytes)', lambda r: r['asignaciones']['pico_bytes_por_llamada']),
+        ('tamaño archivo (bytes)', lambda r: r.get('bytes_archivo'))
+    ]
+    filas = []
+    for etapa, resultado in actual['etapas'].items():
+        previo = referencia.get('etapas', {}).get(etapa)
+        if previo is None or 'omitida' in resultado or 'omitida' in previo:
+            continue
+        for nombre_metrica, obtener in metricas:
+            valor_previo, valor_actual = obtener(previo), obtener(resultado)
+            if not valor_previo or valor_actual is None:
+                continue
+            variacion = (valor_actual - valor_previo) / valor_previo
+            filas.append((etapa, nombre_metrica, valor_previo, valor_actual, variacion, variacion > umbral))
+    return filas
+
+def imprimir_resultados(resultados):
+    """
+    Muestra un resumen de los resultados por consola
+    """
+    print(f"\n📊 Resultados ({resultados['repeticiones']} repeticiones por etapa)")
+    for etapa, r in resultados['etapas'].items():
+        if 'omitida' in r:
+            print(f"   {etapa:<30} omitida: {r['omitida']}")
+            continue
+        lat = r['latencia_ms']
+        rss = f"{r['pico_rss_mb']:.0f} MB" if r['pico_rss_mb'] is not None else "n/d"
+        print(f"   {etapa:<30} p50 {lat['p50']:10.4f} ms | p95 {lat['p95']:10.4f} ms | "
+              f"RSS {rss:>7} | pico asignado {r['asignaciones']['pico_bytes_por_llamada'] / 1024:9.1f} KB")
+    imprimir_costes_calidad(resultados)
+
+def imprimir_costes_calidad(resultados):
+    """
+    Muestra el coste de render y el tamaño de archivo de cada nivel de calidad de animación
+    """
+    medidas = [(etapa, calidad, resultados['etapas'][etapa]) for etapa, calidad in ETAPAS_CALIDAD.items()
+               if etapa in resultados['etapas'] and 'bytes_archivo' in resultados['etapas'][etapa]]
+    if not medidas:
+        return
+    from animacion import NIVELES_CALIDAD
+    print("\n🎞️ Niveles de calidad de animación (codificador por tubería, por vídeo)")
+    for etapa, calidad, r in sorted(medidas, key=lambda medida: NIVELES_CALIDAD[medida[1]]['frames']):
+        nivel = NIVELES_CALIDAD[calidad]
+        ancho, alto = (round(lado * nivel['dpi']) for lado in nivel['figsize'])
+        print(f"   {calidad:<13} {nivel['frames']:>4} frames a {nivel['fps']:>2} fps | {ancho}×{alto} px | "
+              f"x264 {nivel['preset']}, crf {nivel['crf']} | render p50 {r['latencia_ms']['p50'] / 1000:6.2f} s | "
+              f"archivo {r['bytes_archivo'] / 1024:7.1f} KB")
+
+def imprimir_comparacion(filas, umbral):
+    """
+    Muestra la comparación contra la referencia por consola
+    """
+    print(f"\n🔍 Comparación con la referencia (umbral {umbral:.0%})")
+    for etapa, metrica, previo, actual, variacion, regresion in filas:
+        marca = '❌' if regresion else ('✅' if variacion < -umbral else '  ')
+        print(f" {marca} {etapa:<30} {metrica:<22} {previo:12.4f} → {actual:12.4f} ({variacion:+.1%})")
+
+def main():
+    """
+    Punto de entrada por línea de comandos
+    """
+    parser = argparse.ArgumentParser(description="Suite de benchmarks del simulador de colisión")
+    parser.add_argument('--salida', default='benchmark_resultados.json', help="Archivo JSON de resultados")
+    parser.add_argument('--comparar', help="Archivo JSON de referencia contra el que comparar")
+    parser.add_argument('--umbral', type=float, default=0.10, help="Empeoramiento relativo tolerado")
+    parser.add_argument('--repeticiones', type=int, default=3, help="Recorridos de la grilla por etapa")
+    parser.add_argument('--etapas', nargs='+', choices=ETAPAS, help="Etapas a medir (por defecto, todas)")
+    args = parser.parse_args()
+
+    resultados = ejecutar_suite(args.etapas, args.repeticiones)
+    imprimir_resultados(resultados)
+
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(resultados, archivo, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados guardados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding='utf-8') as archivo:
+            referencia = json.load(archivo)
+        filas = comparar_resultados(resultados, referencia, args.umbral)
+        imprimir_comparacion(filas, args.umbral)
+        if any(fila[-1] for fila in filas):
+            print("❌ Se detectaron regresiones")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
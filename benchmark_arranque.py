@@ -0,0 +1,107 @@
+# benchmark_arranque.py
+# =============================================================================
+# BENCHMARK_ARRANQUE.PY - MEDICIÓN DEL TIEMPO DE ARRANQUE
+# =============================================================================
+# Mide, en procesos nuevos, cuánto tarda el servidor en construir la interfaz,
+# en responder la primera petición y en quedar listo tras el precalentamiento
+
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+DIRECTORIO = os.path.dirname(os.path.abspath(__file__))
+
+# Código ejecutado en un intérprete nuevo para medir importaciones
+CODIGO_IMPORTACION = """
+import sys, time
+inicio = time.perf_counter()
+import main
+construccion = time.perf_counter() - inicio
+matplotlib_cargado = 'matplotlib' in sys.modules
+inicio = time.perf_counter()
+import graficos, animacion
+diferido = time.perf_counter() - inicio
+print(construccion, diferido, int(matplotlib_cargado))
+"""
+
+def medir_importacion():
+    """
+    Mide en un proceso nuevo la construcción de la aplicación y la carga diferida de matplotlib
+
+    Returns:
+        dict: Segundos de construcción, segundos de la carga diferida y si matplotlib se cargó antes de tiempo
+    """
+    salida = subprocess.run([sys.executable, '-c', CODIGO_IMPORTACION], cwd=DIRECTORIO,
+                            capture_output=True, text=True, check=True).stdout.split()
+    return {
+        'construccion_s': float(salida[0]),
+        'carga_diferida_s': float(salida[1]),
+        'matplotlib_al_importar': bool(int(salida[2]))
+    }
+
+def _puerto_libre():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def _esperar_estado(url, limite):
+    while time.monotonic() < limite:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as respuesta:
+                if respuesta.status == 200:
+                    return True
+        except (urllib.error.URLError, ConnectionError, OSError):
+            pass
+        time.sleep(0.05)
+    return False
+
+def medir_servidor(tiempo_limite=60):
+    """
+    Arranca el servidor en un proceso nuevo y mide el primer byte y la disponibilidad
+
+    Args:
+        tiempo_limite (float): Segundos máximos de espera
+
+    Returns:
+        dict: Segundos hasta la primera respuesta de la interfaz y hasta /salud/listo = 200
+    """
+    puerto = _puerto_libre()
+    entorno = dict(os.environ, PORT=str(puerto), HOST='127.0.0.1')
+    inicio = time.monotonic()
+    proceso = subprocess.Popen([sys.executable, 'main.py'], cwd=DIRECTORIO, env=entorno,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        limite = inicio + tiempo_limite
+        base = f'http://127.0.0.1:{puerto}'
+        primer_byte = time.monotonic() - inicio if _esperar_estado(base + '/', limite) else None
+        disponible = time.monotonic() - inicio if _esperar_estado(base + '/salud/listo', limite) else None
+    finally:
+        proceso.terminate()
+        proceso.wait()
+    return {'primer_byte_s': primer_byte, 'listo_s': disponible}
+
+def main(repeticiones=3):
+    """
+    Ejecuta las mediciones varias veces y muestra las medianas por consola
+    """
+    importaciones = [medir_importacion() for _ in range(repeticiones)]
+    servidores = [medir_servidor() for _ in range(repeticiones)]
+
+    def mediana(resultados, clave):
+        valores = [r[clave] for r in resultados if r[clave] is not None]
+        return statistics.median(valores) if valores else float('nan')
+
+    print(f"⏱️ Arranque ({repeticiones} repeticiones, medianas)")
+    print(f"   Construir interfaz y aplicación: {mediana(importaciones, 'construccion_s'):.2f} s")
+    print(f"   matplotlib cargado al importar:  {'sí' if importaciones[0]['matplotlib_al_importar'] else 'no'}")
+    print(f"   Carga diferida de matplotlib:    {mediana(importaciones, 'carga_diferida_s'):.2f} s")
+    print(f"   Primer byte de la interfaz:      {mediana(servidores, 'primer_byte_s'):.2f} s")
+    print(f"   Servidor listo (precalentado):   {mediana(servidores, 'listo_s'):.2f} s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+# benchmark_graficos.py
+# =============================================================================
+# BENCHMARK_GRAFICOS.PY - COMPARACIÓN DE RENDIMIENTO DE GRÁFICOS
+# =============================================================================
+# Compara el tiempo de crear_graficos creando una figura nueva en cada llamada
+# frente al modo plantilla, incluyendo el renderizado a PNG en ambos casos
+
+import time
+import warnings
+from calculos_fisica import calcular_tiempo_detencion_realista
+from graficos import crear_graficos, figura_a_png
+from perfil_pulso import PerfilPulso
+
+def generar_escenarios(cantidad):
+    """
+    Genera entradas de crear_graficos recorriendo masas y velocidades de los sliders
+
+    Args:
+        cantidad (int): Número de escenarios
+
+    Returns:
+        list: Tuplas (perfil_sin, perfil_con)
+    """
+    escenarios = []
+    for i in range(cantidad):
+        masa = 20 + (i * 7) % 131
+        velocidad_ms = (10 + (i * 5) % 195) * 1000 / 3600
+        t_sin = calcular_tiempo_detencion_realista(velocidad_ms, "sin_cinturon")
+        t_con = calcular_tiempo_detencion_realista(velocidad_ms, "con_cinturon")
+        escenarios.append((PerfilPulso(t_sin, velocidad_ms, masa), PerfilPulso(t_con, velocidad_ms, masa)))
+    return escenarios
+
+def medir(escenarios, reutilizar_figura):
+    """
+    Mide el tiempo medio por llamada de crear_graficos + renderizado PNG
+
+    Args:
+        escenarios (list): Entradas de crear_graficos
+        reutilizar_figura (bool): Si usar el modo plantilla
+
+    Returns:
+        dict: Tiempos medios (ms) de construcción, renderizado y total
+    """
+    construccion = renderizado = 0.0
+    for escenario in escenarios:
+        inicio = time.perf_counter()
+        fig = crear_graficos(*escenario, reutilizar_figura=reutilizar_figura)
+        medio = time.perf_counter()
+        figura_a_png(fig, liberar=True)
+        fin = time.perf_counter()
+        construccion += medio - inicio
+        renderizado += fin - medio
+    n = len(escenarios)
+    return {
+        'construccion_ms': construccion / n * 1000,
+        'renderizado_ms': renderizado / n * 1000,
+        'total_ms': (construccion + renderizado) / n * 1000
+    }
+
+def main(cantidad=30):
+    """
+    Ejecuta la comparación y muestra los resultados por consola
+    """
+    warnings.filterwarnings('ignore', message='Glyph')
+    escenarios = generar_escenarios(cantidad)
+    # Calentamiento: caché de fuentes y construcción de la plantilla
+    figura_a_png(crear_graficos(*escenarios[0], reutilizar_figura=True), liberar=True)
+    figura_a_png(crear_graficos(*escenarios[0]), liberar=True)
+
+    actual = medir(escenarios, reutilizar_figura=False)
+    plantilla = medir(escenarios, reutilizar_figura=True)
+
+    print(f"📊 crear_graficos + PNG ({cantidad} escenarios)")
+    for nombre, resultado in [("Figura nueva", actual), ("Plantilla", plantilla)]:
+        print(f"   {nombre:<13} construcción {resultado['construccion_ms']:7.1f} ms | "
+              f"renderizado {resultado['renderizado_ms']:7.1f} ms | total {resultado['total_ms']:7.1f} ms")
+    print(f"🚀 Aceleración: {actual['total_ms'] / plantilla['total_ms']:.2f}x")
+
+if __name__ == "__main__":
+    main()
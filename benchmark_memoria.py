@@ -0,0 +1,164 @@
+# benchmark_memoria.py
+# =============================================================================
+# BENCHMARK_MEMORIA.PY - PRUEBA DE RESISTENCIA DE MEMORIA
+# =============================================================================
+# Ejecuta miles de llamadas a simular_colision, como haría un servidor durante
+# horas, y comprueba que la memoria residente (RSS) y el número de figuras
+# vivas se mantienen planos una vez calentado el proceso. Termina con código 1
+# si el RSS crece más de la tolerancia o si quedan figuras vivas de más.
+#
+# Uso:
+#   python benchmark_memoria.py --rapido     # ~1,5 minutos: renderizado, plantillas y niveles de DPI
+#   python benchmark_memoria.py --llamadas 2000 --renderizar
+
+import argparse
+import gc
+import os
+import sys
+import time
+import warnings
+from calculos_fisica import NIVELES_DPI, simular_colision
+from graficos import figura_a_png
+from registro_figuras import registro_figuras
+
+# Llamadas de cada modo en la comprobación corta (--rapido)
+LLAMADAS_RAPIDO = 20
+
+def rss_actual_mb():
+    """
+    Devuelve la memoria residente actual del proceso en MB
+
+    En Linux se lee de /proc; en otros sistemas se usa el pico de RSS, que
+    también sirve para detectar crecimiento.
+
+    Returns:
+        float: RSS en MB
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1024 * 1024)
+    except OSError:
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return pico / (1024 * 1024) if sys.platform == 'darwin' else pico / 1024
+
+def escenario(i):
+    """
+    Entradas de simular_colision de la llamada i: recorre masas, velocidades y ambos modos
+
+    Returns:
+        tuple: (masa, velocidad_kmh, usar_tiempos_manuales, tiempo_con, tiempo_sin)
+    """
+    masa = 20 + (i * 7) % 131
+    velocidad = 10 + (i * 13) % 191
+    if i % 4 == 3:
+        return masa, velocidad, True, 0.2 + (i % 9) * 0.05, 0.02 + (i % 5) * 0.01
+    return masa, velocidad, False, 0.5, 0.1
+
+def ejecutar(llamadas, renderizar=False, reutilizar_figura=False, niveles=False, progreso=None):
+    """
+    Ejecuta las llamadas y muestrea el RSS al final de cada décima parte
+
+    Args:
+        llamadas (int): Número de llamadas a simular_colision
+        renderizar (bool): Si renderizar cada figura a PNG y liberarla, como una respuesta
+        reutilizar_figura (bool): Si usar las figuras plantilla
+        niveles (bool): Si renderizar alternando los DPI de NIVELES_DPI, como /api/simulacion/imagen
+        progreso (callable, optional): Recibe (llamada, rss_mb, figuras_vivas) en cada muestra
+
+    Returns:
+        list: Tuplas (llamada, rss_mb, figuras_vivas), la primera antes de empezar
+    """
+    muestras = [(0, rss_actual_mb(), registro_figuras.estadisticas()['vivas'])]
+    paso = max(1, llamadas // 10)
+    dpis = list(NIVELES_DPI.values())
+    for i in range(llamadas):
+        fig, _, _ = simular_colision(*escenario(i), reutilizar_figura=reutilizar_figura)
+        if fig is not None and niveles:
+            # Dos peticiones seguidas del mismo nivel sobre la misma figura, como un refresco
+            dpi = dpis[i % len(dpis)]
+            figura_a_png(fig, dpi=dpi)
+            figura_a_png(fig, dpi=dpi, liberar=True)
+        elif fig is not None and (renderizar or reutilizar_figura):
+            figura_a_png(fig, liberar=True)
+        del fig
+        if (i + 1) % paso == 0 or i + 1 == llamadas:
+            gc.collect()
+            muestras.append((i + 1, rss_actual_mb(), registro_figuras.estadisticas()['vivas']))
+            if progreso is not None:
+                progreso(*muestras[-1])
+    return muestras
+
+def comprobar(muestras, tolerancia_mb):
+    """
+    Compara las muestras tras el calentamiento con la primera de ellas
+
+    Args:
+        muestras (list): Resultado de ejecutar
+        tolerancia_mb (float): Crecimiento de RSS tolerado
+
+    Returns:
+        tuple: (crecimiento_rss_mb, crecimiento_figuras, correcto)
+    """
+    # La primera décima es calentamiento: cachés de fuentes, de simulaciones y plantillas
+    _, rss_referencia, figuras_referencia = muestras[1]
+    crecimiento = max(rss for _, rss, _ in muestras[1:]) - rss_referencia
+    crecimiento_figuras = max(vivas for _, _, vivas in muestras[1:]) - figuras_referencia
+    return crecimiento, crecimiento_figuras, crecimiento <= tolerancia_mb and crecimiento_figuras <= 0
+
+def main():
+    """
+    Ejecuta la prueba de resistencia y devuelve el código de salida
+
+    Returns:
+        int: 0 si el RSS y las figuras vivas se mantienen, 1 si no
+    """
+    parser = argparse.ArgumentParser(description="Prueba de resistencia de memoria de simular_colision")
+    parser.add_argument('--llamadas', type=int, default=2000, help="Llamadas a simular_colision")
+    parser.add_argument('--tolerancia-mb', type=float, default=40.0,
+                        help="Crecimiento de RSS tolerado tras el calentamiento")
+    parser.add_argument('--renderizar', action='store_true', help="Renderizar cada figura a PNG y liberarla")
+    parser.add_argument('--plantilla', action='store_true', help="Reutilizar figuras plantilla")
+    parser.add_argument('--niveles', action='store_true',
+                        help="Renderizar cada figura dos veces en un nivel de NIVELES_DPI y liberarla")
+    parser.add_argument('--rapido', action='store_true',
+                        help=f"Comprobación corta: {LLAMADAS_RAPIDO} llamadas por modo (renderizar, plantilla y niveles)")
+    args = parser.parse_args()
+    warnings.filterwarnings('ignore', message='Glyph')
+
+    if args.rapido:
+        modos = [('renderizar', LLAMADAS_RAPIDO, True, False, False), ('plantilla', LLAMADAS_RAPIDO, False, True, False),
+                 ('niveles', LLAMADAS_RAPIDO, False, False, True)]
+    else:
+        modos = [('', args.llamadas, args.renderizar, args.plantilla, args.niveles)]
+
+    correcto = True
+    for nombre, llamadas, renderizar, plantilla, niveles in modos:
+        if nombre:
+            print(f"▶️ {nombre}")
+        inicio = time.perf_counter()
+        muestras = ejecutar(llamadas, renderizar, plantilla, niveles,
+                            progreso=lambda llamada, rss, vivas: print(
+                                f"   {llamada:>6} llamadas   RSS {rss:8.1f} MB   figuras vivas {vivas}", flush=True))
+        segundos = time.perf_counter() - inicio
+        crecimiento, crecimiento_figuras, correcto_modo = comprobar(muestras, args.tolerancia_mb)
+        figuras = registro_figuras.estadisticas()
+        print(f"📊 {llamadas} llamadas en {segundos:.1f} s")
+        print(f"   RSS tras calentar {muestras[1][1]:.1f} MB | final {muestras[-1][1]:.1f} MB | "
+              f"crecimiento máximo {crecimiento:+.1f} MB | figuras vivas {crecimiento_figuras:+d}")
+        print(f"   Figuras vivas {figuras['vivas']} ({figuras['bytes'] / 1e6:.1f} MB de búferes) | "
+              f"creadas {figuras['creadas']} | cerradas {figuras['cerradas']} | "
+              f"expulsadas {figuras['expulsadas']} | recicladas {figuras['recicladas']} | "
+              f"límite superado {figuras['limite_superado']}")
+        if crecimiento > args.tolerancia_mb:
+            print(f"❌ El RSS creció {crecimiento:.1f} MB (tolerancia {args.tolerancia_mb:.1f} MB)")
+        if crecimiento_figuras > 0:
+            print(f"❌ Quedaron {crecimiento_figuras} figuras vivas de más")
+        correcto = correcto and correcto_modo
+    if not correcto:
+        return 1
+    print("✅ RSS y figuras vivas estables")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
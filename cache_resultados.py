@@ -0,0 +1,107 @@
+# cache_resultados.py
+# =============================================================================
+# CACHE_RESULTADOS.PY - MÓDULO DE CACHÉ DE RESULTADOS
+# =============================================================================
+# Este módulo contiene una caché LRU en memoria, acotada por número de entradas
+# y por bytes, para reutilizar simulaciones ya renderizadas
+
+import threading
+from collections import OrderedDict
+
+class CacheLRU:
+    """
+    Caché LRU segura entre hilos, acotada por número de entradas y por bytes.
+
+    Cada entrada guarda su tamaño en bytes; al superar cualquiera de los dos
+    límites se descartan primero las entradas usadas hace más tiempo.
+    """
+
+    def __init__(self, max_entradas=256, max_bytes=256 * 1024 * 1024):
+        """
+        Args:
+            max_entradas (int): Número máximo de entradas
+            max_bytes (int): Tamaño máximo total en bytes
+        """
+        if max_entradas <= 0 or max_bytes <= 0:
+            raise ValueError("Los límites de la caché deben ser mayores a cero")
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.descartes = 0
+
+    def obtener(self, clave):
+        """
+        Devuelve el valor asociado a la clave y lo marca como usado recientemente
+
+        Args:
+            clave: Clave hashable
+
+        Returns:
+            El valor guardado, o None si no está en la caché
+        """
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[0]
+
+    def guardar(self, clave, valor, tamano_bytes):
+        """
+        Guarda un valor y descarta las entradas más antiguas si se superan los límites
+
+        Args:
+            clave: Clave hashable
+            valor: Valor a guardar
+            tamano_bytes (int): Tamaño aproximado del valor en bytes
+
+        Returns:
+            bool: False si el valor es demasiado grande para la caché
+        """
+        if tamano_bytes > self.max_bytes:
+            return False
+        with self._lock:
+            anterior = self._entradas.pop(clave, None)
+            if anterior is not None:
+                self._bytes -= anterior[1]
+            self._entradas[clave] = (valor, tamano_bytes)
+            self._bytes += tamano_bytes
+            while len(self._entradas) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, tamano_descartado) = self._entradas.popitem(last=False)
+                self._bytes -= tamano_descartado
+                self.descartes += 1
+        return True
+
+    def limpiar(self):
+        """
+        Elimina todas las entradas (los contadores se conservan)
+        """
+        with self._lock:
+            self._entradas.clear()
+            self._bytes = 0
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores de uso de la caché
+
+        Returns:
+            dict: Entradas, bytes, aciertos, fallos, descartes y tasa de aciertos
+        """
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                'entradas': len(self._entradas),
+                'bytes': self._bytes,
+                'max_entradas': self.max_entradas,
+                'max_bytes': self.max_bytes,
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'descartes': self.descartes,
+                'tasa_aciertos': self.aciertos / consultas if consultas else 0.0
+            }
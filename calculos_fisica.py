@@ -4,9 +4,18 @@
 # =============================================================================
 # Este módulo contiene todas las funciones relacionadas con los cálculos físicos
 
-from graficos import crear_graficos
-from textos import generar_analisis_completo
-from animacion import generar_animaciones_colision
+import copy
+import hashlib
+import threading
+import numpy as np
+from cache_resultados import CacheLRU
+from grafo_dependencias import GrafoDependencias
+from perfil_pulso import PerfilPulso, perfiles_simulacion
+from metricas import medir_etapa
+from tabla_realista import buscar_realista
+
+# graficos, textos y animacion se importan dentro de las funciones que los usan:
+# así importar este módulo no carga matplotlib y el arranque del servidor es rápido
 
 def calcular_tiempo_detencion_realista(velocidad_ms, tipo_impacto):
     """
@@ -83,9 +92,9 @@ def validar_parametros(masa_cuerpo, velocidad_kmh, tiempo_sin_cinturon=None, tie
     
     return True, ""
 
-def simular_colision(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual):
+def validar_entradas_simulacion(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual):
     """
-    Ejecuta la simulación de colisión y genera gráficos y análisis textual.
+    Valida las entradas de una simulación según el modo de cálculo
     
     Args:
         masa_cuerpo (float): Masa del cuerpo en kg
@@ -95,82 +104,760 @@ def simular_colision(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_c
         tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
     
     Returns:
-        tuple: (figura_matplotlib, texto_analisis, datos_simulacion)
+        tuple: (es_valido, mensaje_error)
     """
-    try:
-        # Validar parámetros básicos
-        es_valido, mensaje_error = validar_parametros(masa_cuerpo, velocidad_kmh)
+    # Validar parámetros básicos
+    es_valido, mensaje_error = validar_parametros(masa_cuerpo, velocidad_kmh)
+    if not es_valido:
+        return False, mensaje_error
+    if not isinstance(velocidad_kmh, (int, float)):
+        return False, "❌ Error: La velocidad debe ser un número válido"
+    
+    if usar_tiempos_manuales:
+        return validar_parametros(
+            masa_cuerpo, velocidad_kmh, 
+            tiempo_sin_cinturon_manual, tiempo_con_cinturon_manual
+        )
+    return True, ""
+
+def elegir_tiempos_detencion(velocidad_ms, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual):
+    """
+    Decide los tiempos de detención: los manuales o los del modelo realista
+    
+    Args:
+        velocidad_ms (float): Velocidad en m/s
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+    
+    Returns:
+        tuple: (modo_calculo, tiempo_sin_cinturon, tiempo_con_cinturon)
+    """
+    if usar_tiempos_manuales:
+        return "manual", float(tiempo_sin_cinturon_manual), float(tiempo_con_cinturon_manual)
+    return (
+        "realista",
+        calcular_tiempo_detencion_realista(velocidad_ms, "sin_cinturon"),
+        calcular_tiempo_detencion_realista(velocidad_ms, "con_cinturon")
+    )
+
+def calcular_datos_simulacion(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual, tiempos=None, usar_tabla=True):
+    """
+    Valida las entradas y calcula los datos físicos de la simulación, sin
+    generar gráficos ni análisis textual.
+    
+    La duración de las etapas validacion y fisica se registra en los
+    histogramas del módulo metricas.
+    
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+        tiempos (dict, optional): Donde guardar la duración de cada etapa en segundos
+        usar_tabla (bool): Si tomar el modo realista de la tabla precalculada
+            (float32, ~7 cifras significativas). Con False se calcula en vivo
+            en float64, como simular_colision_lote
+    
+    Returns:
+        tuple: (datos_simulacion, mensaje_error); datos_simulacion es None si las entradas no son válidas
+    """
+    with medir_etapa('validacion', tiempos):
+        es_valido, mensaje_error = validar_entradas_simulacion(
+            masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+            tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+        )
         if not es_valido:
-            return None, mensaje_error, None
-        
+            return None, mensaje_error
         # Convertir velocidad de km/h a m/s
-        if not isinstance(velocidad_kmh, (int, float)):
-            return None, "❌ Error: La velocidad debe ser un número válido", None
         velocidad_ms = float(velocidad_kmh) * 1000 / 3600
 
-        # Decidir qué tiempos usar
-        if usar_tiempos_manuales:
-            es_valido, mensaje_error = validar_parametros(
-                masa_cuerpo, velocidad_kmh, 
-                tiempo_sin_cinturon_manual, tiempo_con_cinturon_manual
-            )
-            if not es_valido:
-                return None, mensaje_error, None
-            tiempo_sin_cinturon = float(tiempo_sin_cinturon_manual)
-            tiempo_con_cinturon = float(tiempo_con_cinturon_manual)
-            modo_calculo = "manual"
-        else:
-            tiempo_sin_cinturon = calcular_tiempo_detencion_realista(velocidad_ms, "sin_cinturon")
-            tiempo_con_cinturon = calcular_tiempo_detencion_realista(velocidad_ms, "con_cinturon")
+    with medir_etapa('fisica', tiempos):
+        # En la grilla de la interfaz, el modo realista sale de la tabla precalculada
+        fila = None if usar_tiempos_manuales or not usar_tabla else buscar_realista(masa_cuerpo, velocidad_kmh)
+        if fila is not None:
             modo_calculo = "realista"
+            tiempo_sin_cinturon, tiempo_con_cinturon = fila['tiempo_sin_cinturon'], fila['tiempo_con_cinturon']
+            parametros_sin, parametros_con = fila['parametros_sin'], fila['parametros_con']
+        else:
+            modo_calculo, tiempo_sin_cinturon, tiempo_con_cinturon = elegir_tiempos_detencion(
+                velocidad_ms, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+            )
+            if not all(isinstance(x, (int, float)) for x in [tiempo_sin_cinturon, tiempo_con_cinturon]):
+                return None, "❌ Error: Los tiempos calculados son inválidos"
 
-        if not all(isinstance(x, (int, float)) for x in [tiempo_sin_cinturon, tiempo_con_cinturon]):
-            return None, "❌ Error: Los tiempos calculados son inválidos", None
+            # Calcular parámetros físicos
+            parametros_sin = calcular_parametros_fisica(masa_cuerpo, velocidad_ms, tiempo_sin_cinturon)
+            parametros_con = calcular_parametros_fisica(masa_cuerpo, velocidad_ms, tiempo_con_cinturon)
 
-        # Calcular parámetros físicos
-        parametros_sin = calcular_parametros_fisica(masa_cuerpo, velocidad_ms, tiempo_sin_cinturon)
-        parametros_con = calcular_parametros_fisica(masa_cuerpo, velocidad_ms, tiempo_con_cinturon)
+    datos_simulacion = {
+        'masa_cuerpo': masa_cuerpo,
+        'velocidad_kmh': velocidad_kmh,
+        'velocidad_ms': velocidad_ms,
+        'modo_calculo': modo_calculo,
+        'parametros_sin': parametros_sin,
+        'parametros_con': parametros_con,
+        'tiempo_sin_cinturon': tiempo_sin_cinturon,
+        'tiempo_con_cinturon': tiempo_con_cinturon
+    }
+    return datos_simulacion, ""
 
-        # Crear gráficos
-        fig = crear_graficos(
-            tiempo_sin_cinturon, abs(parametros_sin['fuerza']), abs(parametros_sin['aceleracion']),
-            tiempo_con_cinturon, abs(parametros_con['fuerza']), abs(parametros_con['aceleracion'])
+def simular_colision(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual, reutilizar_figura=False, incluir_tiempos=False, modelo_ocupante=False):
+    """
+    Ejecuta la simulación de colisión y genera gráficos y análisis textual.
+    
+    La duración de cada etapa (validacion, fisica, graficos, analisis) se
+    registra en los histogramas del módulo metricas.
+    
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+        reutilizar_figura (bool): Si tomar prestada una figura plantilla en vez de crear una nueva
+            (hay que devolverla con graficos.liberar_figura tras renderizarla)
+        incluir_tiempos (bool): Si añadir a datos_simulacion la entrada 'timings'
+            con la duración en segundos de cada etapa (para depuración)
+        modelo_ocupante (bool): Si integrar el modelo temporal del cinturón
+            (modelo_cinturon): sus curvas sustituyen a los pulsos rectangulares
+            y sus picos se guardan en datos_simulacion['respuesta_ocupante']
+    
+    Returns:
+        tuple: (figura_matplotlib, texto_analisis, datos_simulacion)
+    """
+    tiempos = {}
+    try:
+        datos_simulacion, mensaje_error = calcular_datos_simulacion(
+            masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+            tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual, tiempos
         )
+        if datos_simulacion is None:
+            return None, mensaje_error, None
+
+        from graficos import crear_graficos
+        from textos import generar_analisis_completo
+
+        respuesta_ocupante = None
+        if modelo_ocupante:
+            from modelo_cinturon import simular_respuesta_ocupante
+            with medir_etapa('modelo_ocupante', tiempos):
+                respuesta_ocupante = simular_respuesta_ocupante(masa_cuerpo, datos_simulacion['velocidad_ms'])
+            # En datos_simulacion solo los picos: las historias solo hacen falta para dibujar
+            datos_simulacion['respuesta_ocupante'] = {
+                clave: {nombre: valor for nombre, valor in respuesta_ocupante[clave].items() if not isinstance(valor, np.ndarray)}
+                for clave in ('sin', 'con')
+            }
+
+        # Crear gráficos
+        with medir_etapa('graficos', tiempos):
+            fig = crear_graficos(
+                *perfiles_simulacion(datos_simulacion),
+                reutilizar_figura=reutilizar_figura, respuesta_ocupante=respuesta_ocupante
+            )
 
         # Generar análisis textual
-        datos_simulacion = {
-            'masa_cuerpo': masa_cuerpo,
-            'velocidad_kmh': velocidad_kmh,
-            'velocidad_ms': velocidad_ms,
-            'modo_calculo': modo_calculo,
-            'parametros_sin': parametros_sin,
-            'parametros_con': parametros_con,
-            'tiempo_sin_cinturon': tiempo_sin_cinturon,
-            'tiempo_con_cinturon': tiempo_con_cinturon
-        }
-        
-        analisis_texto = generar_analisis_completo(datos_simulacion)
+        with medir_etapa('analisis', tiempos):
+            analisis_texto = generar_analisis_completo(datos_simulacion)
+        if incluir_tiempos:
+            datos_simulacion['timings'] = tiempos
         return fig, analisis_texto, datos_simulacion
 
     except Exception as e:
         return None, f"❌ Error en los cálculos: {str(e)}", None
 
-def generar_animaciones(datos_simulacion):
+# Los streams usan la tubería a ffmpeg: dibujar y codificar a la vez adelanta el primer segmento
+OPCIONES_STREAM = {'codificador': 'tuberia'}
+
+def generar_animaciones(datos_simulacion, en_paralelo=False, salida='video', calidad='estandar'):
     """
     Genera animaciones para los escenarios con y sin cinturón.
     
     Args:
         datos_simulacion (dict): Diccionario con los datos de la simulación
+        en_paralelo (bool): Si renderizar ambas animaciones a la vez en procesos separados
+        salida (str): "video" (MP4), "stream" (listas HLS que se generan en
+            segundo plano) o "trayectoria" (reproductor en el navegador)
+        calidad (str): Nivel de calidad (vista_previa, estandar, alta); ver animacion.elegir_calidad
     
     Returns:
         tuple: (animacion_sin, animacion_con)
     """
     try:
+        from animacion import generar_animaciones_colision
         anim_sin, anim_con = generar_animaciones_colision(
-            datos_simulacion['parametros_sin'],
-            datos_simulacion['parametros_con'],
-            datos_simulacion['velocidad_ms']
+            *perfiles_simulacion(datos_simulacion),
+            en_paralelo=en_paralelo,
+            opciones_animacion=OPCIONES_STREAM if salida == 'stream' else None,
+            salida=salida,
+            calidad=calidad
         )
         return anim_sin, anim_con
     except Exception as e:
-        return None, f"❌ Error al generar animaciones: {str(e)}"
\ No newline at end of file
+        return None, f"❌ Error al generar animaciones: {str(e)}"
+
+# =============================================================================
+# SIMULACIÓN INCREMENTAL
+# =============================================================================
+# Al mover un solo slider casi todo el resultado sigue igual: con solo la masa
+# cambian las fuerzas, pero no los tiempos realistas ni las aceleraciones. La
+# simulación se modela como un grafo de dependencias con nodos memorizados
+#   entradas → validación → velocidad → tiempos → parámetros → magnitudes → imagen
+#                                                          └→ factores → secciones del texto → análisis
+# y solo se recalcula lo que depende de entradas que cambiaron. Dentro de la
+# imagen, la figura plantilla de graficos redibuja solo los paneles cuyas
+# entradas cambiaron. Hay un grafo por hilo, como la figura plantilla.
+
+ENTRADAS_SIMULACION = ('masa_cuerpo', 'velocidad_kmh', 'usar_tiempos_manuales',
+                       'tiempo_con_cinturon_manual', 'tiempo_sin_cinturon_manual', 'modelo_ocupante')
+
+_grafos = threading.local()
+
+def _datos_parciales(tiempos_detencion, **campos):
+    # Diccionario con la forma de datos_simulacion, solo con lo que usa cada sección del texto
+    modo_calculo, tiempo_sin, tiempo_con = tiempos_detencion
+    return {'modo_calculo': modo_calculo, 'tiempo_sin_cinturon': tiempo_sin, 'tiempo_con_cinturon': tiempo_con, **campos}
+
+def _tiempos_detencion(fila_tabla, velocidad_ms, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual):
+    if fila_tabla is not None:
+        return "realista", fila_tabla['tiempo_sin_cinturon'], fila_tabla['tiempo_con_cinturon']
+    return elegir_tiempos_detencion(velocidad_ms, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual)
+
+def _respuesta_ocupante(modelo_ocupante, masa_cuerpo, velocidad_ms):
+    if not modelo_ocupante:
+        return None
+    from modelo_cinturon import simular_respuesta_ocupante
+    return simular_respuesta_ocupante(masa_cuerpo, velocidad_ms)
+
+def _picos_ocupante(respuesta_ocupante):
+    # En datos_simulacion solo los picos: las historias solo hacen falta para dibujar
+    if respuesta_ocupante is None:
+        return None
+    return {
+        clave: {nombre: valor for nombre, valor in respuesta_ocupante[clave].items() if not isinstance(valor, np.ndarray)}
+        for clave in ('sin', 'con')
+    }
+
+def _datos_simulacion(masa_cuerpo, velocidad_kmh, velocidad_ms, tiempos_detencion, parametros_sin, parametros_con, picos_ocupante):
+    datos = _datos_parciales(tiempos_detencion, masa_cuerpo=masa_cuerpo, velocidad_kmh=velocidad_kmh,
+                             velocidad_ms=velocidad_ms, parametros_sin=parametros_sin, parametros_con=parametros_con)
+    if picos_ocupante is not None:
+        datos['respuesta_ocupante'] = picos_ocupante
+    return datos
+
+def _perfiles_pulso(masa_cuerpo, velocidad_ms, tiempos_detencion):
+    _, tiempo_sin, tiempo_con = tiempos_detencion
+    return PerfilPulso(tiempo_sin, velocidad_ms, masa_cuerpo), PerfilPulso(tiempo_con, velocidad_ms, masa_cuerpo)
+
+def _renderizar_png(perfiles, respuesta_ocupante):
+    from graficos import crear_graficos, figura_a_png
+    with medir_etapa('graficos'):
+        fig = crear_graficos(*perfiles, reutilizar_figura=True, respuesta_ocupante=respuesta_ocupante)
+    with medir_etapa('png'):
+        return figura_a_png(fig, liberar=True)
+
+def crear_grafo_simulacion():
+    """
+    Construye el grafo de dependencias de la simulación
+    
+    Returns:
+        GrafoDependencias: Grafo con los nodos de cálculo, imagen y texto
+    """
+    import textos
+    grafo = GrafoDependencias()
+    nodo = grafo.agregar_nodo
+    
+    # Física
+    nodo('validacion', validar_entradas_simulacion,
+         ('masa_cuerpo', 'velocidad_kmh', 'usar_tiempos_manuales', 'tiempo_con_cinturon_manual', 'tiempo_sin_cinturon_manual'))
+    nodo('velocidad_ms', lambda velocidad_kmh: float(velocidad_kmh) * 1000 / 3600, ('velocidad_kmh',))
+    # En modo realista y en la grilla, la física sale de la tabla precalculada.
+    # Los tiempos de la tabla no dependen de la masa: el corte temprano evita
+    # recalcular lo que depende solo de ellos al mover el slider de masa
+    nodo('fila_tabla', lambda masa, v_kmh, manual: None if manual else buscar_realista(masa, v_kmh),
+         ('masa_cuerpo', 'velocidad_kmh', 'usar_tiempos_manuales'))
+    nodo('tiempos_detencion', _tiempos_detencion,
+         ('fila_tabla', 'velocidad_ms', 'usar_tiempos_manuales', 'tiempo_con_cinturon_manual', 'tiempo_sin_cinturon_manual'))
+    nodo('parametros_sin', lambda fila, masa, v, tiempos: fila['parametros_sin'] if fila is not None
+         else calcular_parametros_fisica(masa, v, tiempos[1]),
+         ('fila_tabla', 'masa_cuerpo', 'velocidad_ms', 'tiempos_detencion'))
+    nodo('parametros_con', lambda fila, masa, v, tiempos: fila['parametros_con'] if fila is not None
+         else calcular_parametros_fisica(masa, v, tiempos[2]),
+         ('fila_tabla', 'masa_cuerpo', 'velocidad_ms', 'tiempos_detencion'))
+    nodo('respuesta_ocupante', _respuesta_ocupante, ('modelo_ocupante', 'masa_cuerpo', 'velocidad_ms'))
+    nodo('picos_ocupante', _picos_ocupante, ('respuesta_ocupante',))
+    nodo('datos', _datos_simulacion, ('masa_cuerpo', 'velocidad_kmh', 'velocidad_ms', 'tiempos_detencion',
+                                      'parametros_sin', 'parametros_con', 'picos_ocupante'))
+    
+    # Imagen
+    nodo('perfiles', _perfiles_pulso, ('masa_cuerpo', 'velocidad_ms', 'tiempos_detencion'))
+    nodo('imagen_png', _renderizar_png, ('perfiles', 'respuesta_ocupante'))
+    
+    # Texto: cada sección depende solo de los datos que muestra
+    nodo('factores', lambda tiempos, p_sin, p_con: textos.calcular_factores_comparacion(
+        _datos_parciales(tiempos, parametros_sin=p_sin, parametros_con=p_con)),
+         ('tiempos_detencion', 'parametros_sin', 'parametros_con'))
+    nodo('texto_condiciones', lambda v_kmh, v_ms, masa, tiempos: textos.generar_seccion_condiciones(
+        _datos_parciales(tiempos, velocidad_kmh=v_kmh, velocidad_ms=v_ms, masa_cuerpo=masa)),
+         ('velocidad_kmh', 'velocidad_ms', 'masa_cuerpo', 'tiempos_detencion'))
+    nodo('texto_explicacion', lambda tiempos: textos.generar_explicacion_modo_calculo(_datos_parciales(tiempos)),
+         ('tiempos_detencion',))
+    nodo('texto_resultados', lambda tiempos, p_sin, p_con, v_ms, masa: textos.generar_seccion_resultados(
+        _datos_parciales(tiempos, parametros_sin=p_sin, parametros_con=p_con, velocidad_ms=v_ms, masa_cuerpo=masa)),
+         ('tiempos_detencion', 'parametros_sin', 'parametros_con', 'velocidad_ms', 'masa_cuerpo'))
+    nodo('texto_respuesta_ocupante', lambda picos: textos.generar_seccion_respuesta_ocupante(
+        {'respuesta_ocupante': picos}), ('picos_ocupante',))
+    nodo('texto_analisis_resultados', lambda v_kmh, v_ms, masa, tiempos, factores: textos.generar_seccion_analisis_resultados(
+        _datos_parciales(tiempos, velocidad_kmh=v_kmh, velocidad_ms=v_ms, masa_cuerpo=masa), factores),
+         ('velocidad_kmh', 'velocidad_ms', 'masa_cuerpo', 'tiempos_detencion', 'factores'))
+    nodo('texto_resumen', lambda tiempos, p_sin, p_con, factores: textos.generar_seccion_resumen(
+        _datos_parciales(tiempos, parametros_sin=p_sin, parametros_con=p_con), factores),
+         ('tiempos_detencion', 'parametros_sin', 'parametros_con', 'factores'))
+    nodo('analisis', textos.unir_secciones_analisis,
+         ('texto_condiciones', 'texto_explicacion', 'texto_resultados', 'texto_respuesta_ocupante',
+          'texto_analisis_resultados', 'texto_resumen'))
+    return grafo
+
+def obtener_grafo_simulacion():
+    """
+    Devuelve el grafo de simulación del hilo actual, creándolo la primera vez
+    
+    Returns:
+        GrafoDependencias: Grafo memorizado del hilo
+    """
+    grafo = getattr(_grafos, 'simulacion', None)
+    if grafo is None:
+        grafo = _grafos.simulacion = crear_grafo_simulacion()
+    return grafo
+
+def simular_colision_incremental(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual, modelo_ocupante=False, incluir_recalculados=False):
+    """
+    Igual que simular_colision, pero devuelve el gráfico como PNG y solo
+    recalcula, redibuja y regenera lo que depende de entradas que cambiaron
+    respecto a la última llamada del mismo hilo.
+    
+    Las etapas validacion, fisica y analisis se registran en cada llamada;
+    graficos, png y modelo_ocupante solo cuando de verdad se ejecutan.
+    
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+        modelo_ocupante (bool): Si integrar el modelo temporal del cinturón
+        incluir_recalculados (bool): Si añadir a datos_simulacion la lista
+            'nodos_recalculados' (para depuración)
+    
+    Returns:
+        tuple: (imagen_png, texto_analisis, datos_simulacion)
+    """
+    usar_tiempos_manuales = bool(usar_tiempos_manuales)
+    if not usar_tiempos_manuales:
+        # En modo realista los tiempos manuales no influyen: no deben invalidar nada
+        tiempo_con_cinturon_manual = tiempo_sin_cinturon_manual = None
+    entradas = dict(zip(ENTRADAS_SIMULACION, (
+        masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+        tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual, bool(modelo_ocupante)
+    )))
+    try:
+        evaluacion = obtener_grafo_simulacion().evaluacion(entradas)
+        with medir_etapa('validacion'):
+            es_valido, mensaje_error = evaluacion.valor('validacion')
+        if not es_valido:
+            return None, mensaje_error, None
+        if modelo_ocupante:
+            with medir_etapa('modelo_ocupante'):
+                evaluacion.valor('respuesta_ocupante')
+        with medir_etapa('fisica'):
+            datos_simulacion = evaluacion.valor('datos')
+        imagen_png = evaluacion.valor('imagen_png')
+        with medir_etapa('analisis'):
+            analisis_texto = evaluacion.valor('analisis')
+    except Exception as e:
+        return None, f"❌ Error en los cálculos: {str(e)}", None
+    
+    # Los valores memorizados no se entregan: quien llama puede modificar su copia
+    datos_simulacion = copy.deepcopy(datos_simulacion)
+    if incluir_recalculados:
+        datos_simulacion['nodos_recalculados'] = evaluacion.recalculados
+    return imagen_png, analisis_texto, datos_simulacion
+
+# =============================================================================
+# CACHÉ DE SIMULACIONES RENDERIZADAS
+# =============================================================================
+# Los sliders de la interfaz son discretos, así que las mismas entradas se
+# repiten constantemente. La caché guarda el gráfico ya rasterizado (PNG) y el
+# texto del análisis, de modo que un acierto no toca matplotlib.
+
+cache_simulaciones = CacheLRU(max_entradas=512, max_bytes=128 * 1024 * 1024)
+
+def normalizar_clave_simulacion(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual):
+    """
+    Construye la clave de caché de una simulación a partir de sus entradas
+    
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+    
+    Returns:
+        tuple: Clave normalizada, o None si las entradas no son números
+    """
+    valores = [masa_cuerpo, velocidad_kmh]
+    if usar_tiempos_manuales:
+        valores += [tiempo_sin_cinturon_manual, tiempo_con_cinturon_manual]
+    if not all(isinstance(x, (int, float)) for x in valores):
+        return None
+    # En modo realista los tiempos manuales no influyen en el resultado
+    modo = "manual" if usar_tiempos_manuales else "realista"
+    return (modo,) + tuple(round(float(x), 6) for x in valores)
+
+def simular_colision_en_cache(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual):
+    """
+    Igual que simular_colision, pero devuelve el gráfico como PNG y reutiliza
+    los resultados de entradas ya simuladas. Si las entradas no están en la
+    caché, solo se recalcula lo que cambió respecto a la simulación anterior
+    del mismo hilo (simular_colision_incremental).
+    
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+    
+    Returns:
+        tuple: (imagen_png, texto_analisis, datos_simulacion)
+    """
+    clave = normalizar_clave_simulacion(
+        masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+        tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+    )
+    if clave is not None:
+        guardado = cache_simulaciones.obtener(clave)
+        if guardado is not None:
+            imagen_png, analisis_texto, datos_simulacion = guardado
+            return imagen_png, analisis_texto, copy.deepcopy(datos_simulacion)
+    
+    imagen_png, analisis_texto, datos_simulacion = simular_colision_incremental(
+        masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+        tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+    )
+    if imagen_png is None:
+        # Los errores no se guardan en la caché
+        return None, analisis_texto, datos_simulacion
+    
+    if clave is not None:
+        tamano = len(imagen_png) + len(analisis_texto.encode('utf-8'))
+        cache_simulaciones.guardar(clave, (imagen_png, analisis_texto, copy.deepcopy(datos_simulacion)), tamano)
+    return imagen_png, analisis_texto, datos_simulacion
+
+# =============================================================================
+# IMÁGENES POR NIVEL DE RESOLUCIÓN
+# =============================================================================
+# El gráfico se puede pedir ya rasterizado a una resolución fija, en PNG o
+# WebP, con un tamaño de respuesta predecible. La huella (ETag) se calcula a
+# partir de las entradas, sin dibujar nada, así que una vista repetida se
+# responde con 304 sin tocar matplotlib.
+
+# DPI de cada nivel para la figura completa (18×16 pulgadas)
+NIVELES_DPI = {
+    'miniatura': 30,    # 540×480 px
+    'pantalla': 100,    # 1800×1600 px, la resolución de la interfaz
+    'impresion': 200    # 3600×3200 px
+}
+TIPOS_IMAGEN = {'png': 'image/png', 'webp': 'image/webp'}
+
+# Súbela cuando cambie el aspecto de los gráficos: invalida las huellas ya servidas
+VERSION_GRAFICOS = 1
+
+cache_imagenes = CacheLRU(max_entradas=256, max_bytes=128 * 1024 * 1024)
+
+def _validar_nivel_formato(nivel, formato):
+    if nivel not in NIVELES_DPI:
+        raise ValueError(f"Nivel de resolución no válido: {nivel} (usa {', '.join(NIVELES_DPI)})")
+    if formato not in TIPOS_IMAGEN:
+        raise ValueError(f"Formato de imagen no válido: {formato} (usa {', '.join(TIPOS_IMAGEN)})")
+
+def huella_imagen(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual, nivel='pantalla', formato='png'):
+    """
+    Calcula la huella (ETag) de una imagen sin renderizarla
+    
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+        nivel (str): Clave de NIVELES_DPI
+        formato (str): Clave de TIPOS_IMAGEN
+    
+    Returns:
+        str: Huella hexadecimal, o None si las entradas no son números
+    """
+    _validar_nivel_formato(nivel, formato)
+    clave = normalizar_clave_simulacion(
+        masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+        tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+    )
+    if clave is None:
+        return None
+    return hashlib.blake2b(repr((VERSION_GRAFICOS, clave, nivel, formato)).encode('utf-8'), digest_size=16).hexdigest()
+
+def renderizar_imagen_simulacion(masa_cuerpo, velocidad_kmh, usar_tiempos_manuales, tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual, nivel='pantalla', formato='png'):
+    """
+    Devuelve el gráfico de la simulación rasterizado a un nivel de resolución
+    
+    El nivel pantalla en PNG comparte la caché de simular_colision_en_cache; el
+    resto se guarda en cache_imagenes. La figura es una plantilla prestada: se
+    rasteriza en el momento y se devuelve, sin dejar figuras vivas por petición.
+    
+    Args:
+        masa_cuerpo (float): Masa del cuerpo en kg
+        velocidad_kmh (float): Velocidad inicial en km/h
+        usar_tiempos_manuales (bool): Si usar tiempos manuales o calculados
+        tiempo_con_cinturon_manual (float): Tiempo manual con cinturón
+        tiempo_sin_cinturon_manual (float): Tiempo manual sin cinturón
+        nivel (str): Clave de NIVELES_DPI
+        formato (str): Clave de TIPOS_IMAGEN
+    
+    Returns:
+        tuple: (imagen, mensaje_error); imagen es None si las entradas no son válidas
+    
+    Raises:
+        ValueError: Si el nivel o el formato no existen
+    """
+    _validar_nivel_formato(nivel, formato)
+    if nivel == 'pantalla' and formato == 'png':
+        imagen, mensaje, _ = simular_colision_en_cache(
+            masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+            tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+        )
+        return imagen, mensaje
+    
+    clave_simulacion = normalizar_clave_simulacion(
+        masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+        tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+    )
+    clave = (clave_simulacion, nivel, formato)
+    if clave_simulacion is not None:
+        imagen = cache_imagenes.obtener(clave)
+        if imagen is not None:
+            return imagen, ""
+    
+    datos_simulacion, mensaje_error = calcular_datos_simulacion(
+        masa_cuerpo, velocidad_kmh, usar_tiempos_manuales,
+        tiempo_con_cinturon_manual, tiempo_sin_cinturon_manual
+    )
+    if datos_simulacion is None:
+        return None, mensaje_error
+    from graficos import crear_graficos, figura_a_bytes
+    with medir_etapa('graficos'):
+        fig = crear_graficos(*perfiles_simulacion(datos_simulacion), reutilizar_figura=True)
+    with medir_etapa('png'):
+        imagen = figura_a_bytes(fig, formato, NIVELES_DPI[nivel], liberar=True)
+    if clave_simulacion is not None:
+        cache_imagenes.guardar(clave, imagen, len(imagen))
+    return imagen, ""
+
+# =============================================================================
+# CÁLCULO VECTORIZADO POR LOTES
+# =============================================================================
+# Versiones en NumPy de los cálculos anteriores: procesan miles de escenarios
+# en una sola pasada, sin gráficos ni textos, y marcan los escenarios inválidos
+# con una máscara booleana en lugar de cortar la ejecución.
+
+def calcular_tiempo_detencion_realista_lote(velocidades_ms, tipo_impacto):
+    """
+    Versión vectorizada de calcular_tiempo_detencion_realista
+    
+    Args:
+        velocidades_ms (array-like): Velocidades en m/s
+        tipo_impacto (str): "sin_cinturon" o "con_cinturon"
+    
+    Returns:
+        np.ndarray: Tiempos de detención en segundos
+    """
+    velocidades_ms = np.asarray(velocidades_ms, dtype=np.float64)
+    tiempo_base = np.maximum(0.01, 0.015 + velocidades_ms * 0.002)
+    if tipo_impacto == "sin_cinturon":
+        return tiempo_base
+    else:  # con_cinturon
+        factor_extension = 4 + (velocidades_ms / 30)
+        return tiempo_base * factor_extension
+
+def calcular_parametros_fisica_lote(masas_cuerpo, velocidades_ms, tiempos_detencion):
+    """
+    Versión vectorizada de calcular_parametros_fisica
+    
+    Los escenarios con tiempo de detención no positivo producen NaN en lugar
+    de lanzar una excepción.
+    
+    Args:
+        masas_cuerpo (array-like): Masas en kg
+        velocidades_ms (array-like): Velocidades en m/s
+        tiempos_detencion (array-like): Tiempos de detención en segundos
+    
+    Returns:
+        dict: Diccionario de arrays con las mismas claves que calcular_parametros_fisica
+    """
+    masas_cuerpo, velocidades_ms, tiempos_detencion = np.broadcast_arrays(
+        np.asarray(masas_cuerpo, dtype=np.float64),
+        np.asarray(velocidades_ms, dtype=np.float64),
+        np.asarray(tiempos_detencion, dtype=np.float64)
+    )
+    tiempos_validos = np.where(tiempos_detencion > 0, tiempos_detencion, np.nan)
+    
+    aceleracion = -velocidades_ms / tiempos_validos
+    fuerza = masas_cuerpo * aceleracion
+    g_force = aceleracion / 9.81
+    
+    return {
+        'aceleracion': aceleracion,
+        'fuerza': fuerza,
+        'g_force': g_force,
+        'tiempo': tiempos_validos
+    }
+
+def validar_parametros_lote(masas_cuerpo, velocidades_kmh, tiempos_sin_cinturon=None, tiempos_con_cinturon=None):
+    """
+    Versión vectorizada de validar_parametros
+    
+    Args:
+        masas_cuerpo (array-like): Masas en kg
+        velocidades_kmh (array-like): Velocidades en km/h
+        tiempos_sin_cinturon (array-like, optional): Tiempos sin cinturón
+        tiempos_con_cinturon (array-like, optional): Tiempos con cinturón
+    
+    Returns:
+        np.ndarray: Máscara booleana, True para los escenarios válidos
+    """
+    masas_cuerpo = np.asarray(masas_cuerpo, dtype=np.float64)
+    velocidades_kmh = np.asarray(velocidades_kmh, dtype=np.float64)
+    # Las comparaciones con NaN dan False, así que también descartan valores no numéricos
+    valido = (masas_cuerpo > 0) & (velocidades_kmh > 0) & np.isfinite(masas_cuerpo) & np.isfinite(velocidades_kmh)
+    
+    if tiempos_sin_cinturon is not None and tiempos_con_cinturon is not None:
+        tiempos_sin_cinturon = np.asarray(tiempos_sin_cinturon, dtype=np.float64)
+        tiempos_con_cinturon = np.asarray(tiempos_con_cinturon, dtype=np.float64)
+        valido &= (tiempos_sin_cinturon > 0) & (tiempos_con_cinturon > 0)
+        valido &= np.isfinite(tiempos_sin_cinturon) & np.isfinite(tiempos_con_cinturon)
+    
+    return valido
+
+def simular_colision_lote(masas_cuerpo, velocidades_kmh, tiempos_sin_cinturon_manual=None, tiempos_con_cinturon_manual=None):
+    """
+    Ejecuta la simulación de colisión para muchos escenarios a la vez.
+    
+    A diferencia de simular_colision, no genera gráficos ni análisis textual.
+    Si se pasan ambos arrays de tiempos manuales se usa el modo manual; en caso
+    contrario los tiempos se calculan con el modelo realista. Los escenarios
+    inválidos quedan marcados en 'valido' y sus resultados son NaN.
+    
+    Args:
+        masas_cuerpo (array-like): Masas de los cuerpos en kg
+        velocidades_kmh (array-like): Velocidades iniciales en km/h
+        tiempos_sin_cinturon_manual (array-like, optional): Tiempos manuales sin cinturón
+        tiempos_con_cinturon_manual (array-like, optional): Tiempos manuales con cinturón
+    
+    Returns:
+        dict: Resultados en columnas, con la misma estructura que datos_simulacion
+    """
+    usar_tiempos_manuales = tiempos_sin_cinturon_manual is not None and tiempos_con_cinturon_manual is not None
+    
+    if usar_tiempos_manuales:
+        masas_cuerpo, velocidades_kmh, tiempos_sin, tiempos_con = np.broadcast_arrays(
+            np.asarray(masas_cuerpo, dtype=np.float64),
+            np.asarray(velocidades_kmh, dtype=np.float64),
+            np.asarray(tiempos_sin_cinturon_manual, dtype=np.float64),
+            np.asarray(tiempos_con_cinturon_manual, dtype=np.float64)
+        )
+        valido = validar_parametros_lote(masas_cuerpo, velocidades_kmh, tiempos_sin, tiempos_con)
+    else:
+        masas_cuerpo, velocidades_kmh = np.broadcast_arrays(
+            np.asarray(masas_cuerpo, dtype=np.float64),
+            np.asarray(velocidades_kmh, dtype=np.float64)
+        )
+        valido = validar_parametros_lote(masas_cuerpo, velocidades_kmh)
+    
+    # Los escenarios inválidos se propagan como NaN en todos los resultados
+    velocidades_ms = np.where(valido, velocidades_kmh * 1000 / 3600, np.nan)
+    
+    if usar_tiempos_manuales:
+        tiempo_sin_cinturon = np.where(valido, tiempos_sin, np.nan)
+        tiempo_con_cinturon = np.where(valido, tiempos_con, np.nan)
+        modo_calculo = "manual"
+    else:
+        tiempo_sin_cinturon = calcular_tiempo_detencion_realista_lote(velocidades_ms, "sin_cinturon")
+        tiempo_con_cinturon = calcular_tiempo_detencion_realista_lote(velocidades_ms, "con_cinturon")
+        modo_calculo = "realista"
+    
+    parametros_sin = calcular_parametros_fisica_lote(masas_cuerpo, velocidades_ms, tiempo_sin_cinturon)
+    parametros_con = calcular_parametros_fisica_lote(masas_cuerpo, velocidades_ms, tiempo_con_cinturon)
+    
+    return {
+        'valido': valido,
+        'masa_cuerpo': masas_cuerpo,
+        'velocidad_kmh': velocidades_kmh,
+        'velocidad_ms': velocidades_ms,
+        'modo_calculo': modo_calculo,
+        'parametros_sin': parametros_sin,
+        'parametros_con': parametros_con,
+        'tiempo_sin_cinturon': parametros_sin['tiempo'],
+        'tiempo_con_cinturon': parametros_con['tiempo']
+    }
+
+def _combinar_lotes(manual, realista, es_manual):
+    if isinstance(manual, dict):
+        return {clave: _combinar_lotes(manual[clave], realista[clave], es_manual) for clave in manual}
+    if isinstance(manual, np.ndarray):
+        return np.where(es_manual, manual, realista)
+    return manual
+
+def simular_colision_lote_mixto(masas_cuerpo, velocidades_kmh, tiempos_sin_cinturon_manual, tiempos_con_cinturon_manual, usar_tiempos_manuales):
+    """
+    Igual que simular_colision_lote, pero cada escenario elige su modo de cálculo
+    
+    Args:
+        masas_cuerpo (array-like): Masas de los cuerpos en kg
+        velocidades_kmh (array-like): Velocidades iniciales en km/h
+        tiempos_sin_cinturon_manual (array-like): Tiempos manuales sin cinturón (NaN si no hay)
+        tiempos_con_cinturon_manual (array-like): Tiempos manuales con cinturón (NaN si no hay)
+        usar_tiempos_manuales (array-like): Máscara booleana, True para los escenarios en modo manual
+    
+    Returns:
+        dict: Como simular_colision_lote, con 'modo_calculo' como array por escenario
+    """
+    es_manual = np.asarray(usar_tiempos_manuales, dtype=bool)
+    if es_manual.all():
+        resultado = simular_colision_lote(masas_cuerpo, velocidades_kmh, tiempos_sin_cinturon_manual, tiempos_con_cinturon_manual)
+    elif not es_manual.any():
+        resultado = simular_colision_lote(masas_cuerpo, velocidades_kmh)
+    else:
+        resultado = _combinar_lotes(
+            simular_colision_lote(masas_cuerpo, velocidades_kmh, tiempos_sin_cinturon_manual, tiempos_con_cinturon_manual),
+            simular_colision_lote(masas_cuerpo, velocidades_kmh),
+            es_manual
+        )
+    resultado['modo_calculo'] = np.where(es_manual, "manual", "realista")
+    return resultado
+
+def determinar_nivel_riesgo_lote(g_force):
+    """
+    Versión vectorizada de textos.determinar_nivel_riesgo, sin emoji
+    
+    Args:
+        g_force (array-like): Fuerzas G
+    
+    Returns:
+        np.ndarray: Niveles "CRÍTICO", "ALTO" o "MODERADO" (None donde g_force es NaN)
+    """
+    from textos import UMBRAL_G_ALTO, UMBRAL_G_CRITICO
+    g_abs = np.abs(np.asarray(g_force, dtype=np.float64))
+    niveles = np.select([g_abs > UMBRAL_G_CRITICO, g_abs > UMBRAL_G_ALTO], ["CRÍTICO", "ALTO"], "MODERADO").astype(object)
+    niveles[np.isnan(g_abs)] = None
+    return niveles
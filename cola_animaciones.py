@@ -0,0 +1,413 @@
+# cola_animaciones.py
+# =============================================================================
+# COLA_ANIMACIONES.PY - MÓDULO DE LA COLA DE TRABAJOS DE ANIMACIÓN
+# =============================================================================
+# Este módulo contiene una cola acotada de trabajos de animación atendida por
+# hilos en segundo plano. Enviar un trabajo devuelve su identificador al
+# momento; la interfaz y la API consultan después su estado. Un trabajo nuevo
+# de una sesión cancela el anterior de esa misma sesión, y si la cola está
+# llena se rechaza con ColaLlena en lugar de esperar sin límite. Con todos los
+# trabajadores ocupados, los trabajos nuevos se generan en vista previa. No
+# importa matplotlib: animacion se carga al ejecutar el primer trabajo.
+#
+# Comprobación rápida (sin renderizar nada):
+#   python cola_animaciones.py
+
+import itertools
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+
+# Trabajos en cola o en curso a la vez; por encima se responde "ocupado"
+MAX_TRABAJOS_ANIMACION = int(os.environ.get("MAX_TRABAJOS_ANIMACION", 8))
+# Hilos que ejecutan trabajos (cada trabajo renderiza dos animaciones en procesos aparte)
+TRABAJADORES_ANIMACION = int(os.environ.get("TRABAJADORES_ANIMACION", 2))
+# Nivel de los trabajos enviados con la cola cargada (el de animacion.CALIDAD_BAJO_CARGA)
+CALIDAD_BAJO_CARGA = 'vista_previa'
+# Trabajos terminados que se conservan para poder consultar su estado
+MAX_TRABAJOS_GUARDADOS = 256
+
+ESTADOS_FINALES = ('completado', 'cancelado', 'error')
+
+class ColaLlena(Exception):
+    """
+    Se lanza al enviar un trabajo cuando la cola ya tiene el máximo de trabajos
+    """
+
+class TrabajoAnimacion:
+    """
+    Un encargo de generar las dos animaciones de una simulación.
+
+    Estados: en_cola → en_curso → completado, cancelado o error. En los
+    streams, 'resultado' (las rutas de las listas HLS) está disponible desde
+    que el trabajo empieza, para reproducirlas mientras se generan.
+    """
+
+    def __init__(self, perfil_sin, perfil_con, sesion=None, salida='stream', calidad=None):
+        """
+        Args:
+            perfil_sin (PerfilPulso): Pulso sin cinturón
+            perfil_con (PerfilPulso): Pulso con cinturón
+            sesion (str, optional): Sesión que lo pide (sus trabajos anteriores se cancelan)
+            salida (str): "stream" (listas HLS) o "video" (archivos MP4)
+            calidad (str, optional): Nivel de calidad pedido (ver animacion.elegir_calidad)
+        """
+        self.id = uuid.uuid4().hex[:16]
+        self.perfil_sin = perfil_sin
+        self.perfil_con = perfil_con
+        self.sesion = sesion
+        self.salida = salida
+        self.calidad_pedida = calidad
+        self.calidad = None
+        self.estado = 'en_cola'
+        self.resultado = None
+        self.error = None
+        self.creado = time.time()
+        self.iniciado = None
+        self.terminado = None
+        self.cancelar = threading.Event()
+
+    def resumen(self, posicion=None):
+        """
+        Devuelve el estado del trabajo serializable a JSON
+
+        Args:
+            posicion (int, optional): Posición en la cola (1 = el siguiente)
+
+        Returns:
+            dict: id, estado, posición, salida, calidades, resultado, error y tiempos
+        """
+        return {
+            'id': self.id,
+            'estado': self.estado,
+            'posicion': posicion,
+            'salida': self.salida,
+            'calidad_pedida': self.calidad_pedida,
+            'calidad': self.calidad,
+            'resultado': list(self.resultado) if self.resultado is not None else None,
+            'error': self.error,
+            'segundos_en_cola': ((self.iniciado or time.time()) - self.creado),
+            'segundos_en_curso': ((self.terminado or time.time()) - self.iniciado) if self.iniciado else None
+        }
+
+def ejecutar_trabajo(trabajo, cola):
+    """
+    Genera las animaciones de un trabajo, atendiendo a su cancelación
+
+    Los vídeos MP4 se renderizan en paralelo y se abandonan al cancelar. Los
+    streams se lanzan, se publican en trabajo.resultado y se espera a que
+    terminen; al cancelar se terminan sus procesos, salvo que otro trabajo en
+    curso esté generando el mismo stream.
+
+    Args:
+        trabajo (TrabajoAnimacion): Trabajo a ejecutar
+        cola (ColaAnimaciones): Cola a la que pertenece
+    """
+    import animacion
+    from calculos_fisica import OPCIONES_STREAM
+    if trabajo.calidad is None:
+        trabajo.calidad = animacion.elegir_calidad(trabajo.calidad_pedida)
+    if trabajo.salida == 'video':
+        trabajo.resultado = animacion.generar_animaciones_colision(
+            trabajo.perfil_sin, trabajo.perfil_con, en_paralelo=True,
+            calidad=trabajo.calidad, cancelar=trabajo.cancelar
+        )
+        return
+
+    rutas = animacion.generar_animaciones_colision(
+        trabajo.perfil_sin, trabajo.perfil_con, opciones_animacion=OPCIONES_STREAM,
+        salida='stream', calidad=trabajo.calidad
+    )
+    trabajo.resultado = rutas
+    for ruta in rutas:
+        while True:
+            # Primero si sigue en curso: si el proceso ya terminó, la marca de completo ya está escrita
+            en_curso = animacion.stream_en_curso(ruta)
+            if animacion.stream_completo(ruta):
+                break
+            if not en_curso:
+                raise RuntimeError("La generación de la animación se interrumpió")
+            if trabajo.cancelar.wait(animacion.INTERVALO_CANCELACION_S):
+                for ruta_cancelada in rutas:
+                    if not cola.stream_compartido(ruta_cancelada, trabajo):
+                        animacion.cancelar_stream(ruta_cancelada)
+                raise animacion.AnimacionCancelada("Se canceló la generación de las animaciones")
+
+class ColaAnimaciones:
+    """
+    Cola acotada de trabajos de animación, segura entre hilos.
+
+    Los hilos trabajadores se crean con el primer envío. Cada sesión tiene como
+    mucho un trabajo activo: enviar otro cancela el anterior, esté en cola o en
+    curso. La calidad se elige al enviar, según la carga de la propia cola: un
+    trabajo que tendría que esperar a que se libere un trabajador se genera en
+    CALIDAD_BAJO_CARGA, así que los que esperan nunca son renders completos.
+    """
+
+    def __init__(self, max_trabajos=MAX_TRABAJOS_ANIMACION, trabajadores=TRABAJADORES_ANIMACION, ejecutar=None,
+                 max_calidad_completa=None):
+        """
+        Args:
+            max_trabajos (int): Trabajos en cola o en curso admitidos a la vez
+            trabajadores (int): Hilos que ejecutan trabajos
+            ejecutar (callable, optional): Recibe (trabajo, cola) y genera las
+                animaciones (por defecto, ejecutar_trabajo)
+            max_calidad_completa (int, optional): Trabajos activos a partir de
+                los que los nuevos bajan a CALIDAD_BAJO_CARGA (por defecto, el
+                número de trabajadores)
+        """
+        if max_trabajos < 1 or trabajadores < 1:
+            raise ValueError("El máximo de trabajos y el número de trabajadores deben ser al menos 1")
+        self.max_trabajos = max_trabajos
+        self.trabajadores = trabajadores
+        self.max_calidad_completa = trabajadores if max_calidad_completa is None else max_calidad_completa
+        self._ejecutar = ejecutar or ejecutar_trabajo
+        self._pendientes = deque()
+        self._trabajos = OrderedDict()  # id -> trabajo, del más antiguo al más reciente
+        self._por_sesion = {}           # sesión -> id de su último trabajo
+        self._condicion = threading.Condition()
+        self._hilos = []
+        self.enviados = 0
+        self.rechazados = 0
+        self.bajo_carga = 0
+        self.completados = 0
+        self.cancelados = 0
+        self.errores = 0
+
+    def _activos(self):
+        # Trabajos que ocupan plaza: en cola, o en curso sin cancelar
+        return len(self._pendientes) + sum(
+            trabajo.estado == 'en_curso' and not trabajo.cancelar.is_set() for trabajo in self._trabajos.values()
+        )
+
+    def _terminar(self, trabajo, estado):
+        trabajo.estado = estado
+        trabajo.terminado = time.time()
+        if estado == 'completado':
+            self.completados += 1
+        elif estado == 'cancelado':
+            self.cancelados += 1
+        else:
+            self.errores += 1
+
+    def _cancelar(self, trabajo):
+        if trabajo.estado == 'en_cola':
+            self._pendientes.remove(trabajo)
+            self._terminar(trabajo, 'cancelado')
+        elif trabajo.estado == 'en_curso':
+            # El trabajador lo abandona y lo marca como cancelado
+            trabajo.cancelar.set()
+
+    def _recortar_terminados(self):
+        sobrantes = len(self._trabajos) - MAX_TRABAJOS_GUARDADOS
+        for clave in [clave for clave, trabajo in self._trabajos.items() if trabajo.estado in ESTADOS_FINALES]:
+            if sobrantes <= 0:
+                break
+            trabajo = self._trabajos.pop(clave)
+            if self._por_sesion.get(trabajo.sesion) == clave:
+                del self._por_sesion[trabajo.sesion]
+            sobrantes -= 1
+
+    def _arrancar_trabajadores(self):
+        contador = itertools.count(len(self._hilos))
+        while len(self._hilos) < self.trabajadores:
+            hilo = threading.Thread(target=self._trabajar, name=f'animacion-{next(contador)}', daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+
+    def _trabajar(self):
+        while True:
+            with self._condicion:
+                while not self._pendientes:
+                    self._condicion.wait()
+                trabajo = self._pendientes.popleft()
+                trabajo.estado = 'en_curso'
+                trabajo.iniciado = time.time()
+            try:
+                self._ejecutar(trabajo, self)
+                estado = 'cancelado' if trabajo.cancelar.is_set() else 'completado'
+            except Exception as e:
+                if trabajo.cancelar.is_set():
+                    estado = 'cancelado'
+                else:
+                    estado = 'error'
+                    trabajo.error = f"❌ Error al generar animaciones: {str(e)}"
+            with self._condicion:
+                self._terminar(trabajo, estado)
+
+    def enviar(self, perfil_sin, perfil_con, sesion=None, salida='stream', calidad=None):
+        """
+        Encola un trabajo y vuelve al momento, sin esperar a que empiece
+
+        Args:
+            perfil_sin (PerfilPulso): Pulso sin cinturón
+            perfil_con (PerfilPulso): Pulso con cinturón
+            sesion (str, optional): Sesión que lo pide; cancela su trabajo anterior
+            salida (str): "stream" (listas HLS) o "video" (archivos MP4)
+            calidad (str, optional): Nivel de calidad pedido
+
+        Returns:
+            TrabajoAnimacion: Trabajo encolado; su calidad ya es
+                CALIDAD_BAJO_CARGA si la cola estaba cargada
+
+        Raises:
+            ColaLlena: Si ya hay max_trabajos trabajos en cola o en curso
+        """
+        if salida not in ('stream', 'video'):
+            raise ValueError(f"Salida desconocida: {salida}")
+        with self._condicion:
+            # El trabajo anterior de la sesión deja su plaza antes de contar las libres
+            anterior = self._trabajos.get(self._por_sesion.get(sesion)) if sesion is not None else None
+            if anterior is not None:
+                self._cancelar(anterior)
+            activos = self._activos()
+            if activos >= self.max_trabajos:
+                self.rechazados += 1
+                raise ColaLlena(f"⏳ Servidor ocupado: ya hay {self.max_trabajos} animaciones en marcha. "
+                                "Inténtalo de nuevo en unos segundos")
+            trabajo = TrabajoAnimacion(perfil_sin, perfil_con, sesion, salida, calidad)
+            if activos >= self.max_calidad_completa:
+                trabajo.calidad = CALIDAD_BAJO_CARGA
+                self.bajo_carga += 1
+            self._pendientes.append(trabajo)
+            self._trabajos[trabajo.id] = trabajo
+            if sesion is not None:
+                self._por_sesion[sesion] = trabajo.id
+            self.enviados += 1
+            self._recortar_terminados()
+            self._arrancar_trabajadores()
+            self._condicion.notify()
+        return trabajo
+
+    def consultar(self, id_trabajo):
+        """
+        Devuelve el estado de un trabajo
+
+        Args:
+            id_trabajo (str): Identificador devuelto por enviar
+
+        Returns:
+            dict: Resumen del trabajo (ver TrabajoAnimacion.resumen), o None si no existe
+        """
+        with self._condicion:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None:
+                return None
+            posicion = self._pendientes.index(trabajo) + 1 if trabajo.estado == 'en_cola' else None
+            return trabajo.resumen(posicion)
+
+    def cancelar(self, id_trabajo):
+        """
+        Cancela un trabajo en cola o en curso
+
+        Args:
+            id_trabajo (str): Identificador del trabajo
+
+        Returns:
+            bool: False si el trabajo no existe
+        """
+        with self._condicion:
+            trabajo = self._trabajos.get(id_trabajo)
+            if trabajo is None:
+                return False
+            self._cancelar(trabajo)
+            return True
+
+    def cancelar_sesion(self, sesion):
+        """
+        Cancela el trabajo activo de una sesión, si lo tiene
+
+        Args:
+            sesion (str): Sesión
+
+        Returns:
+            bool: True si había un trabajo que cancelar
+        """
+        with self._condicion:
+            trabajo = self._trabajos.get(self._por_sesion.get(sesion))
+            if trabajo is None or trabajo.estado in ESTADOS_FINALES:
+                return False
+            self._cancelar(trabajo)
+            return True
+
+    def stream_compartido(self, ruta_lista, excluido):
+        """
+        Indica si otro trabajo en curso está usando un stream (los streams se
+        nombran por su contenido y dos sesiones pueden pedir el mismo)
+
+        Args:
+            ruta_lista (str): Ruta de la lista HLS
+            excluido (TrabajoAnimacion): Trabajo que no cuenta (el que se cancela)
+
+        Returns:
+            bool: True si otro trabajo sin cancelar lo está generando o reproduciendo
+        """
+        with self._condicion:
+            return any(
+                trabajo is not excluido and trabajo.estado == 'en_curso' and not trabajo.cancelar.is_set()
+                and trabajo.resultado is not None and ruta_lista in trabajo.resultado
+                for trabajo in self._trabajos.values()
+            )
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores de la cola
+
+        Returns:
+            dict: Trabajos en cola y en curso, límites y contadores de enviados,
+                rechazados, bajados a vista previa, completados, cancelados y con error
+        """
+        with self._condicion:
+            return {
+                'en_cola': len(self._pendientes),
+                'en_curso': sum(trabajo.estado == 'en_curso' for trabajo in self._trabajos.values()),
+                'max_trabajos': self.max_trabajos,
+                'trabajadores': self.trabajadores,
+                'max_calidad_completa': self.max_calidad_completa,
+                'enviados': self.enviados,
+                'rechazados': self.rechazados,
+                'bajo_carga': self.bajo_carga,
+                'completados': self.completados,
+                'cancelados': self.cancelados,
+                'errores': self.errores
+            }
+
+cola_animaciones = ColaAnimaciones()
+
+def main():
+    """
+    Comprueba con trabajos simulados que la cola baja a vista previa y
+    rechaza al llenarse
+
+    Returns:
+        int: Código de salida
+    """
+    liberar = threading.Event()
+    cola = ColaAnimaciones(max_trabajos=MAX_TRABAJOS_ANIMACION, trabajadores=TRABAJADORES_ANIMACION,
+                           ejecutar=lambda trabajo, cola: liberar.wait())
+    try:
+        calidades = [cola.enviar(None, None, calidad='alta').calidad for _ in range(cola.max_trabajos)]
+        try:
+            cola.enviar(None, None)
+            rechazado = False
+        except ColaLlena:
+            rechazado = True
+    finally:
+        liberar.set()
+    completos = cola.max_calidad_completa
+    esperadas = [None] * completos + [CALIDAD_BAJO_CARGA] * (len(calidades) - completos)
+    if calidades != esperadas:
+        print(f"❌ Calidades al llenar la cola: {calidades}")
+        return 1
+    if not rechazado:
+        print("❌ La cola llena no rechazó el trabajo")
+        return 1
+    print(f"✅ {completos} trabajos con la calidad pedida, {len(calidades) - completos} en "
+          f"{CALIDAD_BAJO_CARGA} y el siguiente rechazado")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,68 +3,179 @@
 # =============================================================================
 # Este módulo contiene todas las funciones para crear gráficos
 
+import hashlib
+import io
+import re
 import numpy as np
-import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import LogNorm
+from matplotlib.figure import Figure, SubplotParams
+from registro_figuras import registro_figuras
+from textos import UMBRAL_G_ALTO, UMBRAL_G_CRITICO
 
-# Configurar matplotlib
-plt.rcParams['figure.facecolor'] = 'white'
-plt.rcParams['axes.facecolor'] = 'white'
+def nueva_figura(figsize, dpi=None):
+    """
+    Crea una figura independiente de pyplot, con fondo blanco y su propio lienzo Agg.
+    
+    No se usa la máquina de estados de pyplot: cada figura es un objeto aislado,
+    así que varios hilos pueden crear y renderizar figuras a la vez, y la figura
+    se libera en cuanto deja de estar referenciada. Queda anotada en
+    registro_figuras, que cuenta las figuras vivas y, si se supera el límite,
+    cierra las plantillas libres más antiguas.
+    
+    Args:
+        figsize (tuple): Tamaño en pulgadas (ancho, alto)
+        dpi (float, optional): Resolución en puntos por pulgada (por defecto, la de matplotlib)
+    
+    Returns:
+        matplotlib.figure.Figure: Figura nueva
+    """
+    fig = Figure(figsize=figsize, dpi=dpi, facecolor='white')
+    FigureCanvasAgg(fig)
+    registro_figuras.registrar(fig)
+    return fig
+
+def liberar_figura(fig):
+    """
+    Libera una figura ya renderizada: una plantilla queda libre para otra
+    petición y cualquier otra figura se cierra
+    
+    Args:
+        fig (matplotlib.figure.Figure): Figura que ya no se va a usar
+    """
+    registro_figuras.liberar(fig)
+
+def _etiquetas_fuerza(serie, es_modelo):
+    pico_sin, pico_con = serie['picos']
+    marca_sin, marca_con = serie['marcas']
+    if es_modelo:
+        return [f'Sin Cinturón (pico {pico_sin:,.0f} N)', f'Con Cinturón (pico {pico_con:,.0f} N)',
+                f'Pico s/c: {marca_sin:.3f}s', f'Pico c/c: {marca_con:.3f}s']
+    return [f'Sin Cinturón ({pico_sin:,.0f} N)', f'Con Cinturón ({pico_con:,.0f} N)',
+            f'Fin impacto s/c: {marca_sin:.3f}s', f'Fin impacto c/c: {marca_con:.3f}s']
+
+def _etiquetas_aceleracion(serie, es_modelo):
+    pico_sin, pico_con = serie['picos']
+    if es_modelo:
+        return [f'Sin Cinturón (pico {pico_sin:.1f} m/s²)', f'Con Cinturón (pico {pico_con:.1f} m/s²)']
+    return [f'Sin Cinturón ({pico_sin:.1f} m/s²)', f'Con Cinturón ({pico_con:.1f} m/s²)']
 
-def crear_grafico_fuerza_tiempo(ax, t_sin, f_sin, t_con, f_con):
+def serie_temporal(perfil_sin, perfil_con, respuesta_ocupante=None, magnitud='fuerza'):
+    """
+    Devuelve las curvas a dibujar en un gráfico de evolución temporal
+    
+    Sin respuesta_ocupante son los pulsos rectangulares de los perfiles, con
+    solo sus vértices (magnitud constante hasta el tiempo de detención). Con
+    ella se usan las historias del modelo de cinturón
+    (modelo_cinturon.simular_respuesta_ocupante) y las líneas verticales
+    marcan el instante del pico.
+    
+    Args:
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        respuesta_ocupante (dict, optional): Respuesta temporal del ocupante
+        magnitud (str): "fuerza" o "aceleracion"
+    
+    Returns:
+        dict: tiempos y curvas de cada caso, marcas verticales, picos y límite del eje X
+    """
+    if respuesta_ocupante is None:
+        t_sin, t_con = perfil_sin.tiempo_detencion, perfil_con.tiempo_detencion
+        tiempo_max = max(t_sin, t_con) * 1.5
+        tiempo_sin, y_sin = perfil_sin.escalon(magnitud, tiempo_max)
+        tiempo_con, y_con = perfil_con.escalon(magnitud, tiempo_max)
+        return {
+            'tiempo_sin': tiempo_sin,
+            'y_sin': y_sin,
+            'tiempo_con': tiempo_con,
+            'y_con': y_con,
+            'marcas': (t_sin, t_con),
+            'picos': (perfil_sin.valor(magnitud), perfil_con.valor(magnitud)),
+            'tiempo_max': tiempo_max
+        }
+    
+    tiempo = respuesta_ocupante['t']
+    sin, con = respuesta_ocupante['sin'], respuesta_ocupante['con']
+    curva_sin, curva_con = sin[magnitud], con[magnitud]
+    # Recortar el eje X al tramo con carga (más un margen)
+    umbral = 0.01 * max(curva_sin.max(), curva_con.max(), 1e-12)
+    con_carga = np.nonzero((curva_sin > umbral) | (curva_con > umbral))[0]
+    tiempo_max = tiempo[con_carga[-1]] * 1.2 if len(con_carga) else tiempo[-1]
+    return {
+        'tiempo_sin': tiempo,
+        'y_sin': curva_sin,
+        'tiempo_con': tiempo,
+        'y_con': curva_con,
+        'marcas': (sin['tiempo_pico'], con['tiempo_pico']),
+        'picos': (curva_sin.max(), curva_con.max()),
+        'tiempo_max': tiempo_max
+    }
+
+def crear_grafico_fuerza_tiempo(ax, perfil_sin, perfil_con, respuesta_ocupante=None):
     """
     Crea el gráfico de evolución de fuerza vs tiempo
     
     Args:
         ax: Subplot de matplotlib
-        t_sin, f_sin: Tiempo y fuerza sin cinturón
-        t_con, f_con: Tiempo y fuerza con cinturón
-    """
-    tiempo_max = max(t_sin, t_con) * 1.5
-    tiempo_sin = np.linspace(0, tiempo_max, 1000)
-    tiempo_con = np.linspace(0, tiempo_max, 1000)
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        respuesta_ocupante (dict, optional): Historias del modelo de cinturón a
+            dibujar en lugar de los pulsos rectangulares
     
-    fuerza_sin_array = np.where(tiempo_sin <= t_sin, f_sin, 0)
-    fuerza_con_array = np.where(tiempo_con <= t_con, f_con, 0)
+    Returns:
+        dict: Artistas del gráfico, para actualizarlos en modo plantilla
+    """
+    serie = serie_temporal(perfil_sin, perfil_con, respuesta_ocupante, 'fuerza')
+    etiquetas = _etiquetas_fuerza(serie, respuesta_ocupante is not None)
+    tiempo_max = serie['tiempo_max']
+    marca_sin, marca_con = serie['marcas']
     
-    ax.plot(tiempo_sin, fuerza_sin_array, 'r-', linewidth=3, label=f'Sin Cinturón ({f_sin:,.0f} N)')
-    ax.plot(tiempo_con, fuerza_con_array, 'b-', linewidth=3, label=f'Con Cinturón ({f_con:,.0f} N)')
-    ax.axvline(x=t_sin, color='red', linestyle='--', alpha=0.7, label=f'Fin impacto s/c: {t_sin:.3f}s')
-    ax.axvline(x=t_con, color='blue', linestyle='--', alpha=0.7, label=f'Fin impacto c/c: {t_con:.3f}s')
+    linea_sin, = ax.plot(serie['tiempo_sin'], serie['y_sin'], 'r-', linewidth=3, label=etiquetas[0])
+    linea_con, = ax.plot(serie['tiempo_con'], serie['y_con'], 'b-', linewidth=3, label=etiquetas[1])
+    fin_sin = ax.axvline(x=marca_sin, color='red', linestyle='--', alpha=0.7, label=etiquetas[2])
+    fin_con = ax.axvline(x=marca_con, color='blue', linestyle='--', alpha=0.7, label=etiquetas[3])
     
     ax.set_xlabel('Tiempo (segundos)', fontsize=12)
     ax.set_ylabel('Fuerza (Newtons)', fontsize=12)
     ax.set_title('⏱️ Evolución de la Fuerza Durante el Impacto', fontsize=14)
-    ax.legend()
+    leyenda = ax.legend()
     ax.grid(True, linestyle='--', alpha=0.7)
     ax.set_xlim(0, tiempo_max)
+    
+    return {'lineas': [linea_sin, linea_con], 'fines': [fin_sin, fin_con], 'leyenda': leyenda}
 
-def crear_grafico_aceleracion_tiempo(ax, t_sin, a_sin, t_con, a_con):
+def crear_grafico_aceleracion_tiempo(ax, perfil_sin, perfil_con, respuesta_ocupante=None):
     """
     Crea el gráfico de evolución de aceleración vs tiempo
     
     Args:
         ax: Subplot de matplotlib
-        t_sin, a_sin: Tiempo y aceleración sin cinturón
-        t_con, a_con: Tiempo y aceleración con cinturón
-    """
-    tiempo_max = max(t_sin, t_con) * 1.5
-    tiempo_sin = np.linspace(0, tiempo_max, 1000)
-    tiempo_con = np.linspace(0, tiempo_max, 1000)
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        respuesta_ocupante (dict, optional): Historias del modelo de cinturón a
+            dibujar en lugar de los pulsos rectangulares
     
-    aceleracion_sin_array = np.where(tiempo_sin <= t_sin, a_sin, 0)
-    aceleracion_con_array = np.where(tiempo_con <= t_con, a_con, 0)
+    Returns:
+        dict: Artistas del gráfico, para actualizarlos en modo plantilla
+    """
+    serie = serie_temporal(perfil_sin, perfil_con, respuesta_ocupante, 'aceleracion')
+    etiquetas = _etiquetas_aceleracion(serie, respuesta_ocupante is not None)
+    tiempo_max = serie['tiempo_max']
+    marca_sin, marca_con = serie['marcas']
     
-    ax.plot(tiempo_sin, aceleracion_sin_array, 'r-', linewidth=3, label=f'Sin Cinturón ({a_sin:.1f} m/s²)')
-    ax.plot(tiempo_con, aceleracion_con_array, 'b-', linewidth=3, label=f'Con Cinturón ({a_con:.1f} m/s²)')
-    ax.axvline(x=t_sin, color='red', linestyle='--', alpha=0.7)
-    ax.axvline(x=t_con, color='blue', linestyle='--', alpha=0.7)
+    linea_sin, = ax.plot(serie['tiempo_sin'], serie['y_sin'], 'r-', linewidth=3, label=etiquetas[0])
+    linea_con, = ax.plot(serie['tiempo_con'], serie['y_con'], 'b-', linewidth=3, label=etiquetas[1])
+    fin_sin = ax.axvline(x=marca_sin, color='red', linestyle='--', alpha=0.7)
+    fin_con = ax.axvline(x=marca_con, color='blue', linestyle='--', alpha=0.7)
     
     ax.set_xlabel('Tiempo (segundos)', fontsize=12)
     ax.set_ylabel('Aceleración (m/s²)', fontsize=12)
     ax.set_title('🚀 Evolución de la Aceleración Durante el Impacto', fontsize=14)
-    ax.legend()
+    leyenda = ax.legend()
     ax.grid(True, linestyle='--', alpha=0.7)
     ax.set_xlim(0, tiempo_max)
+    
+    return {'lineas': [linea_sin, linea_con], 'fines': [fin_sin, fin_con], 'leyenda': leyenda}
 
 def crear_grafico_barras_fuerza(ax, f_sin, f_con):
     """
@@ -73,6 +184,9 @@ def crear_grafico_barras_fuerza(ax, f_sin, f_con):
     Args:
         ax: Subplot de matplotlib
         f_sin, f_con: Fuerzas sin y con cinturón
+    
+    Returns:
+        dict: Artistas del gráfico, para actualizarlos en modo plantilla
     """
     bars = ax.bar(['Sin Cinturón', 'Con Cinturón'], [f_sin, f_con], 
                   color=['#ff6b6b', '#4ecdc4'], alpha=0.8)
@@ -81,9 +195,12 @@ def crear_grafico_barras_fuerza(ax, f_sin, f_con):
     ax.grid(axis='y', linestyle='--', alpha=0.7)
     
     # Añadir valores encima de las barras
+    textos = []
     for bar, value in zip(bars, [f_sin, f_con]):
-        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01 * max(f_sin, f_con), 
-                f'{value:,.0f} N', ha='center', va='bottom', fontsize=11, weight='bold')
+        textos.append(ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01 * max(f_sin, f_con), 
+                              f'{value:,.0f} N', ha='center', va='bottom', fontsize=11, weight='bold'))
+    
+    return {'barras': list(bars), 'textos': textos}
 
 def crear_grafico_barras_g_force(ax, g_sin, g_con):
     """
@@ -92,6 +209,9 @@ def crear_grafico_barras_g_force(ax, g_sin, g_con):
     Args:
         ax: Subplot de matplotlib
         g_sin, g_con: Fuerzas G sin y con cinturón
+    
+    Returns:
+        dict: Artistas del gráfico, para actualizarlos en modo plantilla
     """
     bars = ax.bar(['Sin Cinturón', 'Con Cinturón'], [g_sin, g_con], 
                   color=['#ff6b6b', '#4ecdc4'], alpha=0.8)
@@ -100,14 +220,17 @@ def crear_grafico_barras_g_force(ax, g_sin, g_con):
     ax.grid(axis='y', linestyle='--', alpha=0.7)
     
     # Líneas de referencia para niveles de peligro
-    ax.axhline(y=20, color='orange', linestyle='--', alpha=0.7, label='Umbral Alto (20G)')
-    ax.axhline(y=50, color='red', linestyle='--', alpha=0.7, label='Umbral Crítico (50G)')
+    ax.axhline(y=UMBRAL_G_ALTO, color='orange', linestyle='--', alpha=0.7, label=f'Umbral Alto ({UMBRAL_G_ALTO}G)')
+    ax.axhline(y=UMBRAL_G_CRITICO, color='red', linestyle='--', alpha=0.7, label=f'Umbral Crítico ({UMBRAL_G_CRITICO}G)')
     ax.legend()
     
     # Añadir valores encima de las barras
+    textos = []
     for bar, value in zip(bars, [g_sin, g_con]):
-        ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01 * max(g_sin, g_con), 
-                f'{value:.1f} G', ha='center', va='bottom', fontsize=11, weight='bold')
+        textos.append(ax.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 0.01 * max(g_sin, g_con), 
+                              f'{value:.1f} G', ha='center', va='bottom', fontsize=11, weight='bold'))
+    
+    return {'barras': list(bars), 'textos': textos}
 
 def crear_grafico_comparacion_completa(ax, t_sin, f_sin, a_sin, t_con, f_con, a_con):
     """
@@ -117,6 +240,9 @@ def crear_grafico_comparacion_completa(ax, t_sin, f_sin, a_sin, t_con, f_con, a_
         ax: Subplot de matplotlib
         t_sin, f_sin, a_sin: Tiempo, fuerza y aceleración sin cinturón
         t_con, f_con, a_con: Tiempo, fuerza y aceleración con cinturón
+    
+    Returns:
+        dict: Artistas del gráfico, para actualizarlos en modo plantilla
     """
     # Calcular fuerzas G
     g_sin = a_sin / 9.81
@@ -143,6 +269,7 @@ def crear_grafico_comparacion_completa(ax, t_sin, f_sin, a_sin, t_con, f_con, a_
     ax.grid(axis='y', linestyle='--', alpha=0.7)
     
     # Añadir valores encima de cada barra
+    textos_sin, textos_con = [], []
     for i, (bar_sin, bar_con, val_sin, val_con) in enumerate(zip(bars_sin, bars_con, valores_sin, valores_con)):
         # Formatear valores según el tipo
         if i == 0:  # Fuerza
@@ -158,39 +285,480 @@ def crear_grafico_comparacion_completa(ax, t_sin, f_sin, a_sin, t_con, f_con, a_
             format_sin = f'{val_sin:.3f}'
             format_con = f'{val_con:.3f}'
         
-        ax.text(bar_sin.get_x() + bar_sin.get_width()/2, bar_sin.get_height() + 0.01 * max(max(valores_sin), max(valores_con)), 
-                format_sin, ha='center', va='bottom', fontsize=10, weight='bold')
-        ax.text(bar_con.get_x() + bar_con.get_width()/2, bar_con.get_height() + 0.01 * max(max(valores_sin), max(valores_con)), 
-                format_con, ha='center', va='bottom', fontsize=10, weight='bold')
+        textos_sin.append(ax.text(bar_sin.get_x() + bar_sin.get_width()/2, bar_sin.get_height() + 0.01 * max(max(valores_sin), max(valores_con)), 
+                                  format_sin, ha='center', va='bottom', fontsize=10, weight='bold'))
+        textos_con.append(ax.text(bar_con.get_x() + bar_con.get_width()/2, bar_con.get_height() + 0.01 * max(max(valores_sin), max(valores_con)), 
+                                  format_con, ha='center', va='bottom', fontsize=10, weight='bold'))
+    
+    return {'barras_sin': list(bars_sin), 'barras_con': list(bars_con), 'textos_sin': textos_sin, 'textos_con': textos_con}
 
-def crear_graficos(t_sin, f_sin, a_sin, t_con, f_con, a_con):
+def crear_graficos(perfil_sin, perfil_con, reutilizar_figura=False, respuesta_ocupante=None):
     """
     Función principal que crea todos los gráficos de la simulación
     
     Args:
-        t_sin, f_sin, a_sin: Tiempo, fuerza y aceleración sin cinturón
-        t_con, f_con, a_con: Tiempo, fuerza y aceleración con cinturón
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        reutilizar_figura (bool): Si es True, toma prestada una figura plantilla
+            libre y solo actualiza sus datos. Hay que devolverla con
+            liberar_figura (o figura_a_png(..., liberar=True)) tras renderizarla;
+            si no se devuelve, se descarta al dejar de estar referenciada.
+        respuesta_ocupante (dict, optional): Historias del modelo de cinturón; si
+            se indica, los gráficos de evolución temporal las muestran en lugar
+            de los pulsos rectangulares
     
     Returns:
         matplotlib.figure.Figure: Figura completa con todos los gráficos
     """
+    if reutilizar_figura:
+        return actualizar_figura_plantilla(perfil_sin, perfil_con, respuesta_ocupante)
+    
     # Crear figura con 5 subgráficos
-    fig = plt.figure(figsize=(18, 16))
+    fig = nueva_figura((18, 16))
+    _dibujar_graficos(fig, perfil_sin, perfil_con, respuesta_ocupante)
+    return fig
+
+def _magnitudes(perfil_sin, perfil_con):
+    """
+    Devuelve (t_sin, f_sin, a_sin, t_con, f_con, a_con) en valor absoluto
+    """
+    return (perfil_sin.tiempo_detencion, perfil_sin.valor('fuerza'), perfil_sin.valor('aceleracion'),
+            perfil_con.tiempo_detencion, perfil_con.valor('fuerza'), perfil_con.valor('aceleracion'))
+
+def _dibujar_graficos(fig, perfil_sin, perfil_con, respuesta_ocupante=None):
+    """
+    Dibuja los cinco gráficos de la simulación sobre una figura vacía
+    
+    Args:
+        fig (matplotlib.figure.Figure): Figura de destino
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        respuesta_ocupante (dict, optional): Historias del modelo de cinturón
+    
+    Returns:
+        tuple: (ejes, artistas) de cada uno de los cinco gráficos
+    """
+    t_sin, f_sin, a_sin, t_con, f_con, a_con = _magnitudes(perfil_sin, perfil_con)
     fig.suptitle('🚗 Análisis Completo de Impacto Vehicular', fontsize=18, weight='bold')
     
     # Definir el grid de subplots
-    ax1 = plt.subplot(3, 2, 1)  # Fuerza vs tiempo
-    ax2 = plt.subplot(3, 2, 2)  # Aceleración vs tiempo
-    ax3 = plt.subplot(3, 2, 3)  # Comparación fuerzas (barras)
-    ax4 = plt.subplot(3, 2, 4)  # Fuerzas G (barras)
-    ax5 = plt.subplot(3, 1, 3)  # Gráfico de comparación (ocupa toda la fila inferior)
+    ax1 = fig.add_subplot(3, 2, 1)  # Fuerza vs tiempo
+    ax2 = fig.add_subplot(3, 2, 2)  # Aceleración vs tiempo
+    ax3 = fig.add_subplot(3, 2, 3)  # Comparación fuerzas (barras)
+    ax4 = fig.add_subplot(3, 2, 4)  # Fuerzas G (barras)
+    ax5 = fig.add_subplot(3, 1, 3)  # Gráfico de comparación (ocupa toda la fila inferior)
 
     # Crear cada gráfico
-    crear_grafico_fuerza_tiempo(ax1, t_sin, f_sin, t_con, f_con)
-    crear_grafico_aceleracion_tiempo(ax2, t_sin, a_sin, t_con, a_con)
-    crear_grafico_barras_fuerza(ax3, f_sin, f_con)
-    crear_grafico_barras_g_force(ax4, a_sin / 9.81, a_con / 9.81)
-    crear_grafico_comparacion_completa(ax5, t_sin, f_sin, a_sin, t_con, f_con, a_con)
-
-    plt.tight_layout(rect=[0, 0, 1, 0.95])
-    return fig
\ No newline at end of file
+    artistas = [
+        crear_grafico_fuerza_tiempo(ax1, perfil_sin, perfil_con, respuesta_ocupante),
+        crear_grafico_aceleracion_tiempo(ax2, perfil_sin, perfil_con, respuesta_ocupante),
+        crear_grafico_barras_fuerza(ax3, f_sin, f_con),
+        crear_grafico_barras_g_force(ax4, a_sin / 9.81, a_con / 9.81),
+        crear_grafico_comparacion_completa(ax5, t_sin, f_sin, a_sin, t_con, f_con, a_con)
+    ]
+
+    fig.tight_layout(rect=[0, 0, 1, 0.95])
+    return [ax1, ax2, ax3, ax4, ax5], artistas
+
+# =============================================================================
+# MODO PLANTILLA
+# =============================================================================
+# La figura de 18×16 pulgadas se construye una sola vez y se guarda como
+# plantilla en registro_figuras. En las llamadas siguientes se toma prestada
+# una plantilla libre y solo se actualizan los datos de las líneas, las alturas
+# de las barras, las líneas verticales y los textos, se reescalan únicamente
+# los ejes que cambiaron. El tight_layout solo se repite si cambió algo que
+# ocupa margen (la forma de las marcas de los ejes, títulos y etiquetas): es la
+# parte más cara de la actualización y, si no, daría los mismos márgenes.
+# Cuántas plantillas hay depende de las peticiones simultáneas, no del número
+# de hilos del servidor.
+
+# Fracción del eje junto a cada borde en la que la etiqueta de una marca puede
+# sobresalir del eje y mover los márgenes del tight_layout
+MARGEN_BORDE_MARCAS = 0.1
+_CIFRAS = re.compile(r'[0-9]')
+
+def _huella_respuesta(respuesta_ocupante):
+    """
+    Resume las historias del modelo de cinturón en un valor comparable (None sin modelo)
+    """
+    if respuesta_ocupante is None:
+        return None
+    resumen = hashlib.blake2b(digest_size=16)
+    resumen.update(np.ascontiguousarray(respuesta_ocupante['t']).tobytes())
+    for clave in ('sin', 'con'):
+        resumen.update(np.ascontiguousarray(respuesta_ocupante[clave]['fuerza']).tobytes())
+        resumen.update(np.ascontiguousarray(respuesta_ocupante[clave]['aceleracion']).tobytes())
+    return resumen.digest()
+
+def _entradas_por_grafico(perfil_sin, perfil_con, respuesta_ocupante=None):
+    """
+    Devuelve las entradas de las que depende cada uno de los cinco gráficos
+    
+    Las historias del modelo de cinturón se representan por su huella, para
+    poder comparar entradas sin comparar arrays.
+    """
+    t_sin, f_sin, a_sin, t_con, f_con, a_con = _magnitudes(perfil_sin, perfil_con)
+    huella = _huella_respuesta(respuesta_ocupante)
+    return [
+        (t_sin, f_sin, t_con, f_con, huella),
+        (t_sin, a_sin, t_con, a_con, huella),
+        (f_sin, f_con),
+        (a_sin / 9.81, a_con / 9.81),
+        (t_sin, f_sin, a_sin, t_con, f_con, a_con)
+    ]
+
+def _huella_maquetacion(fig):
+    """
+    Resume lo que ocupa margen en el tight_layout de una figura, sin dibujar:
+    títulos y etiquetas de los ejes y, de cada eje, la forma de los textos de
+    sus marcas visibles (con las cifras cambiadas por 0, porque todas miden lo
+    mismo) y su texto de desplazamiento. En el eje X cuentan además las marcas
+    de los extremos si caen cerca del borde, porque su etiqueta sobresale a los
+    lados; en el eje Y lo que sobresale queda dentro del título o de las
+    etiquetas del eje X.
+    """
+    huella = [fig.get_suptitle()]
+    for ax in fig.axes:
+        huella.extend((ax.get_title(), ax.get_xlabel(), ax.get_ylabel()))
+        for eje in (ax.xaxis, ax.yaxis):
+            minimo, maximo = sorted(eje.get_view_interval())
+            tolerancia = 1e-9 * (maximo - minimo)
+            marcas = [marca for marca in eje.get_majorticklocs() if minimo - tolerancia <= marca <= maximo + tolerancia]
+            formateador = eje.get_major_formatter()
+            formas = [_CIFRAS.sub('0', texto) for texto in formateador.format_ticks(marcas)]
+            huella.append(frozenset(formas))
+            huella.append(formateador.get_offset())
+            if eje is ax.xaxis:
+                for marca, forma in zip(marcas[:1] + marcas[-1:], formas[:1] + formas[-1:]):
+                    posicion = (marca - minimo) / (maximo - minimo)
+                    if min(posicion, 1 - posicion) < MARGEN_BORDE_MARCAS:
+                        huella.append((forma, round(posicion, 4)))
+    return tuple(huella)
+
+def _reescalar_eje_y(ax):
+    """
+    Recalcula los límites de datos de un eje y reescala solo el eje Y
+    """
+    ax.relim()
+    ax.autoscale_view(scalex=False)
+
+def _actualizar_serie_temporal(ax, artistas, serie, etiquetas):
+    """
+    Actualiza un gráfico de evolución temporal (fuerza o aceleración) creado previamente
+    
+    Args:
+        ax: Subplot de matplotlib
+        artistas (dict): Artistas devueltos al crear el gráfico
+        serie (dict): Curvas devueltas por serie_temporal
+        etiquetas (list): Nuevas etiquetas de la leyenda, en orden
+    """
+    linea_sin, linea_con = artistas['lineas']
+    linea_sin.set_data(serie['tiempo_sin'], serie['y_sin'])
+    linea_con.set_data(serie['tiempo_con'], serie['y_con'])
+    for fin, marca in zip(artistas['fines'], serie['marcas']):
+        fin.set_xdata([marca, marca])
+    
+    for texto, etiqueta in zip(artistas['leyenda'].get_texts(), etiquetas):
+        texto.set_text(etiqueta)
+    
+    ax.set_xlim(0, serie['tiempo_max'])
+    _reescalar_eje_y(ax)
+
+def actualizar_grafico_fuerza_tiempo(ax, artistas, perfil_sin, perfil_con, respuesta_ocupante=None):
+    """
+    Actualiza en el lugar el gráfico de fuerza vs tiempo
+    
+    Args:
+        ax: Subplot de matplotlib
+        artistas (dict): Artistas devueltos por crear_grafico_fuerza_tiempo
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        respuesta_ocupante (dict, optional): Historias del modelo de cinturón
+    """
+    serie = serie_temporal(perfil_sin, perfil_con, respuesta_ocupante, 'fuerza')
+    _actualizar_serie_temporal(ax, artistas, serie, _etiquetas_fuerza(serie, respuesta_ocupante is not None))
+
+def actualizar_grafico_aceleracion_tiempo(ax, artistas, perfil_sin, perfil_con, respuesta_ocupante=None):
+    """
+    Actualiza en el lugar el gráfico de aceleración vs tiempo
+    
+    Args:
+        ax: Subplot de matplotlib
+        artistas (dict): Artistas devueltos por crear_grafico_aceleracion_tiempo
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        respuesta_ocupante (dict, optional): Historias del modelo de cinturón
+    """
+    serie = serie_temporal(perfil_sin, perfil_con, respuesta_ocupante, 'aceleracion')
+    _actualizar_serie_temporal(ax, artistas, serie, _etiquetas_aceleracion(serie, respuesta_ocupante is not None))
+
+def _actualizar_barras(barras, textos, valores, formatos, margen):
+    """
+    Actualiza la altura de unas barras y la posición y contenido de sus textos
+    
+    Args:
+        barras (list): Rectángulos de las barras
+        textos (list): Textos situados encima de cada barra
+        valores (list): Nuevas alturas
+        formatos (list): Texto a mostrar sobre cada barra
+        margen (float): Separación vertical entre barra y texto
+    """
+    for bar, texto, valor, formato in zip(barras, textos, valores, formatos):
+        bar.set_height(valor)
+        texto.set_position((bar.get_x() + bar.get_width()/2, valor + margen))
+        texto.set_text(formato)
+
+def actualizar_grafico_barras_fuerza(ax, artistas, f_sin, f_con):
+    """
+    Actualiza en el lugar el gráfico de barras de fuerzas
+    
+    Args:
+        ax: Subplot de matplotlib
+        artistas (dict): Artistas devueltos por crear_grafico_barras_fuerza
+        f_sin, f_con: Fuerzas sin y con cinturón
+    """
+    _actualizar_barras(artistas['barras'], artistas['textos'], [f_sin, f_con],
+                       [f'{f_sin:,.0f} N', f'{f_con:,.0f} N'], 0.01 * max(f_sin, f_con))
+    _reescalar_eje_y(ax)
+
+def actualizar_grafico_barras_g_force(ax, artistas, g_sin, g_con):
+    """
+    Actualiza en el lugar el gráfico de barras de fuerzas G
+    
+    Args:
+        ax: Subplot de matplotlib
+        artistas (dict): Artistas devueltos por crear_grafico_barras_g_force
+        g_sin, g_con: Fuerzas G sin y con cinturón
+    """
+    _actualizar_barras(artistas['barras'], artistas['textos'], [g_sin, g_con],
+                       [f'{g_sin:.1f} G', f'{g_con:.1f} G'], 0.01 * max(g_sin, g_con))
+    _reescalar_eje_y(ax)
+
+def actualizar_grafico_comparacion_completa(ax, artistas, t_sin, f_sin, a_sin, t_con, f_con, a_con):
+    """
+    Actualiza en el lugar el gráfico de comparación completa
+    
+    Args:
+        ax: Subplot de matplotlib
+        artistas (dict): Artistas devueltos por crear_grafico_comparacion_completa
+        t_sin, f_sin, a_sin: Tiempo, fuerza y aceleración sin cinturón
+        t_con, f_con, a_con: Tiempo, fuerza y aceleración con cinturón
+    """
+    valores_sin = [f_sin/1000, a_sin, a_sin / 9.81, t_sin]
+    valores_con = [f_con/1000, a_con, a_con / 9.81, t_con]
+    formatos = ['{:.1f}', '{:.1f}', '{:.1f}', '{:.3f}']
+    margen = 0.01 * max(max(valores_sin), max(valores_con))
+    
+    _actualizar_barras(artistas['barras_sin'], artistas['textos_sin'], valores_sin,
+                       [f.format(v) for f, v in zip(formatos, valores_sin)], margen)
+    _actualizar_barras(artistas['barras_con'], artistas['textos_con'], valores_con,
+                       [f.format(v) for f, v in zip(formatos, valores_con)], margen)
+    _reescalar_eje_y(ax)
+
+def actualizar_figura_plantilla(perfil_sin, perfil_con, respuesta_ocupante=None):
+    """
+    Presta una figura plantilla con los datos actualizados.
+    
+    Si no hay ninguna plantilla libre se construye la figura completa; si la
+    hay, solo se modifican los gráficos cuyas entradas cambiaron. El
+    tight_layout se repite desde los márgenes por defecto solo si cambió lo
+    que ocupa margen (_huella_maquetacion); si no, se conservan los márgenes
+    ya calculados, que coinciden con los de una figura nueva salvo redondeos
+    de milésimas de píxel. La plantilla es exclusiva de quien la recibe hasta
+    que la devuelve con liberar_figura.
+    
+    Args:
+        perfil_sin (PerfilPulso): Pulso sin cinturón
+        perfil_con (PerfilPulso): Pulso con cinturón
+        respuesta_ocupante (dict, optional): Historias del modelo de cinturón
+    
+    Returns:
+        matplotlib.figure.Figure: Figura plantilla prestada
+    """
+    entradas = _entradas_por_grafico(perfil_sin, perfil_con, respuesta_ocupante)
+    plantilla = registro_figuras.prestar_plantilla('graficos')
+    
+    if plantilla is None:
+        fig = nueva_figura((18, 16))
+        ejes, artistas = _dibujar_graficos(fig, perfil_sin, perfil_con, respuesta_ocupante)
+        registro_figuras.guardar_plantilla('graficos', {'figura': fig, 'ejes': ejes, 'artistas': artistas, 'entradas': entradas,
+                                                        'maquetacion': _huella_maquetacion(fig)})
+        return fig
+    
+    actualizadores = [
+        actualizar_grafico_fuerza_tiempo,
+        actualizar_grafico_aceleracion_tiempo,
+        actualizar_grafico_barras_fuerza,
+        actualizar_grafico_barras_g_force,
+        actualizar_grafico_comparacion_completa
+    ]
+    # Las series temporales reciben los perfiles y las historias; el resto, sus magnitudes
+    serie = (perfil_sin, perfil_con, respuesta_ocupante)
+    argumentos = [serie, serie] + entradas[2:]
+    actualizados = False
+    for i, actualizar in enumerate(actualizadores):
+        if entradas[i] != plantilla['entradas'][i]:
+            actualizar(plantilla['ejes'][i], plantilla['artistas'][i], *argumentos[i])
+            actualizados = True
+    if actualizados:
+        fig = plantilla['figura']
+        maquetacion = _huella_maquetacion(fig)
+        if maquetacion != plantilla['maquetacion']:
+            # Desde los márgenes por defecto, como en una figura nueva: tight_layout
+            # parte de las posiciones actuales y no siempre llega al mismo resultado
+            fig.subplots_adjust(**vars(SubplotParams()))
+            fig.tight_layout(rect=[0, 0, 1, 0.95])
+            plantilla['maquetacion'] = maquetacion
+    plantilla['entradas'] = entradas
+    return plantilla['figura']
+
+def crear_mapa_calor_barrido(resultado_barrido, indice_tiempo=None):
+    """
+    Crea los mapas de calor de un barrido de parámetros con contornos de iso-riesgo
+    
+    Args:
+        resultado_barrido (dict): Resultado de barrido.ejecutar_barrido
+        indice_tiempo (int, optional): Índice del tiempo de detención para el mapa de fuerza
+                                       (por defecto, el tiempo central del eje)
+    
+    Returns:
+        matplotlib.figure.Figure: Figura con los mapas de calor
+    """
+    masas = resultado_barrido['masas']
+    velocidades = resultado_barrido['velocidades_kmh']
+    tiempos = resultado_barrido['tiempos_detencion']
+    if indice_tiempo is None:
+        indice_tiempo = len(tiempos) // 2
+    
+    # Las fuerzas G no dependen de la masa: basta con la primera fila del eje de masas
+    g_force = np.abs(resultado_barrido['g_force'][0])
+    fuerza = np.abs(resultado_barrido['fuerza'][:, :, indice_tiempo])
+    
+    fig = nueva_figura((18, 7))
+    ax1, ax2 = fig.subplots(1, 2)
+    fig.suptitle('🗺️ Mapa de Riesgo del Barrido de Parámetros', fontsize=18, weight='bold')
+    
+    # Fuerzas G: velocidad × tiempo de detención (escala logarítmica de color)
+    g_visible = np.clip(g_force.T, 0.1, None)
+    malla_g = ax1.pcolormesh(velocidades, tiempos, g_visible, cmap='inferno', shading='auto',
+                             norm=LogNorm(vmin=np.nanmin(g_visible), vmax=np.nanmax(g_visible)))
+    fig.colorbar(malla_g, ax=ax1, label='Fuerzas G')
+    if len(velocidades) > 1 and len(tiempos) > 1:
+        contornos = ax1.contour(velocidades, tiempos, g_force.T, levels=[UMBRAL_G_ALTO, UMBRAL_G_CRITICO],
+                                colors=['orange', 'red'], linestyles='--', linewidths=2)
+        ax1.clabel(contornos, fmt={UMBRAL_G_ALTO: f'Umbral Alto ({UMBRAL_G_ALTO}G)',
+                                   UMBRAL_G_CRITICO: f'Umbral Crítico ({UMBRAL_G_CRITICO}G)'}, fontsize=10)
+    ax1.set_xlabel('Velocidad Inicial (km/h)', fontsize=12)
+    ax1.set_ylabel('Tiempo de Detención (s)', fontsize=12)
+    ax1.set_yscale('log')
+    ax1.set_title('🌍 Fuerzas G por Velocidad y Tiempo de Detención', fontsize=14)
+    
+    # Fuerza: masa × velocidad para un tiempo de detención fijo
+    malla_f = ax2.pcolormesh(velocidades, masas, fuerza / 1000, cmap='viridis', shading='auto')
+    fig.colorbar(malla_f, ax=ax2, label='Fuerza (kN)')
+    ax2.set_xlabel('Velocidad Inicial (km/h)', fontsize=12)
+    ax2.set_ylabel('Masa del Cuerpo (kg)', fontsize=12)
+    ax2.set_title(f'💥 Fuerza de Impacto con Δt = {tiempos[indice_tiempo]:.3f}s', fontsize=14)
+    
+    fig.tight_layout(rect=[0, 0, 1, 0.93])
+    return fig
+
+def crear_grafico_monte_carlo(resultado_monte_carlo):
+    """
+    Crea la distribución de fuerzas G y las probabilidades de riesgo de una simulación Monte Carlo
+
+    Los histogramas se dibujan a partir de los bosquejos de cuantiles (sus
+    cubetas logarítmicas), sin guardar las muestras.
+
+    Args:
+        resultado_monte_carlo (dict): Resultado de monte_carlo.ejecutar_monte_carlo
+
+    Returns:
+        matplotlib.figure.Figure: Figura con el histograma y las probabilidades
+    """
+    bosquejos = resultado_monte_carlo['bosquejos']
+    estadisticas = resultado_monte_carlo['estadisticas']
+    excedencias = resultado_monte_carlo['excedencias']
+
+    fig = nueva_figura((18, 6))
+    ax1, ax2 = fig.subplots(1, 2, gridspec_kw={'width_ratios': [2, 1]})
+    fig.suptitle(f'🎲 Monte Carlo: {resultado_monte_carlo["validas"]:,} escenarios', fontsize=18, weight='bold')
+
+    # Histograma de |G| en escala logarítmica, en % de escenarios
+    minimo = max(min(estadisticas[m]['minimo'] for m in ('g_sin', 'g_con')), 1e-3)
+    maximo = max(estadisticas[m]['maximo'] for m in ('g_sin', 'g_con'))
+    bordes = np.geomspace(minimo, maximo * 1.0001, 61)
+    for magnitud, etiqueta, color in (('g_sin', 'Sin Cinturón', '#ff6b6b'), ('g_con', 'Con Cinturón', '#4ecdc4')):
+        bosquejo = bosquejos[magnitud]
+        indices = np.flatnonzero(bosquejo.conteos)
+        ax1.hist(bosquejo.valor_cubeta(indices), bins=bordes, weights=bosquejo.conteos[indices] * 100 / bosquejo.n,
+                 color=color, alpha=0.6, label=etiqueta)
+    ax1.axvline(x=UMBRAL_G_ALTO, color='orange', linestyle='--', alpha=0.7, label=f'Umbral Alto ({UMBRAL_G_ALTO}G)')
+    ax1.axvline(x=UMBRAL_G_CRITICO, color='red', linestyle='--', alpha=0.7, label=f'Umbral Crítico ({UMBRAL_G_CRITICO}G)')
+    ax1.set_xscale('log')
+    ax1.set_xlabel('Fuerzas G', fontsize=12)
+    ax1.set_ylabel('% de escenarios', fontsize=12)
+    ax1.set_title('🌍 Distribución de Fuerzas G', fontsize=14)
+    ax1.grid(True, linestyle='--', alpha=0.7)
+    ax1.legend()
+
+    # Probabilidad de superar cada umbral
+    posiciones = np.arange(2)
+    for desplazamiento, caso, etiqueta, color in ((-0.2, 'sin', 'Sin Cinturón', '#ff6b6b'), (0.2, 'con', 'Con Cinturón', '#4ecdc4')):
+        probabilidades = [excedencias[caso][u]['probabilidad'] * 100 for u in (UMBRAL_G_ALTO, UMBRAL_G_CRITICO)]
+        barras = ax2.bar(posiciones + desplazamiento, probabilidades, width=0.4, color=color, alpha=0.8, label=etiqueta)
+        for bar, valor in zip(barras, probabilidades):
+            ax2.text(bar.get_x() + bar.get_width()/2, bar.get_height() + 1, f'{valor:.1f}%',
+                     ha='center', va='bottom', fontsize=11, weight='bold')
+    ax2.set_xticks(posiciones, [f'> {UMBRAL_G_ALTO}G', f'> {UMBRAL_G_CRITICO}G'])
+    ax2.set_ylim(0, 110)
+    ax2.set_ylabel('Probabilidad (%)', fontsize=12)
+    ax2.set_title('⚠️ Probabilidad de Superar los Umbrales', fontsize=14)
+    ax2.grid(axis='y', linestyle='--', alpha=0.7)
+    ax2.legend()
+
+    fig.tight_layout(rect=[0, 0, 1, 0.93])
+    return fig
+
+# Opciones de Pillow por formato: WebP sin pérdida ocupa ~3,4 veces menos que
+# PNG con estos gráficos de colores planos
+OPCIONES_FORMATO = {'webp': {'lossless': True}}
+
+def figura_a_bytes(fig, formato='png', dpi=None, liberar=False):
+    """
+    Renderiza una figura a bytes en el formato indicado
+    
+    Args:
+        fig (matplotlib.figure.Figure): Figura a renderizar
+        formato (str): Formato de matplotlib ("png", "webp", ...)
+        dpi (float, optional): Resolución de salida (por defecto, la de la figura)
+        liberar (bool): Si liberar la figura después (ver liberar_figura)
+    
+    Returns:
+        bytes: Imagen codificada
+    """
+    buffer = io.BytesIO()
+    try:
+        fig.savefig(buffer, format=formato, dpi=dpi, pil_kwargs=OPCIONES_FORMATO.get(formato))
+        if dpi is not None and dpi != fig.dpi:
+            # El búfer de píxeles a otra resolución no se reutiliza: un lienzo nuevo lo suelta
+            FigureCanvasAgg(fig)
+    finally:
+        if liberar:
+            liberar_figura(fig)
+    return buffer.getvalue()
+
+def figura_a_png(fig, dpi=None, liberar=False):
+    """
+    Renderiza una figura a bytes PNG
+    
+    Args:
+        fig (matplotlib.figure.Figure): Figura a renderizar
+        dpi (float, optional): Resolución de salida (por defecto, la de la figura)
+        liberar (bool): Si liberar la figura después (ver liberar_figura)
+    
+    Returns:
+        bytes: Imagen PNG
+    """
+    return figura_a_bytes(fig, 'png', dpi, liberar)
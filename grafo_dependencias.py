@@ -0,0 +1,123 @@
+# grafo_dependencias.py
+# =============================================================================
+# GRAFO_DEPENDENCIAS.PY - MÓDULO DE EVALUACIÓN INCREMENTAL
+# =============================================================================
+# Este módulo contiene un grafo de dependencias pequeño con nodos memorizados:
+# cada nodo recuerda los valores de sus dependencias y el resultado de su
+# última evaluación, y solo se recalcula si alguna dependencia cambió. Si un
+# nodo se recalcula pero produce el mismo valor que antes, los nodos que
+# dependen de él tampoco se recalculan (corte temprano).
+
+import numpy as np
+
+def mismo_valor(a, b):
+    """
+    Compara dos valores de nodo, incluidos dicts, tuplas y arrays de NumPy
+
+    Args:
+        a, b: Valores a comparar
+
+    Returns:
+        bool: True si son iguales
+    """
+    if a is b:
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, np.ndarray):
+        return a.shape == b.shape and np.array_equal(a, b)
+    if isinstance(a, dict):
+        return a.keys() == b.keys() and all(mismo_valor(a[clave], b[clave]) for clave in a)
+    if isinstance(a, (tuple, list)):
+        return len(a) == len(b) and all(mismo_valor(x, y) for x, y in zip(a, b))
+    return a == b
+
+class GrafoDependencias:
+    """
+    Grafo de nodos memorizados que se evalúa bajo demanda.
+
+    Los nodos hoja son las entradas: se pasan en cada evaluación. El resto se
+    declara con agregar_nodo y guarda solo su último resultado, así que la
+    memoria no crece con el número de evaluaciones. No es seguro entre hilos:
+    se usa un grafo por hilo.
+    """
+
+    def __init__(self):
+        self._nodos = {}     # nombre -> (funcion, dependencias)
+        self._memoria = {}   # nombre -> (valores de las dependencias, resultado)
+
+    def agregar_nodo(self, nombre, funcion, dependencias=()):
+        """
+        Declara un nodo calculado
+
+        Args:
+            nombre (str): Nombre del nodo
+            funcion (callable): Recibe los valores de las dependencias, en orden
+            dependencias (tuple): Nombres de los nodos o entradas de los que depende
+        """
+        if nombre in self._nodos:
+            raise ValueError(f"El nodo {nombre} ya existe")
+        self._nodos[nombre] = (funcion, tuple(dependencias))
+
+    def evaluacion(self, entradas):
+        """
+        Empieza una evaluación con unos valores de entrada
+
+        Args:
+            entradas (dict): Valor de cada nodo hoja
+
+        Returns:
+            Evaluacion: Objeto para pedir valores de nodos con esas entradas
+        """
+        return Evaluacion(self, entradas)
+
+    def olvidar(self):
+        """
+        Descarta todos los resultados memorizados
+        """
+        self._memoria.clear()
+
+class Evaluacion:
+    """
+    Una pasada por el grafo con unas entradas concretas.
+
+    Cada nodo se resuelve como mucho una vez por evaluación; los nodos que
+    nadie pide no se evalúan. 'recalculados' lista los nodos que tuvieron que
+    ejecutar su función (el resto reutilizó su resultado memorizado).
+    """
+
+    def __init__(self, grafo, entradas):
+        self._grafo = grafo
+        self._valores = dict(entradas)
+        self.recalculados = []
+
+    def valor(self, nombre):
+        """
+        Devuelve el valor de un nodo, recalculándolo solo si sus dependencias cambiaron
+
+        Args:
+            nombre (str): Nombre del nodo o de la entrada
+
+        Returns:
+            Valor del nodo
+        """
+        if nombre in self._valores:
+            return self._valores[nombre]
+        if nombre not in self._grafo._nodos:
+            raise KeyError(f"Nodo o entrada desconocida: {nombre}")
+        funcion, dependencias = self._grafo._nodos[nombre]
+        argumentos = tuple(self.valor(dependencia) for dependencia in dependencias)
+
+        memorizado = self._grafo._memoria.get(nombre)
+        if memorizado is not None and mismo_valor(memorizado[0], argumentos):
+            resultado = memorizado[1]
+        else:
+            resultado = funcion(*argumentos)
+            if memorizado is not None and mismo_valor(memorizado[1], resultado):
+                # Mismo resultado: se conserva el objeto anterior para que los
+                # nodos dependientes lo reconozcan por identidad
+                resultado = memorizado[1]
+            self._grafo._memoria[nombre] = (argumentos, resultado)
+            self.recalculados.append(nombre)
+        self._valores[nombre] = resultado
+        return resultado
@@ -4,13 +4,152 @@
 # =============================================================================
 # Este módulo contiene la lógica para crear y lanzar la interfaz de usuario con Gradio
 
+import functools
+import hashlib
+import inspect
+import io
+import itertools
+import os
+import tempfile
+import threading
+import time
 import gradio as gr
-from calculos_fisica import simular_colision, generar_animaciones
+from PIL import Image
+from api_calculos import url_imagen, url_stream
+from cache_resultados import CacheLRU
+from calculos_fisica import calcular_datos_simulacion, simular_colision_en_cache, generar_animaciones
+from cola_animaciones import ESTADOS_FINALES, ColaLlena, cola_animaciones
+from metricas import eventos_interfaz
+from monte_carlo import ejecutar_monte_carlo
+from perfil_pulso import perfiles_simulacion
+from reproductor_web import SCRIPT_REPRODUCTOR, SCRIPT_STREAMS, generar_html_reproductor, generar_html_streams
+from tabla_realista import (MASA_MAX_KG, MASA_MIN_KG, PASO_MASA_KG, PASO_VELOCIDAD_KMH, VELOCIDAD_MAX_KMH,
+                            VELOCIDAD_MIN_KMH)
+from textos import generar_resumen_monte_carlo, generar_resumen_vista_previa
 
-def crear_interface():
+# Límites de concurrencia por evento: las simulaciones son ligeras y escalan
+# entre hilos; las animaciones se limitan más (sus renders con ffmpeg los
+# ejecutan aparte los trabajadores de cola_animaciones)
+LIMITE_SIMULACIONES = int(os.environ.get("LIMITE_SIMULACIONES", 8))
+LIMITE_ANIMACIONES = int(os.environ.get("LIMITE_ANIMACIONES", 2))
+# Monte Carlo ocupa la CPU durante segundos: una ejecución a la vez
+LIMITE_MONTE_CARLO = int(os.environ.get("LIMITE_MONTE_CARLO", 1))
+# Vistas previas en vivo a la vez: grupo propio, para que arrastrar un slider no
+# ocupe las plazas del botón de simular
+LIMITE_VISTAS_PREVIAS = int(os.environ.get("LIMITE_VISTAS_PREVIAS", 8))
+# Vista previa en vivo: espera tras el último cambio de un slider antes de calcular
+RETARDO_VISTA_PREVIA_S = float(os.environ.get("RETARDO_VISTA_PREVIA_S", 0.3))
+# Cada cuánto consulta la interfaz el estado del trabajo de animación
+INTERVALO_CONSULTA_TRABAJO_S = float(os.environ.get("INTERVALO_CONSULTA_TRABAJO_S", 0.5))
+# PNG de la caché de simulaciones escritos como archivos: Gradio los sirve tal
+# cual, sin decodificarlos ni volver a codificarlos en cada respuesta
+DIRECTORIO_IMAGENES = os.environ.get(
+    "DIRECTORIO_IMAGENES_INTERFAZ", os.path.join(tempfile.gettempdir(), "simulador_imagenes")
+)
+MAX_ARCHIVOS_IMAGENES = int(os.environ.get("MAX_ARCHIVOS_IMAGENES", 256))
+# Opciones de número de muestras en la interfaz (por línea de comandos no hay límite)
+OPCIONES_MUESTRAS_MONTE_CARLO = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Última petición de vista previa de cada sesión: las anteriores quedan obsoletas
+_versiones_vista_previa = CacheLRU(max_entradas=4096, max_bytes=4096)
+_contador_versiones = itertools.count(1)
+
+def registrar_version_vista_previa(sesion):
+    """
+    Registra una nueva petición de vista previa de una sesión
+
+    Args:
+        sesion (str): Identificador de la sesión de Gradio
+
+    Returns:
+        int: Versión de la petición
+    """
+    version = next(_contador_versiones)
+    _versiones_vista_previa.guardar(sesion, version, 1)
+    return version
+
+def es_version_vigente(sesion, version):
+    """
+    Indica si una petición de vista previa sigue siendo la más reciente de su sesión
+
+    Args:
+        sesion (str): Identificador de la sesión de Gradio
+        version (int): Versión devuelta por registrar_version_vista_previa
+
+    Returns:
+        bool: False si llegó otra petición después
+    """
+    return _versiones_vista_previa.obtener(sesion) == version
+
+def contar_eventos(funcion, grupo, limite):
+    """
+    Envuelve un manejador para contar sus eventos en curso y atendidos en el
+    grupo de concurrencia (se exportan en /metricas)
+
+    Args:
+        funcion (callable): Manejador del evento (función o generador)
+        grupo (str): Grupo de concurrencia del evento
+        limite (int): Límite de concurrencia del grupo
+
+    Returns:
+        callable: Manejador envuelto, con la misma firma
+    """
+    eventos_interfaz.registrar(grupo, limite)
+    if inspect.isgeneratorfunction(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with eventos_interfaz.medir(grupo):
+                yield from funcion(*args, **kwargs)
+    else:
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with eventos_interfaz.medir(grupo):
+                return funcion(*args, **kwargs)
+    return envoltura
+
+def archivo_imagen_png(imagen_png):
+    """
+    Devuelve un archivo con los bytes PNG de una imagen, nombrado por su hash
+
+    Una imagen ya escrita se reutiliza. Al superar MAX_ARCHIVOS_IMAGENES se
+    borran los más antiguos (Gradio ya copió a su caché los que sirvió).
+
+    Args:
+        imagen_png (bytes): Imagen PNG
+
+    Returns:
+        str: Ruta del archivo
+    """
+    ruta = os.path.join(DIRECTORIO_IMAGENES, hashlib.sha256(imagen_png).hexdigest()[:32] + ".png")
+    if os.path.exists(ruta):
+        return ruta
+    os.makedirs(DIRECTORIO_IMAGENES, exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(temporal, 'wb') as archivo:
+        archivo.write(imagen_png)
+    os.replace(temporal, ruta)
+    archivos = [entrada for entrada in os.scandir(DIRECTORIO_IMAGENES) if entrada.name.endswith(".png")]
+    if len(archivos) > MAX_ARCHIVOS_IMAGENES:
+        archivos.sort(key=lambda entrada: entrada.stat().st_mtime)
+        for entrada in archivos[:len(archivos) - MAX_ARCHIVOS_IMAGENES]:
+            if entrada.path != ruta:
+                try:
+                    os.remove(entrada.path)
+                except OSError:
+                    pass
+    return ruta
+
+def crear_interface(limite_simulaciones=LIMITE_SIMULACIONES, limite_animaciones=LIMITE_ANIMACIONES,
+                    limite_monte_carlo=LIMITE_MONTE_CARLO, limite_vistas_previas=LIMITE_VISTAS_PREVIAS):
     """
     Crea y configura la interfaz de usuario con Gradio
     
+    Args:
+        limite_simulaciones (int): Simulaciones que se ejecutan a la vez
+        limite_animaciones (int): Peticiones de animación que se atienden a la vez
+        limite_monte_carlo (int): Simulaciones Monte Carlo que se ejecutan a la vez
+        limite_vistas_previas (int): Vistas previas en vivo que se atienden a la vez
+    
     Returns:
         gr.Blocks: Interfaz de Gradio configurada
     """
@@ -22,7 +161,8 @@ def crear_interface():
             max-width: 1400px;
             margin: auto;
         }
-        """
+        """,
+        head=SCRIPT_REPRODUCTOR + SCRIPT_STREAMS
     ) as demo:
         
         gr.Markdown("""
@@ -40,14 +180,15 @@ def crear_interface():
             with gr.Column(scale=1):
                 gr.Markdown("### ⚙️ Parámetros de Simulación")
                 
+                # Misma grilla que la tabla precalculada del modo realista
                 masa_input = gr.Slider(
-                    minimum=20, maximum=150, value=70, step=1,
+                    minimum=MASA_MIN_KG, maximum=MASA_MAX_KG, value=70, step=PASO_MASA_KG,
                     label="👤 Masa del Cuerpo (kg)",
                     info="Peso típico de una persona adulta"
                 )
                 
                 velocidad_input = gr.Slider(
-                    minimum=10, maximum=200, value=50, step=5,
+                    minimum=VELOCIDAD_MIN_KMH, maximum=VELOCIDAD_MAX_KMH, value=50, step=PASO_VELOCIDAD_KMH,
                     label="🏎️ Velocidad Inicial (km/h)",
                     info="Velocidad del vehículo antes del impacto"
                 )
@@ -72,6 +213,27 @@ def crear_interface():
                         info="Impacto directo, tiempo muy corto"
                     )
                 
+                vista_previa_en_vivo = gr.Checkbox(
+                    value=False, label="⚡ Vista previa en vivo",
+                    info="Recalcula al mover los sliders: primero los números y después el gráfico completo"
+                )
+                
+                modo_animacion = gr.Radio(
+                    choices=["Reproductor en el navegador", "Vídeo en streaming"],
+                    value="Reproductor en el navegador",
+                    label="🎥 Tipo de Animación",
+                    info="Reproductor: se dibuja en tu navegador al instante. Vídeo: se renderiza en el servidor "
+                         "y empieza a reproducirse en cuanto está listo el primer segundo"
+                )
+                
+                calidad_animacion = gr.Radio(
+                    choices=[("Vista previa", "vista_previa"), ("Estándar", "estandar"), ("Alta", "alta")],
+                    value="estandar",
+                    label="🎞️ Calidad del Vídeo",
+                    info="Más calidad: más frames, más resolución y más tiempo de render. "
+                         "Con el servidor ocupado se genera en vista previa"
+                )
+                
                 btn_simular = gr.Button("🚀 Ejecutar Simulación", variant="primary", size="lg")
                 btn_animaciones = gr.Button("🎥 Generar Animaciones", variant="secondary", size="lg", visible=False)
                 
@@ -91,33 +253,196 @@ def crear_interface():
 
             with gr.Column(scale=2):
                 gr.Markdown("### 📊 Resultados de la Simulación")
-                plot_output = gr.Plot(label="Análisis Físico Completo")
+                plot_output = gr.Image(label="Análisis Físico Completo", type="filepath", format="png")
+                enlaces_imagen_output = gr.Markdown()
                 analisis_output = gr.Markdown(label="Análisis Detallado")
                 datos_simulacion_state = gr.State()
-                with gr.Row():
-                    anim_sin_output = gr.Video(label="Animación: Sin Cinturón")
-                    anim_con_output = gr.Video(label="Animación: Con Cinturón")
+                reproductor_output = gr.HTML()
+                videos_output = gr.HTML(visible=False)
+                estado_trabajo_output = gr.Markdown()
+                trabajo_state = gr.State()
+                consulta_trabajo = gr.Timer(INTERVALO_CONSULTA_TRABAJO_S, active=False)
+
+        with gr.Accordion("🎲 Análisis Monte Carlo: riesgo en una población de escenarios", open=False):
+            gr.Markdown("""
+            En lugar de un único choque, se simulan miles o millones de escenarios con masas y
+            velocidades aleatorias y se estima la **probabilidad** de superar los umbrales de
+            riesgo con y sin cinturón. Con la misma semilla el resultado es reproducible.
+            """)
+            with gr.Row():
+                with gr.Column(scale=1):
+                    muestras_mc = gr.Dropdown(
+                        choices=OPCIONES_MUESTRAS_MONTE_CARLO, value=1_000_000,
+                        label="🔢 Número de escenarios"
+                    )
+                    semilla_mc = gr.Number(value=42, precision=0, label="🌱 Semilla",
+                                           info="Vacía: se elige una al azar y se muestra en el resultado")
+                    masa_media_mc = gr.Slider(minimum=20, maximum=150, value=75, step=1, label="👤 Masa media (kg)")
+                    masa_desviacion_mc = gr.Slider(minimum=0, maximum=40, value=15, step=1, label="👤 Desviación de la masa (kg)")
+                    velocidad_media_mc = gr.Slider(minimum=10, maximum=200, value=60, step=5, label="🏎️ Velocidad media (km/h)")
+                    velocidad_desviacion_mc = gr.Slider(minimum=0, maximum=60, value=20, step=1, label="🏎️ Desviación de la velocidad (km/h)")
+                    tiempos_aleatorios_mc = gr.Checkbox(
+                        value=False, label="⏱️ Tiempos de frenado aleatorios",
+                        info="Sin marcar: tiempos del modelo realista. Marcado: uniformes entre los rangos"
+                    )
+                    with gr.Group(visible=False) as controles_tiempos_mc:
+                        tiempo_sin_rango_mc = gr.Slider(minimum=0.01, maximum=0.5, value=0.1, step=0.01,
+                                                        label="⏱️ Tiempo máximo SIN cinturón (s)", info="Desde 0.01 s")
+                        tiempo_con_rango_mc = gr.Slider(minimum=0.2, maximum=2.0, value=0.8, step=0.1,
+                                                        label="⏱️ Tiempo máximo CON cinturón (s)", info="Desde 0.2 s")
+                    btn_monte_carlo = gr.Button("🎲 Ejecutar Monte Carlo", variant="primary")
+                with gr.Column(scale=2):
+                    grafico_mc_output = gr.Image(label="Distribución de Fuerzas G", type="pil", format="png")
+                    resumen_mc_output = gr.Markdown()
 
         # Función para mostrar/ocultar controles manuales
         def actualizar_controles(modo):
             return gr.update(visible=(modo == "Configuración Manual"))
 
-        # Función para ejecutar la simulación
-        def ejecutar_simulacion(masa, velocidad, modo, tiempo_con_manual, tiempo_sin_manual):
+        # Enlaces a la imagen ya rasterizada en cada nivel de resolución (cacheables por URL)
+        def generar_enlaces_imagen(masa, velocidad, usar_manual, tiempo_con_manual, tiempo_sin_manual):
+            enlaces = [
+                f"[{nombre}]({url_imagen(masa, velocidad, usar_manual, tiempo_con_manual, tiempo_sin_manual, nivel, formato)})"
+                for nivel, formato, nombre in (('miniatura', 'webp', 'Miniatura'), ('pantalla', 'png', 'Pantalla PNG'),
+                                               ('pantalla', 'webp', 'Pantalla WebP'), ('impresion', 'png', 'Impresión PNG'))
+            ]
+            return "📥 Descargar gráfico: " + " · ".join(enlaces)
+
+        # Función para ejecutar la simulación. Al volver a simular, el trabajo de
+        # animación pendiente de la sesión ya no corresponde y se cancela, y las
+        # vistas previas en curso quedan obsoletas (no sobrescriben este resultado)
+        def ejecutar_simulacion(masa, velocidad, modo, tiempo_con_manual, tiempo_sin_manual,
+                                request: gr.Request = None):
+            if request is not None:
+                cola_animaciones.cancelar_sesion(request.session_hash)
+                registrar_version_vista_previa(request.session_hash)
             if any(x is None for x in [masa, velocidad, modo]):
-                return None, "❌ Error: Todos los parámetros deben tener valores válidos", None, gr.update(visible=True)
+                return None, "", "❌ Error: Todos los parámetros deben tener valores válidos", None, gr.update(visible=True)
             if modo == "Configuración Manual" and any(x is None for x in [tiempo_con_manual, tiempo_sin_manual]):
-                return None, "❌ Error: Los tiempos manuales deben tener valores válidos", None, gr.update(visible=True)
+                return None, "", "❌ Error: Los tiempos manuales deben tener valores válidos", None, gr.update(visible=True)
             usar_manual = (modo == "Configuración Manual")
-            fig, analisis, datos = simular_colision(masa, velocidad, usar_manual, tiempo_con_manual, tiempo_sin_manual)
-            return fig, analisis, datos, gr.update(visible=True)
+            imagen_png, analisis, datos = simular_colision_en_cache(masa, velocidad, usar_manual, tiempo_con_manual, tiempo_sin_manual)
+            if imagen_png is None:
+                return None, "", analisis, datos, gr.update(visible=True)
+            enlaces = generar_enlaces_imagen(masa, velocidad, usar_manual, tiempo_con_manual, tiempo_sin_manual)
+            return archivo_imagen_png(imagen_png), enlaces, analisis, datos, gr.update(visible=True)
+
+        # Función de la vista previa en vivo: espera a que el slider se detenga,
+        # muestra los números al instante y después el gráfico y el análisis.
+        # Si llega un cambio más reciente de la misma sesión, abandona el trabajo:
+        # se comprueba justo antes del render y otra vez antes de entregarlo.
+        def actualizar_vista_previa(masa, velocidad, modo, tiempo_con_manual, tiempo_sin_manual, en_vivo,
+                                    request: gr.Request):
+            sin_cambios = (gr.skip(), gr.skip(), gr.skip(), gr.skip(), gr.skip())
+            if not en_vivo:
+                yield sin_cambios
+                return
+            sesion = request.session_hash if request is not None else None
+            version = registrar_version_vista_previa(sesion)
+            time.sleep(RETARDO_VISTA_PREVIA_S)
+            if not es_version_vigente(sesion, version):
+                yield sin_cambios
+                return
+            
+            usar_manual = (modo == "Configuración Manual")
+            datos, mensaje_error = calcular_datos_simulacion(masa, velocidad, usar_manual, tiempo_con_manual, tiempo_sin_manual)
+            if datos is None:
+                yield gr.skip(), gr.skip(), mensaje_error, None, gr.skip()
+                return
+            yield gr.skip(), gr.skip(), generar_resumen_vista_previa(datos), gr.skip(), gr.skip()
+            
+            if not es_version_vigente(sesion, version):
+                yield sin_cambios
+                return
+            resultado = ejecutar_simulacion(masa, velocidad, modo, tiempo_con_manual, tiempo_sin_manual)
+            if not es_version_vigente(sesion, version):
+                # Ya hay una vista previa más reciente en camino: no se entrega un render obsoleto
+                yield sin_cambios
+                return
+            yield resultado
+
+        # Función para alternar entre reproductor del navegador y vídeos en streaming
+        def actualizar_modo_animacion(modo):
+            en_navegador = (modo == "Reproductor en el navegador")
+            return gr.update(visible=en_navegador), gr.update(visible=not en_navegador)
 
-        # Función para generar animaciones
-        def ejecutar_animaciones(datos_simulacion):
+        # Función para generar animaciones. El reproductor del navegador se
+        # devuelve al momento; el vídeo se encarga a la cola de animaciones y se
+        # vuelve sin esperar al render. Un nuevo encargo de la sesión cancela el anterior
+        def ejecutar_animaciones(datos_simulacion, modo, calidad, request: gr.Request = None):
             if datos_simulacion is None:
-                return None, "❌ Error: No hay datos de simulación disponibles", None
-            anim_sin, anim_con = generar_animaciones(datos_simulacion)
-            return anim_sin, anim_con
+                mensaje_error = "❌ Error: No hay datos de simulación disponibles"
+                return mensaje_error, mensaje_error, "", None, gr.Timer(active=False)
+            sesion = request.session_hash if request is not None else None
+            if modo == "Reproductor en el navegador":
+                if sesion is not None:
+                    cola_animaciones.cancelar_sesion(sesion)
+                tray_sin, tray_con = generar_animaciones(datos_simulacion, salida='trayectoria', calidad=calidad)
+                if tray_sin is None:
+                    return tray_con, gr.skip(), "", None, gr.Timer(active=False)
+                return generar_html_reproductor(tray_sin, tray_con), gr.skip(), "", None, gr.Timer(active=False)
+            try:
+                trabajo = cola_animaciones.enviar(*perfiles_simulacion(datos_simulacion), sesion=sesion,
+                                                  salida='stream', calidad=calidad)
+            except ColaLlena as e:
+                return gr.skip(), "", str(e), None, gr.Timer(active=False)
+            return gr.skip(), "", "⏳ Animación en cola...", {'id': trabajo.id, 'mostrado': False}, gr.Timer(active=True)
+
+        # Función que consulta el trabajo de animación: muestra su estado, pone
+        # los vídeos en cuanto hay streams y deja de consultar al terminar
+        def consultar_trabajo_animacion(trabajo):
+            if trabajo is None:
+                return gr.skip(), gr.skip(), None, gr.Timer(active=False)
+            resumen = cola_animaciones.consultar(trabajo['id'])
+            if resumen is None:
+                return gr.skip(), "", None, gr.Timer(active=False)
+            videos = gr.skip()
+            if resumen['resultado'] is not None and not trabajo['mostrado']:
+                lista_sin, lista_con = resumen['resultado']
+                aviso = ""
+                if resumen['calidad'] != resumen['calidad_pedida']:
+                    aviso = "<p>⚠️ El servidor está ocupado: los vídeos se generan en calidad de vista previa.</p>"
+                videos = aviso + generar_html_streams(url_stream(lista_sin), url_stream(lista_con))
+                trabajo = {**trabajo, 'mostrado': True}
+            estado = resumen['estado']
+            if estado == 'en_cola':
+                mensaje = f"⏳ Animación en cola (posición {resumen['posicion']})..."
+            elif estado == 'en_curso':
+                mensaje = "🎬 Generando animaciones..."
+            elif estado == 'completado':
+                mensaje = ""
+            elif estado == 'cancelado':
+                mensaje = "🚫 Animación cancelada"
+            else:
+                mensaje = resumen['error']
+            return videos, mensaje, trabajo, gr.Timer(active=estado not in ESTADOS_FINALES)
+
+        # Función para ejecutar la simulación Monte Carlo
+        def ejecutar_monte_carlo_interfaz(muestras, semilla, masa_media, masa_desviacion, velocidad_media,
+                                          velocidad_desviacion, tiempos_aleatorios, tiempo_sin_max, tiempo_con_max,
+                                          progreso=gr.Progress()):
+            if any(x is None for x in [muestras, masa_media, masa_desviacion, velocidad_media, velocidad_desviacion]):
+                return None, "❌ Error: Todos los parámetros deben tener valores válidos"
+            distribuciones = {
+                'masa_cuerpo': {'tipo': 'normal', 'media': masa_media, 'desviacion': masa_desviacion, 'minimo': 20, 'maximo': 200},
+                'velocidad_kmh': {'tipo': 'normal', 'media': velocidad_media, 'desviacion': velocidad_desviacion, 'minimo': 5, 'maximo': 250}
+            }
+            if tiempos_aleatorios:
+                distribuciones['tiempo_sin_cinturon'] = {'tipo': 'uniforme', 'minimo': 0.01, 'maximo': max(tiempo_sin_max, 0.01)}
+                distribuciones['tiempo_con_cinturon'] = {'tipo': 'uniforme', 'minimo': 0.2, 'maximo': max(tiempo_con_max, 0.2)}
+            try:
+                resultado = ejecutar_monte_carlo(
+                    int(muestras), None if semilla is None else int(semilla), distribuciones,
+                    progreso=lambda hechas, total: progreso(hechas / total, desc="Simulando escenarios")
+                )
+            except ValueError as e:
+                return None, f"❌ Error: {str(e)}"
+            resumen = generar_resumen_monte_carlo(resultado)
+            if resultado['validas'] == 0:
+                return None, resumen
+            # Como en calculos_fisica, matplotlib se importa solo al dibujar
+            from graficos import crear_grafico_monte_carlo, figura_a_png
+            return Image.open(io.BytesIO(figura_a_png(crear_grafico_monte_carlo(resultado), liberar=True))), resumen
 
         modo_tiempo.change(
             fn=actualizar_controles,
@@ -125,16 +450,67 @@ def crear_interface():
             outputs=[controles_manuales]
         )
 
+        modo_animacion.change(
+            fn=actualizar_modo_animacion,
+            inputs=[modo_animacion],
+            outputs=[reproductor_output, videos_output]
+        )
+
         btn_simular.click(
-            fn=ejecutar_simulacion,
+            fn=contar_eventos(ejecutar_simulacion, "simulacion", limite_simulaciones),
             inputs=[masa_input, velocidad_input, modo_tiempo, tiempo_con_cinturon_input, tiempo_sin_cinturon_input],
-            outputs=[plot_output, analisis_output, datos_simulacion_state, btn_animaciones]
+            outputs=[plot_output, enlaces_imagen_output, analisis_output, datos_simulacion_state, btn_animaciones],
+            concurrency_limit=limite_simulaciones,
+            concurrency_id="simulacion"
+        )
+
+        # always_last: mientras una vista previa está en curso, de todos los
+        # cambios que lleguen solo se encola el último. Grupo de concurrencia
+        # propio: la espera y los renders de la vista previa no quitan plazas
+        # al botón de simular
+        gr.on(
+            triggers=[masa_input.change, velocidad_input.change, modo_tiempo.change,
+                      tiempo_con_cinturon_input.change, tiempo_sin_cinturon_input.change],
+            fn=contar_eventos(actualizar_vista_previa, "vista_previa", limite_vistas_previas),
+            inputs=[masa_input, velocidad_input, modo_tiempo, tiempo_con_cinturon_input,
+                    tiempo_sin_cinturon_input, vista_previa_en_vivo],
+            outputs=[plot_output, enlaces_imagen_output, analisis_output, datos_simulacion_state, btn_animaciones],
+            trigger_mode="always_last",
+            show_progress="minimal",
+            concurrency_limit=limite_vistas_previas,
+            concurrency_id="vista_previa"
         )
 
         btn_animaciones.click(
-            fn=ejecutar_animaciones,
-            inputs=[datos_simulacion_state],
-            outputs=[anim_sin_output, anim_con_output]
+            fn=contar_eventos(ejecutar_animaciones, "animacion", limite_animaciones),
+            inputs=[datos_simulacion_state, modo_animacion, calidad_animacion],
+            outputs=[reproductor_output, videos_output, estado_trabajo_output, trabajo_state, consulta_trabajo],
+            concurrency_limit=limite_animaciones,
+            concurrency_id="animacion"
+        )
+
+        # Consultar el estado es instantáneo: no ocupa plaza de las animaciones
+        consulta_trabajo.tick(
+            fn=consultar_trabajo_animacion,
+            inputs=[trabajo_state],
+            outputs=[videos_output, estado_trabajo_output, trabajo_state, consulta_trabajo],
+            concurrency_limit=None,
+            show_progress="hidden"
+        )
+
+        tiempos_aleatorios_mc.change(
+            fn=lambda aleatorios: gr.update(visible=aleatorios),
+            inputs=[tiempos_aleatorios_mc],
+            outputs=[controles_tiempos_mc]
+        )
+
+        btn_monte_carlo.click(
+            fn=contar_eventos(ejecutar_monte_carlo_interfaz, "monte_carlo", limite_monte_carlo),
+            inputs=[muestras_mc, semilla_mc, masa_media_mc, masa_desviacion_mc, velocidad_media_mc,
+                    velocidad_desviacion_mc, tiempos_aleatorios_mc, tiempo_sin_rango_mc, tiempo_con_rango_mc],
+            outputs=[grafico_mc_output, resumen_mc_output],
+            concurrency_limit=limite_monte_carlo,
+            concurrency_id="monte_carlo"
         )
 
         gr.Markdown("""
@@ -179,4 +555,5 @@ def crear_interface():
         - Comparación cuantitativa de todos los parámetros
         """)
 
+    demo.queue(default_concurrency_limit=limite_simulaciones)
     return demo
\ No newline at end of file
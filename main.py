@@ -5,16 +5,15 @@
 
 import sys
 import os
-from calculos_fisica import simular_colision
+import uvicorn
 from interfaz_gradio import crear_interface
+from servidor import crear_aplicacion
 from utils import imprimir_inicio
 
-# Definir demo en el ámbito global
+# Definir demo y la aplicación en el ámbito global (se construyen una sola vez).
+# Con gunicorn: gunicorn main:app -k uvicorn.workers.UvicornWorker
 demo = crear_interface()
-
-# Lanzar el servidor en el puerto asignado por Render
-port = int(os.environ.get("PORT", 7860))
-demo.launch(server_name="0.0.0.0", server_port=port)
+app = crear_aplicacion(demo)
 
 def main():
     """
@@ -23,28 +22,19 @@ def main():
     try:
         # Mostrar información de inicio
         imprimir_inicio()
-        
-        # Crear y lanzar la interfaz
-        demo = crear_interface()
-        
-        # Configuración de lanzamiento
-        demo.launch(
-            server_name="127.0.0.1",
-            server_port=7860,
-            share=False,
-            debug=False,
-            show_error=True,
-            quiet=False
-        )
-        
+
+        # Lanzar el servidor en el puerto asignado por Render
+        port = int(os.environ.get("PORT", 7860))
+        uvicorn.run(app, host=os.environ.get("HOST", "0.0.0.0"), port=port)
+
     except Exception as e:
         print(f"❌ Error al iniciar la aplicación: {e}")
         print("💡 Posibles soluciones:")
         print("   1. Verificar que el puerto 7860 esté disponible")
         print("   2. Reinstalar gradio: pip install --upgrade gradio")
-        print("   3. Usar un puerto diferente modificando 'server_port'")
+        print("   3. Usar un puerto diferente con la variable de entorno PORT")
         print("   4. Verificar que todos los módulos estén en el mismo directorio")
         sys.exit(1)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,195 @@
+# metricas.py
+# =============================================================================
+# METRICAS.PY - MÓDULO DE MÉTRICAS DE RENDIMIENTO
+# =============================================================================
+# Este módulo registra la duración de cada etapa de la simulación en
+# histogramas de cubetas fijas (una búsqueda binaria y una suma por medición)
+# y los exporta, junto con otros contadores, en el formato de texto de Prometheus
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites superiores de las cubetas en segundos: desde el cálculo físico
+# (microsegundos) hasta la codificación de un vídeo (decenas de segundos)
+CUBETAS_SEGUNDOS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1,
+                    0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0)
+
+class Histograma:
+    """
+    Histograma de duraciones seguro entre hilos, con cubetas fijas.
+
+    Guarda el número de observaciones de cada cubeta (no acumulado), la suma
+    y el total; la acumulación que pide Prometheus se hace al exportar.
+    """
+
+    def __init__(self, cubetas=CUBETAS_SEGUNDOS):
+        """
+        Args:
+            cubetas (tuple): Límites superiores de las cubetas, en orden creciente
+        """
+        if list(cubetas) != sorted(cubetas):
+            raise ValueError("Los límites de las cubetas deben estar ordenados")
+        self.cubetas = tuple(cubetas)
+        self._conteos = [0] * (len(self.cubetas) + 1)  # la última es +Inf
+        self._suma = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observar(self, segundos):
+        """
+        Registra una duración
+
+        Args:
+            segundos (float): Duración observada
+        """
+        indice = bisect.bisect_left(self.cubetas, segundos)
+        with self._lock:
+            self._conteos[indice] += 1
+            self._suma += segundos
+            self._total += 1
+
+    def instantanea(self):
+        """
+        Devuelve una copia coherente del estado del histograma
+
+        Returns:
+            dict: Cubetas, conteos acumulados (incluida +Inf), suma y total
+        """
+        with self._lock:
+            conteos = list(self._conteos)
+            suma, total = self._suma, self._total
+        acumulados, acumulado = [], 0
+        for conteo in conteos:
+            acumulado += conteo
+            acumulados.append(acumulado)
+        return {'cubetas': self.cubetas, 'acumulados': acumulados, 'suma': suma, 'total': total}
+
+class ContadorEventos:
+    """
+    Eventos en curso y atendidos por grupo de concurrencia, contados por los
+    propios manejadores (sin depender del estado interno de la cola de Gradio)
+    """
+
+    def __init__(self):
+        self._grupos = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, grupo, limite=None):
+        """
+        Da de alta un grupo para que se exporte aunque aún no haya tenido eventos
+
+        Args:
+            grupo (str): Grupo de concurrencia
+            limite (int, optional): Eventos del grupo que se atienden a la vez
+        """
+        with self._lock:
+            estado = self._grupos.setdefault(grupo, {'en_curso': 0, 'atendidos': 0, 'limite': None})
+            estado['limite'] = limite
+
+    @contextmanager
+    def medir(self, grupo):
+        """
+        Cuenta el bloque como un evento en curso del grupo mientras dura
+
+        Args:
+            grupo (str): Grupo de concurrencia
+        """
+        with self._lock:
+            estado = self._grupos.setdefault(grupo, {'en_curso': 0, 'atendidos': 0, 'limite': None})
+            estado['en_curso'] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                estado['en_curso'] -= 1
+                estado['atendidos'] += 1
+
+    def estadisticas(self):
+        """
+        Returns:
+            dict: Por grupo, eventos en curso, eventos atendidos y límite de concurrencia
+        """
+        with self._lock:
+            return {grupo: dict(estado) for grupo, estado in self._grupos.items()}
+
+# Eventos de la interfaz de Gradio, por grupo de concurrencia
+eventos_interfaz = ContadorEventos()
+
+# Histogramas por etapa ('validacion', 'fisica', 'graficos', 'analisis', ...)
+histogramas_etapas = {}
+_lock_registro = threading.Lock()
+
+def obtener_histograma(etapa):
+    """
+    Devuelve el histograma de una etapa, creándolo la primera vez
+
+    Args:
+        etapa (str): Nombre de la etapa
+
+    Returns:
+        Histograma: Histograma de la etapa
+    """
+    histograma = histogramas_etapas.get(etapa)
+    if histograma is None:
+        with _lock_registro:
+            histograma = histogramas_etapas.setdefault(etapa, Histograma())
+    return histograma
+
+@contextmanager
+def medir_etapa(etapa, tiempos=None):
+    """
+    Mide la duración del bloque y la registra en el histograma de la etapa
+
+    Args:
+        etapa (str): Nombre de la etapa
+        tiempos (dict, optional): Si se indica, también guarda ahí la duración
+            en segundos bajo la clave de la etapa
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        duracion = time.perf_counter() - inicio
+        obtener_histograma(etapa).observar(duracion)
+        if tiempos is not None:
+            tiempos[etapa] = duracion
+
+def _formatear_etiquetas(etiquetas):
+    if not etiquetas:
+        return ""
+    pares = ",".join(f'{clave}="{str(valor)}"' for clave, valor in etiquetas.items())
+    return "{" + pares + "}"
+
+def formatear_prometheus(histogramas=None, metricas=None):
+    """
+    Genera el texto de exposición de Prometheus
+
+    Args:
+        histogramas (dict, optional): Histogramas por etapa (por defecto, los registrados)
+        metricas (list, optional): Métricas simples como tuplas
+            (nombre, tipo, ayuda, [(etiquetas, valor), ...]) con tipo "gauge" o "counter"
+
+    Returns:
+        str: Métricas en formato de texto de Prometheus
+    """
+    histogramas = histogramas_etapas if histogramas is None else histogramas
+    lineas = [
+        "# HELP simulador_etapa_segundos Duración de cada etapa de la simulación",
+        "# TYPE simulador_etapa_segundos histogram"
+    ]
+    for etapa in sorted(histogramas):
+        estado = histogramas[etapa].instantanea()
+        limites = [repr(float(c)) for c in estado['cubetas']] + ["+Inf"]
+        for limite, acumulado in zip(limites, estado['acumulados']):
+            lineas.append(f'simulador_etapa_segundos_bucket{{etapa="{etapa}",le="{limite}"}} {acumulado}')
+        lineas.append(f'simulador_etapa_segundos_sum{{etapa="{etapa}"}} {estado["suma"]!r}')
+        lineas.append(f'simulador_etapa_segundos_count{{etapa="{etapa}"}} {estado["total"]}')
+
+    for nombre, tipo, ayuda, muestras in metricas or []:
+        lineas.append(f"# HELP {nombre} {ayuda}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+        for etiquetas, valor in muestras:
+            lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {float(valor)!r}")
+    return "\n".join(lineas) + "\n"
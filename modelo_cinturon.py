@@ -0,0 +1,267 @@
+# modelo_cinturon.py
+# =============================================================================
+# MODELO_CINTURON.PY - MODELO TEMPORAL DEL OCUPANTE Y EL CINTURÓN
+# =============================================================================
+# Este módulo sustituye la deceleración constante (Δv/Δt) por un modelo
+# resuelto en el tiempo: el vehículo frena con un pulso de choque de media
+# onda senoidal y el cuerpo del ocupante está unido a él por el cinturón,
+# modelado como un resorte no lineal más un amortiguador, con holgura inicial
+# y limitador de carga. Si el cuerpo recorre la distancia hasta el volante o
+# el salpicadero, el contacto se modela como un resorte lineal que, agotado su
+# recorrido de deformación, se endurece con un término cúbico: así lo detiene
+# en unos centímetros más incluso a 200 km/h. Sin cinturón es la única fuerza
+# que lo detiene.
+#
+# La integración es de paso fijo (Euler semiimplícito) y vectorizada: cada
+# paso avanza todos los escenarios a la vez como arrays de NumPy.
+
+import sys
+import numpy as np
+
+# Cinturón de tres puntos (banda de hombro + regazo) con limitador de carga
+PARAMETROS_CINTURON = {
+    'holgura': 0.025,            # m, holgura inicial de la banda
+    'rigidez': 6.0e4,            # N/m, término lineal de la banda
+    'rigidez_cubica': 2.0e6,     # N/m³, endurecimiento de la banda al estirarse
+    'amortiguamiento': 1.5e3,    # N·s/m
+    'limite_carga': 1.0e4        # N, el limitador cede banda por encima de esta fuerza
+}
+
+# Sin cinturón la banda no existe: el cuerpo vuela libre hasta el habitáculo
+PARAMETROS_SIN_CINTURON = {
+    'holgura': 0.0,
+    'rigidez': 0.0,
+    'rigidez_cubica': 0.0,
+    'amortiguamiento': 0.0,
+    'limite_carga': 0.0
+}
+
+# Contacto con el volante / salpicadero, común a ambos casos. Pasado el
+# recorrido de deformación el término cúbico endurece el contacto: sin él, a
+# alta velocidad el cuerpo atravesaba el salpicadero (más de 1 m de
+# penetración a 200 km/h)
+PARAMETROS_HABITACULO = {
+    'distancia_salpicadero': 0.45,    # m de recorrido libre hasta el contacto
+    'rigidez_salpicadero': 3.0e5,     # N/m
+    'recorrido_salpicadero': 0.2,     # m de deformación antes de endurecerse
+    'rigidez_cubica_salpicadero': 1.0e10,  # N/m³, pasado el recorrido
+    'amortiguamiento_salpicadero': 5.0e2,  # N·s/m
+    'rigidez_torax': 2.5e5            # N/m, para estimar la deflexión del tórax
+}
+
+# Deformación admisible del volante y el salpicadero en todo el rango de los sliders
+PENETRACION_MAXIMA_SALPICADERO = 0.3   # m
+
+DURACION_PULSO_VEHICULO = 0.1   # s, duración típica del pulso de choque frontal
+PASO_INTEGRACION = 2e-4         # s
+DURACION_SIMULACION = 0.3       # s
+
+def pulso_vehiculo(t, velocidades_ms, duraciones_pulso):
+    """
+    Deceleración del vehículo (positiva) con pulso de media onda senoidal
+
+    El área del pulso es la velocidad inicial: el vehículo queda detenido al
+    final del pulso.
+
+    Args:
+        t (float): Instante en segundos
+        velocidades_ms (np.ndarray): Velocidades iniciales en m/s
+        duraciones_pulso (np.ndarray): Duración del pulso en segundos
+
+    Returns:
+        np.ndarray: Deceleración del vehículo en m/s²
+    """
+    pico = np.pi * velocidades_ms / (2 * duraciones_pulso)
+    return np.where(t < duraciones_pulso, pico * np.sin(np.pi * t / duraciones_pulso), 0.0)
+
+def _elongacion_limite(parametros):
+    """
+    Elongación elástica a la que la banda alcanza el límite de carga (inf sin banda)
+    """
+    k1, k3, limite = parametros['rigidez'], parametros['rigidez_cubica'], parametros['limite_carga']
+    con_banda = k1 > 0
+    k1_seguro = np.where(con_banda, k1, 1.0)
+    # Newton sobre k1·d + k3·d³ = límite (monótona), partiendo de la solución lineal
+    d = limite / k1_seguro
+    for _ in range(30):
+        d = d - (k1_seguro * d + k3 * d**3 - limite) / (k1_seguro + 3 * k3 * d**2)
+    return np.where(con_banda, d, np.inf)
+
+def _parametros_por_escenario(con_cinturon, n, parametros_con=None, parametros_sin=None, parametros_habitaculo=None):
+    parametros_con = {**PARAMETROS_CINTURON, **(parametros_con or {})}
+    parametros_sin = {**PARAMETROS_SIN_CINTURON, **(parametros_sin or {})}
+    con_cinturon = np.broadcast_to(np.asarray(con_cinturon, dtype=bool), (n,))
+    parametros = {
+        clave: np.where(con_cinturon, parametros_con[clave], parametros_sin[clave]).astype(np.float64)
+        for clave in PARAMETROS_CINTURON
+    }
+    for clave, valor in {**PARAMETROS_HABITACULO, **(parametros_habitaculo or {})}.items():
+        parametros[clave] = np.full(n, valor, dtype=np.float64)
+    return parametros
+
+def simular_ocupante_lote(masas_cuerpo, velocidades_ms, con_cinturon, duracion_pulso=DURACION_PULSO_VEHICULO,
+                          paso=PASO_INTEGRACION, duracion=DURACION_SIMULACION, registrar_cada=5,
+                          guardar_historias=True, parametros_con=None, parametros_sin=None,
+                          parametros_habitaculo=None):
+    """
+    Integra en el tiempo el movimiento del ocupante para muchos escenarios a la vez
+
+    Variables de estado por escenario: desplazamiento del cuerpo hacia delante
+    respecto al vehículo, su velocidad relativa y la banda cedida por el
+    limitador (que no se recupera).
+
+    Args:
+        masas_cuerpo (array-like): Masas en kg
+        velocidades_ms (array-like): Velocidades iniciales en m/s
+        con_cinturon (array-like): True para los escenarios con cinturón
+        duracion_pulso (array-like): Duración del pulso del vehículo en segundos
+        paso (float): Paso de integración en segundos
+        duracion (float): Tiempo total simulado en segundos
+        registrar_cada (int): Pasos entre muestras guardadas de las historias
+        guardar_historias (bool): Si guardar las historias temporales (ocupan
+            muestras × escenarios; para lotes grandes basta con los picos)
+        parametros_con (dict, optional): Cambios sobre PARAMETROS_CINTURON
+        parametros_sin (dict, optional): Cambios sobre PARAMETROS_SIN_CINTURON
+        parametros_habitaculo (dict, optional): Cambios sobre PARAMETROS_HABITACULO
+
+    Returns:
+        dict: Picos por escenario (fuerza_maxima, aceleracion_maxima, g_maxima,
+            deflexion_maxima_torax, desplazamiento_maximo, tiempo_pico) y, si se
+            piden, historias 't' (muestras,) y 'fuerza', 'aceleracion',
+            'desplazamiento', 'deflexion_torax', 'aceleracion_vehiculo' (muestras, escenarios)
+    """
+    if paso <= 0 or duracion <= 0 or registrar_cada < 1:
+        raise ValueError("El paso, la duración y registrar_cada deben ser mayores a cero")
+    masas, v0, pulso = np.broadcast_arrays(
+        np.atleast_1d(np.asarray(masas_cuerpo, dtype=np.float64)),
+        np.atleast_1d(np.asarray(velocidades_ms, dtype=np.float64)),
+        np.atleast_1d(np.asarray(duracion_pulso, dtype=np.float64))
+    )
+    if np.any(masas <= 0) or np.any(v0 < 0) or np.any(pulso <= 0):
+        raise ValueError("La masa y la duración del pulso deben ser mayores a cero y la velocidad no negativa")
+    n = masas.shape[0]
+    p = _parametros_por_escenario(con_cinturon, n, parametros_con, parametros_sin, parametros_habitaculo)
+    elongacion_limite = _elongacion_limite(p)
+
+    desplazamiento = np.zeros(n)
+    velocidad = np.zeros(n)
+    cedido = np.zeros(n)
+    fuerza_maxima = np.zeros(n)
+    tiempo_pico = np.zeros(n)
+    desplazamiento_maximo = np.zeros(n)
+
+    num_pasos = int(round(duracion / paso))
+    num_muestras = num_pasos // registrar_cada + 1
+    if guardar_historias:
+        historias = {nombre: np.empty((num_muestras, n)) for nombre in ('fuerza', 'desplazamiento', 'aceleracion_vehiculo')}
+
+    for i in range(num_pasos + 1):
+        t = i * paso
+        a_vehiculo = pulso_vehiculo(t, v0, pulso)
+
+        # Banda: elongación elástica descontando la holgura y lo cedido por el limitador
+        elongacion = desplazamiento - p['holgura'] - cedido
+        tensa = elongacion > 0
+        fuerza = np.where(tensa, p['rigidez'] * elongacion + p['rigidez_cubica'] * elongacion**3
+                          + p['amortiguamiento'] * velocidad, 0.0)
+        # La banda solo tira (no empuja) y nunca supera el límite de carga
+        fuerza = np.clip(fuerza, 0.0, p['limite_carga'])
+        # Lo que la banda se estira por encima del límite lo cede el limitador de forma permanente
+        cedido = np.maximum(cedido, desplazamiento - p['holgura'] - elongacion_limite)
+
+        # Contacto con el volante / salpicadero
+        penetracion = desplazamiento - p['distancia_salpicadero']
+        fuerza += np.where(penetracion > 0, np.maximum(
+            p['rigidez_salpicadero'] * penetracion
+            + p['rigidez_cubica_salpicadero'] * np.maximum(penetracion - p['recorrido_salpicadero'], 0.0)**3
+            + p['amortiguamiento_salpicadero'] * velocidad, 0.0), 0.0)
+
+        nuevo_pico = fuerza > fuerza_maxima
+        fuerza_maxima = np.where(nuevo_pico, fuerza, fuerza_maxima)
+        tiempo_pico = np.where(nuevo_pico, t, tiempo_pico)
+        np.maximum(desplazamiento_maximo, desplazamiento, out=desplazamiento_maximo)
+
+        if guardar_historias and i % registrar_cada == 0:
+            muestra = i // registrar_cada
+            historias['fuerza'][muestra] = fuerza
+            historias['desplazamiento'][muestra] = desplazamiento
+            historias['aceleracion_vehiculo'][muestra] = a_vehiculo
+
+        # El frenado del vehículo empuja al cuerpo hacia delante; la banda lo retiene
+        velocidad += (a_vehiculo - fuerza / masas) * paso
+        desplazamiento += velocidad * paso
+
+    aceleracion_maxima = fuerza_maxima / masas
+    resultado = {
+        'fuerza_maxima': fuerza_maxima,
+        'aceleracion_maxima': aceleracion_maxima,
+        'g_maxima': aceleracion_maxima / 9.81,
+        'deflexion_maxima_torax': fuerza_maxima / p['rigidez_torax'],
+        'desplazamiento_maximo': desplazamiento_maximo,
+        'tiempo_pico': tiempo_pico
+    }
+    if guardar_historias:
+        resultado['t'] = np.arange(num_muestras) * paso * registrar_cada
+        resultado.update(historias)
+        resultado['aceleracion'] = historias['fuerza'] / masas
+        resultado['deflexion_torax'] = historias['fuerza'] / p['rigidez_torax']
+    return resultado
+
+def simular_respuesta_ocupante(masa_cuerpo, velocidad_ms, duracion_pulso=DURACION_PULSO_VEHICULO):
+    """
+    Simula el mismo ocupante sin y con cinturón (una sola integración de dos escenarios)
+
+    Args:
+        masa_cuerpo (float): Masa en kg
+        velocidad_ms (float): Velocidad inicial en m/s
+        duracion_pulso (float): Duración del pulso del vehículo en segundos
+
+    Returns:
+        dict: 't' y, para 'sin' y 'con', las historias (fuerza, aceleracion,
+            deflexion_torax, desplazamiento) y los picos como números
+    """
+    lote = simular_ocupante_lote([masa_cuerpo, masa_cuerpo], velocidad_ms, [False, True], duracion_pulso)
+    respuesta = {'t': lote['t']}
+    for indice, clave in enumerate(('sin', 'con')):
+        respuesta[clave] = {
+            nombre: (lote[nombre][:, indice] if lote[nombre].ndim == 2 else float(lote[nombre][indice]))
+            for nombre in ('fuerza', 'aceleracion', 'deflexion_torax', 'desplazamiento',
+                           'fuerza_maxima', 'aceleracion_maxima', 'g_maxima',
+                           'deflexion_maxima_torax', 'desplazamiento_maximo', 'tiempo_pico')
+        }
+    return respuesta
+
+def main():
+    """
+    Comprueba que la penetración en el volante / salpicadero queda acotada en
+    toda la grilla de los sliders (masas de 20 a 150 kg y velocidades de 10 a
+    200 km/h), sin y con cinturón
+
+    Returns:
+        int: Código de salida
+    """
+    from tabla_realista import (MASA_MAX_KG, MASA_MIN_KG, PASO_MASA_KG, PASO_VELOCIDAD_KMH, VELOCIDAD_MAX_KMH,
+                                VELOCIDAD_MIN_KMH)
+    masas, velocidades_kmh = np.meshgrid(
+        np.arange(MASA_MIN_KG, MASA_MAX_KG + PASO_MASA_KG, PASO_MASA_KG, dtype=np.float64),
+        np.arange(VELOCIDAD_MIN_KMH, VELOCIDAD_MAX_KMH + PASO_VELOCIDAD_KMH, PASO_VELOCIDAD_KMH, dtype=np.float64)
+    )
+    masas, velocidades_kmh = masas.ravel(), velocidades_kmh.ravel()
+    distancia = PARAMETROS_HABITACULO['distancia_salpicadero']
+    correcto = True
+    for con_cinturon in (False, True):
+        lote = simular_ocupante_lote(masas, velocidades_kmh / 3.6, con_cinturon, guardar_historias=False)
+        penetracion = np.maximum(lote['desplazamiento_maximo'] - distancia, 0.0)
+        peor = int(np.argmax(penetracion))
+        caso = "con cinturón" if con_cinturon else "sin cinturón"
+        detalle = (f"{caso}: penetración máxima {penetracion[peor] * 100:.1f} cm "
+                   f"({masas[peor]:.0f} kg a {velocidades_kmh[peor]:.0f} km/h)")
+        if not np.all(np.isfinite(penetracion)) or penetracion[peor] > PENETRACION_MAXIMA_SALPICADERO:
+            print(f"❌ {detalle}, por encima de {PENETRACION_MAXIMA_SALPICADERO * 100:.0f} cm")
+            correcto = False
+        else:
+            print(f"✅ {detalle}")
+    return 0 if correcto else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
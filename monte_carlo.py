@@ -0,0 +1,412 @@
+# monte_carlo.py
+# =============================================================================
+# MONTE_CARLO.PY - MÓDULO DE SIMULACIÓN MONTE CARLO
+# =============================================================================
+# Este módulo muestrea la masa del ocupante, la velocidad de impacto y, si se
+# piden, los tiempos de detención a partir de distribuciones configurables,
+# calcula la física por bloques vectorizados y acumula los resultados en
+# estadísticas de flujo: media y varianza (Welford), cuantiles aproximados
+# (bosquejo de cubetas logarítmicas) y probabilidades de superar los umbrales
+# de fuerzas G de los niveles de riesgo. La memoria depende del tamaño del
+# bloque, no del número de muestras, así que 10^8 muestras caben sin problema.
+#
+# Cada variable tiene su propio generador, derivado de la semilla, y se
+# extrae de forma secuencial: con la misma semilla se obtienen las mismas
+# muestras sea cual sea el tamaño del bloque.
+#
+# Uso:
+#   python monte_carlo.py --muestras 100000000 --semilla 42
+#   python monte_carlo.py --muestras 1000000 --semilla 7 --json resultado.json
+
+import argparse
+import json
+import math
+import sys
+import time
+import numpy as np
+from calculos_fisica import simular_colision_lote
+from metricas import medir_etapa
+from textos import UMBRAL_G_ALTO, UMBRAL_G_CRITICO, generar_resumen_monte_carlo
+
+VARIABLES_MUESTREADAS = ('masa_cuerpo', 'velocidad_kmh', 'tiempo_sin_cinturon', 'tiempo_con_cinturon')
+
+# Población por defecto: adultos y velocidades de circulación urbana e interurbana.
+# Los tiempos de detención se calculan con el modelo realista salvo que se den
+# distribuciones para ambos.
+DISTRIBUCIONES_POR_DEFECTO = {
+    'masa_cuerpo': {'tipo': 'normal', 'media': 75, 'desviacion': 15, 'minimo': 40, 'maximo': 150},
+    'velocidad_kmh': {'tipo': 'lognormal', 'mediana': 50, 'sigma': 0.5, 'minimo': 10, 'maximo': 200},
+    'tiempo_sin_cinturon': None,
+    'tiempo_con_cinturon': None
+}
+
+# Parámetros obligatorios de cada tipo de distribución ('minimo'/'maximo' recortan la muestra)
+PARAMETROS_DISTRIBUCION = {
+    'constante': ('valor',),
+    'uniforme': ('minimo', 'maximo'),
+    'normal': ('media', 'desviacion'),
+    'lognormal': ('mediana', 'sigma'),
+    'triangular': ('minimo', 'moda', 'maximo')
+}
+
+# Magnitudes acumuladas de cada escenario válido (fuerzas y G en valor absoluto)
+MAGNITUDES = ('masa_cuerpo', 'velocidad_kmh', 'tiempo_sin_cinturon', 'tiempo_con_cinturon',
+              'fuerza_sin', 'fuerza_con', 'g_sin', 'g_con')
+MAGNITUDES_CUANTILES = ('fuerza_sin', 'fuerza_con', 'g_sin', 'g_con')
+CUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+TAMANO_BLOQUE = 250_000
+
+def validar_distribucion(nombre, especificacion):
+    """
+    Comprueba que la especificación de una distribución sea válida
+
+    Args:
+        nombre (str): Variable a la que se aplica (para los mensajes)
+        especificacion (dict): {'tipo': ..., parámetros...}
+
+    Raises:
+        ValueError: Si el tipo no existe o faltan parámetros o son incoherentes
+    """
+    if not isinstance(especificacion, dict) or especificacion.get('tipo') not in PARAMETROS_DISTRIBUCION:
+        raise ValueError(f"Distribución de {nombre} no válida: el tipo debe ser uno de "
+                         f"{', '.join(PARAMETROS_DISTRIBUCION)}")
+    tipo = especificacion['tipo']
+    for parametro in PARAMETROS_DISTRIBUCION[tipo]:
+        valor = especificacion.get(parametro)
+        if not isinstance(valor, (int, float)) or not math.isfinite(valor):
+            raise ValueError(f"La distribución {tipo} de {nombre} necesita '{parametro}' numérico")
+    if tipo in ('normal', 'lognormal'):
+        dispersion = especificacion['desviacion'] if tipo == 'normal' else especificacion['sigma']
+        if dispersion < 0:
+            raise ValueError(f"La dispersión de {nombre} no puede ser negativa")
+        # Límites opcionales de recorte
+        for limite in ('minimo', 'maximo'):
+            valor = especificacion.get(limite)
+            if valor is not None and (not isinstance(valor, (int, float)) or not math.isfinite(valor)):
+                raise ValueError(f"El límite '{limite}' de {nombre} debe ser numérico")
+        if (especificacion.get('minimo') is not None and especificacion.get('maximo') is not None
+                and especificacion['minimo'] > especificacion['maximo']):
+            raise ValueError(f"El mínimo de {nombre} no puede superar al máximo")
+    if tipo == 'lognormal' and especificacion['mediana'] <= 0:
+        raise ValueError(f"La mediana de {nombre} debe ser mayor a cero")
+    if tipo == 'triangular' and not (especificacion['minimo'] <= especificacion['moda'] <= especificacion['maximo']):
+        raise ValueError(f"La distribución triangular de {nombre} necesita minimo ≤ moda ≤ maximo")
+    if tipo == 'uniforme' and especificacion['minimo'] > especificacion['maximo']:
+        raise ValueError(f"El mínimo de {nombre} no puede superar al máximo")
+
+def muestrear(generador, especificacion, n):
+    """
+    Extrae n muestras de una distribución
+
+    Los límites 'minimo' y 'maximo' de normal y lognormal recortan los valores
+    (no se rechazan muestras), así que cada llamada consume el generador de la
+    misma forma y las muestras no dependen del tamaño del bloque.
+
+    Args:
+        generador (np.random.Generator): Generador de la variable
+        especificacion (dict): Distribución validada
+        n (int): Número de muestras
+
+    Returns:
+        np.ndarray: Muestras float64
+    """
+    tipo = especificacion['tipo']
+    if tipo == 'constante':
+        return np.full(n, float(especificacion['valor']))
+    if tipo == 'uniforme':
+        return generador.uniform(especificacion['minimo'], especificacion['maximo'], n)
+    if tipo == 'triangular':
+        return generador.triangular(especificacion['minimo'], especificacion['moda'], especificacion['maximo'], n)
+    if tipo == 'normal':
+        valores = generador.normal(especificacion['media'], especificacion['desviacion'], n)
+    else:  # lognormal
+        valores = generador.lognormal(math.log(especificacion['mediana']), especificacion['sigma'], n)
+    minimo, maximo = especificacion.get('minimo'), especificacion.get('maximo')
+    if minimo is not None or maximo is not None:
+        np.clip(valores, minimo, maximo, out=valores)
+    return valores
+
+class EstadisticaWelford:
+    """
+    Media, varianza, mínimo y máximo de un flujo de valores.
+
+    Cada bloque se resume con NumPy y se combina con el acumulado mediante la
+    fórmula de Chan (Welford por bloques), que evita la cancelación numérica
+    de sumar cuadrados.
+    """
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+        self.minimo = math.inf
+        self.maximo = -math.inf
+
+    def actualizar(self, valores):
+        """
+        Añade un bloque de valores
+
+        Args:
+            valores (np.ndarray): Valores del bloque (sin NaN)
+        """
+        n_bloque = valores.size
+        if n_bloque == 0:
+            return
+        media_bloque = float(valores.mean())
+        m2_bloque = float(np.square(valores - media_bloque).sum())
+        n_total = self.n + n_bloque
+        delta = media_bloque - self.media
+        self.media += delta * n_bloque / n_total
+        self.m2 += m2_bloque + delta * delta * self.n * n_bloque / n_total
+        self.n = n_total
+        self.minimo = min(self.minimo, float(valores.min()))
+        self.maximo = max(self.maximo, float(valores.max()))
+
+    def resumen(self):
+        """
+        Returns:
+            dict: n, media, desviacion (muestral), minimo y maximo
+        """
+        if self.n == 0:
+            return {'n': 0, 'media': None, 'desviacion': None, 'minimo': None, 'maximo': None}
+        varianza = self.m2 / (self.n - 1) if self.n > 1 else 0.0
+        return {'n': self.n, 'media': self.media, 'desviacion': math.sqrt(varianza),
+                'minimo': self.minimo, 'maximo': self.maximo}
+
+class BosquejoCuantiles:
+    """
+    Bosquejo de cuantiles con error relativo acotado (estilo DDSketch).
+
+    Los valores positivos se cuentan en cubetas logarítmicas de razón
+    γ = (1 + α) / (1 - α): cualquier cuantil se estima con error relativo ≤ α.
+    El número de cubetas es fijo, así que la memoria no crece con las muestras.
+    """
+
+    def __init__(self, error_relativo=0.005, minimo=1e-6, maximo=1e9):
+        """
+        Args:
+            error_relativo (float): Error relativo máximo α de los cuantiles
+            minimo (float): Menor valor positivo distinguible (los menores van a la primera cubeta)
+            maximo (float): Mayor valor distinguible (los mayores van a la última cubeta)
+        """
+        if not 0 < error_relativo < 1 or not 0 < minimo < maximo:
+            raise ValueError("El error relativo debe estar en (0, 1) y 0 < minimo < maximo")
+        self.error_relativo = error_relativo
+        self.gamma = (1 + error_relativo) / (1 - error_relativo)
+        self._log_gamma = math.log(self.gamma)
+        self._desplazamiento = math.ceil(math.log(minimo) / self._log_gamma)
+        self.conteos = np.zeros(math.ceil(math.log(maximo) / self._log_gamma) - self._desplazamiento + 1, dtype=np.int64)
+        self.conteo_cero = 0  # valores ≤ 0
+        self.n = 0
+
+    def actualizar(self, valores):
+        """
+        Añade un bloque de valores
+
+        Args:
+            valores (np.ndarray): Valores del bloque (sin NaN)
+        """
+        positivos = valores[valores > 0]
+        self.conteo_cero += valores.size - positivos.size
+        self.n += valores.size
+        indices = np.ceil(np.log(positivos) / self._log_gamma).astype(np.int64) - self._desplazamiento
+        np.clip(indices, 0, self.conteos.size - 1, out=indices)
+        self.conteos += np.bincount(indices, minlength=self.conteos.size)
+
+    def combinar(self, otro):
+        """
+        Suma otro bosquejo con los mismos parámetros (p. ej. de otro proceso)
+
+        Args:
+            otro (BosquejoCuantiles): Bosquejo a combinar
+        """
+        if otro.conteos.size != self.conteos.size or otro.gamma != self.gamma:
+            raise ValueError("Solo se pueden combinar bosquejos con los mismos parámetros")
+        self.conteos += otro.conteos
+        self.conteo_cero += otro.conteo_cero
+        self.n += otro.n
+
+    def valor_cubeta(self, indices):
+        """
+        Valor representativo de las cubetas (el que minimiza el error relativo)
+        """
+        exponentes = np.asarray(indices) + self._desplazamiento
+        return 2 * self.gamma ** exponentes / (self.gamma + 1)
+
+    def cuantil(self, q):
+        """
+        Estima el cuantil q
+
+        Args:
+            q (float): Probabilidad en [0, 1]
+
+        Returns:
+            float: Valor estimado, o None si el bosquejo está vacío
+        """
+        if not 0 <= q <= 1:
+            raise ValueError("El cuantil debe estar entre 0 y 1")
+        if self.n == 0:
+            return None
+        rango = q * (self.n - 1)
+        if rango < self.conteo_cero:
+            return 0.0
+        acumulados = np.cumsum(self.conteos)
+        indice = int(np.searchsorted(acumulados, rango - self.conteo_cero, side='right'))
+        return float(self.valor_cubeta(indice))
+
+def _preparar_distribuciones(distribuciones):
+    distribuciones = {**DISTRIBUCIONES_POR_DEFECTO, **(distribuciones or {})}
+    desconocidas = set(distribuciones) - set(VARIABLES_MUESTREADAS)
+    if desconocidas:
+        raise ValueError(f"Variables desconocidas: {', '.join(sorted(desconocidas))}")
+    for nombre in ('masa_cuerpo', 'velocidad_kmh'):
+        validar_distribucion(nombre, distribuciones[nombre])
+    tiempos = [distribuciones['tiempo_sin_cinturon'], distribuciones['tiempo_con_cinturon']]
+    if (tiempos[0] is None) != (tiempos[1] is None):
+        raise ValueError("Los tiempos de detención necesitan distribución para ambos casos o para ninguno")
+    for nombre in ('tiempo_sin_cinturon', 'tiempo_con_cinturon'):
+        if distribuciones[nombre] is not None:
+            validar_distribucion(nombre, distribuciones[nombre])
+    return distribuciones
+
+def ejecutar_monte_carlo(muestras, semilla=None, distribuciones=None, tamano_bloque=TAMANO_BLOQUE, progreso=None):
+    """
+    Ejecuta la simulación Monte Carlo por bloques con memoria acotada
+
+    Args:
+        muestras (int): Número total de escenarios
+        semilla (int, optional): Semilla; sin ella se elige una al azar y se
+            devuelve en el resultado para poder repetir la ejecución
+        distribuciones (dict, optional): Cambios sobre DISTRIBUCIONES_POR_DEFECTO,
+            por variable ({'tipo': 'normal', 'media': ..., 'desviacion': ...}, ...)
+        tamano_bloque (int): Escenarios calculados a la vez
+        progreso (callable, optional): Se llama como progreso(hechas, total) tras cada bloque
+
+    Returns:
+        dict: semilla, distribuciones, muestras, validas, segundos,
+            estadisticas (Welford por magnitud), cuantiles (por magnitud de
+            CUANTILES), excedencias (probabilidad de superar UMBRAL_G_ALTO y
+            UMBRAL_G_CRITICO sin y con cinturón, con su error estándar) y
+            bosquejos (BosquejoCuantiles de fuerzas y G, para graficar)
+    """
+    if not isinstance(muestras, int) or muestras <= 0:
+        raise ValueError("El número de muestras debe ser un entero mayor a cero")
+    if not isinstance(tamano_bloque, int) or tamano_bloque <= 0:
+        raise ValueError("El tamaño del bloque debe ser un entero mayor a cero")
+    distribuciones = _preparar_distribuciones(distribuciones)
+    usar_tiempos_manuales = distribuciones['tiempo_sin_cinturon'] is not None
+
+    secuencia = np.random.SeedSequence(semilla)
+    generadores = dict(zip(VARIABLES_MUESTREADAS, (np.random.default_rng(s) for s in secuencia.spawn(len(VARIABLES_MUESTREADAS)))))
+
+    estadisticas = {magnitud: EstadisticaWelford() for magnitud in MAGNITUDES}
+    bosquejos = {magnitud: BosquejoCuantiles() for magnitud in MAGNITUDES_CUANTILES}
+    umbrales = (UMBRAL_G_ALTO, UMBRAL_G_CRITICO)
+    superaciones = {(caso, umbral): 0 for caso in ('sin', 'con') for umbral in umbrales}
+    validas = 0
+
+    inicio_tiempo = time.perf_counter()
+    with medir_etapa('monte_carlo'):
+        for inicio in range(0, muestras, tamano_bloque):
+            n = min(tamano_bloque, muestras - inicio)
+            masas = muestrear(generadores['masa_cuerpo'], distribuciones['masa_cuerpo'], n)
+            velocidades = muestrear(generadores['velocidad_kmh'], distribuciones['velocidad_kmh'], n)
+            if usar_tiempos_manuales:
+                tiempos_sin = muestrear(generadores['tiempo_sin_cinturon'], distribuciones['tiempo_sin_cinturon'], n)
+                tiempos_con = muestrear(generadores['tiempo_con_cinturon'], distribuciones['tiempo_con_cinturon'], n)
+                resultado = simular_colision_lote(masas, velocidades, tiempos_sin, tiempos_con)
+            else:
+                resultado = simular_colision_lote(masas, velocidades)
+
+            valido = resultado['valido']
+            validas += int(np.count_nonzero(valido))
+            columnas = {
+                'masa_cuerpo': masas[valido],
+                'velocidad_kmh': velocidades[valido],
+                'tiempo_sin_cinturon': resultado['tiempo_sin_cinturon'][valido],
+                'tiempo_con_cinturon': resultado['tiempo_con_cinturon'][valido],
+                'fuerza_sin': np.abs(resultado['parametros_sin']['fuerza'][valido]),
+                'fuerza_con': np.abs(resultado['parametros_con']['fuerza'][valido]),
+                'g_sin': np.abs(resultado['parametros_sin']['g_force'][valido]),
+                'g_con': np.abs(resultado['parametros_con']['g_force'][valido])
+            }
+            for magnitud, estadistica in estadisticas.items():
+                estadistica.actualizar(columnas[magnitud])
+            for magnitud, bosquejo in bosquejos.items():
+                bosquejo.actualizar(columnas[magnitud])
+            for caso, umbral in superaciones:
+                superaciones[(caso, umbral)] += int(np.count_nonzero(columnas[f'g_{caso}'] > umbral))
+
+            if progreso is not None:
+                progreso(inicio + n, muestras)
+
+    excedencias = {}
+    for (caso, umbral), conteo in superaciones.items():
+        probabilidad = conteo / validas if validas else None
+        excedencias.setdefault(caso, {})[umbral] = {
+            'conteo': conteo,
+            'probabilidad': probabilidad,
+            'error_estandar': math.sqrt(probabilidad * (1 - probabilidad) / validas) if validas else None
+        }
+
+    return {
+        'semilla': secuencia.entropy,
+        'distribuciones': distribuciones,
+        'muestras': muestras,
+        'validas': validas,
+        'segundos': time.perf_counter() - inicio_tiempo,
+        'estadisticas': {magnitud: e.resumen() for magnitud, e in estadisticas.items()},
+        'cuantiles': {magnitud: {q: b.cuantil(q) for q in CUANTILES} for magnitud, b in bosquejos.items()},
+        'excedencias': excedencias,
+        'bosquejos': bosquejos
+    }
+
+def resultado_a_json(resultado):
+    """
+    Convierte el resultado en un dict serializable en JSON (sin los bosquejos)
+
+    Args:
+        resultado (dict): Salida de ejecutar_monte_carlo
+
+    Returns:
+        dict: Resultado con claves de texto
+    """
+    return {
+        **{clave: valor for clave, valor in resultado.items() if clave not in ('bosquejos', 'cuantiles', 'excedencias')},
+        'cuantiles': {m: {f'p{q * 100:g}': v for q, v in c.items()} for m, c in resultado['cuantiles'].items()},
+        'excedencias': {caso: {f'{umbral}G': v for umbral, v in e.items()} for caso, e in resultado['excedencias'].items()}
+    }
+
+def main():
+    """
+    Punto de entrada por línea de comandos
+    """
+    parser = argparse.ArgumentParser(description="Simulación Monte Carlo de colisiones con memoria acotada")
+    parser.add_argument('--muestras', type=int, default=1_000_000, help="Número de escenarios")
+    parser.add_argument('--semilla', type=int, default=None, help="Semilla (sin ella se elige una al azar)")
+    parser.add_argument('--tamano-bloque', type=int, default=TAMANO_BLOQUE, help="Escenarios por bloque")
+    parser.add_argument('--distribuciones', default=None,
+                        help="JSON con cambios sobre las distribuciones por defecto, p. ej. "
+                             "'{\"masa_cuerpo\": {\"tipo\": \"uniforme\", \"minimo\": 50, \"maximo\": 100}}'")
+    parser.add_argument('--json', default=None, help="Guarda el resultado en este archivo JSON")
+    args = parser.parse_args()
+
+    def mostrar_progreso(hechas, total):
+        print(f"\r{hechas:,}/{total:,} escenarios ({100 * hechas / total:.0f}%)", end="", file=sys.stderr, flush=True)
+
+    try:
+        distribuciones = json.loads(args.distribuciones) if args.distribuciones else None
+        resultado = ejecutar_monte_carlo(args.muestras, args.semilla, distribuciones, args.tamano_bloque, mostrar_progreso)
+    except ValueError as e:
+        print(f"\n❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(file=sys.stderr)
+
+    print(generar_resumen_monte_carlo(resultado))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as archivo:
+            json.dump(resultado_a_json(resultado), archivo, ensure_ascii=False, indent=2)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# perfil_pulso.py
+# =============================================================================
+# PERFIL_PULSO.PY - MÓDULO DEL PULSO DE DECELERACIÓN
+# =============================================================================
+# Este módulo contiene el perfil del pulso de deceleración del modelo simple:
+# aceleración constante desde el impacto hasta el tiempo de detención y cero
+# después. El perfil guarda solo sus puntos de corte exactos; la cinemática
+# tiene forma cerrada y las muestras se generan bajo demanda, a la resolución
+# que pida cada consumidor (gráficos, animaciones y textos).
+
+import numpy as np
+
+GRAVEDAD = 9.81  # m/s²
+
+class PerfilPulso:
+    """
+    Pulso rectangular de deceleración de un cuerpo de masa fija.
+
+    No se modifica tras crearlo y se compara por valor, así que sirve como
+    entrada de la figura plantilla y de los nodos del grafo de simulación.
+    """
+
+    __slots__ = ('tiempo_detencion', 'velocidad_inicial', 'masa_cuerpo')
+
+    def __init__(self, tiempo_detencion, velocidad_inicial, masa_cuerpo):
+        """
+        Args:
+            tiempo_detencion (float): Duración del pulso en segundos
+            velocidad_inicial (float): Velocidad al inicio del impacto en m/s
+            masa_cuerpo (float): Masa del cuerpo en kg
+        """
+        if tiempo_detencion <= 0:
+            raise ValueError("El tiempo de detención debe ser mayor a cero")
+        if masa_cuerpo <= 0 or velocidad_inicial < 0:
+            raise ValueError("La masa debe ser mayor a cero y la velocidad no negativa")
+        self.tiempo_detencion = float(tiempo_detencion)
+        self.velocidad_inicial = float(velocidad_inicial)
+        self.masa_cuerpo = float(masa_cuerpo)
+
+    def _clave(self):
+        return (self.tiempo_detencion, self.velocidad_inicial, self.masa_cuerpo)
+
+    def __eq__(self, otro):
+        return isinstance(otro, PerfilPulso) and self._clave() == otro._clave()
+
+    def __hash__(self):
+        return hash(self._clave())
+
+    def __repr__(self):
+        return (f"PerfilPulso(tiempo_detencion={self.tiempo_detencion!r}, "
+                f"velocidad_inicial={self.velocidad_inicial!r}, masa_cuerpo={self.masa_cuerpo!r})")
+
+    # -------------------------------------------------------------------------
+    # Magnitudes constantes del pulso (mismas fórmulas que calcular_parametros_fisica)
+    # -------------------------------------------------------------------------
+
+    @property
+    def aceleracion(self):
+        """Aceleración durante el pulso en m/s² (negativa: frena)"""
+        return -self.velocidad_inicial / self.tiempo_detencion
+
+    @property
+    def fuerza(self):
+        """Fuerza sobre el cuerpo durante el pulso en N (negativa)"""
+        return self.masa_cuerpo * self.aceleracion
+
+    @property
+    def g_force(self):
+        """Aceleración durante el pulso en G (negativa)"""
+        return self.aceleracion / GRAVEDAD
+
+    @property
+    def impulso(self):
+        """Impulso total recibido en N·s: m × Δv, independiente de la duración"""
+        return self.masa_cuerpo * self.velocidad_inicial
+
+    @property
+    def distancia_detencion(self):
+        """Distancia recorrida hasta detenerse en m: v0 × Δt / 2"""
+        return 0.5 * self.velocidad_inicial * self.tiempo_detencion
+
+    @property
+    def cortes(self):
+        """Instantes exactos en los que cambia la aceleración: inicio y fin del pulso"""
+        return (0.0, self.tiempo_detencion)
+
+    def valor(self, magnitud):
+        """
+        Devuelve el valor absoluto de una magnitud durante el pulso
+
+        Args:
+            magnitud (str): "fuerza", "aceleracion" o "g_force"
+
+        Returns:
+            float: Valor absoluto de la magnitud
+        """
+        if magnitud not in ('fuerza', 'aceleracion', 'g_force'):
+            raise ValueError(f"Magnitud desconocida: {magnitud}")
+        return abs(getattr(self, magnitud))
+
+    # -------------------------------------------------------------------------
+    # Cinemática en forma cerrada
+    # -------------------------------------------------------------------------
+
+    def velocidad(self, t):
+        """
+        Velocidad del cuerpo en m/s en los instantes t (0 tras el pulso)
+        """
+        t_pulso = np.minimum(np.asarray(t, dtype=np.float64), self.tiempo_detencion)
+        return self.velocidad_inicial + self.aceleracion * t_pulso
+
+    def posicion(self, t):
+        """
+        Distancia recorrida desde el impacto en m en los instantes t
+        """
+        t_pulso = np.minimum(np.asarray(t, dtype=np.float64), self.tiempo_detencion)
+        return self.velocidad_inicial * t_pulso + 0.5 * self.aceleracion * t_pulso**2
+
+    def escalon(self, magnitud='fuerza', tiempo_max=None):
+        """
+        Devuelve solo los vértices de la curva de una magnitud, para dibujarla como escalón
+
+        Args:
+            magnitud (str): "fuerza", "aceleracion" o "g_force"
+            tiempo_max (float, optional): Fin del eje de tiempo (por defecto, el del pulso)
+
+        Returns:
+            tuple: (tiempos, valores) con cuatro vértices como mucho
+        """
+        valor = self.valor(magnitud)
+        if tiempo_max is None or tiempo_max <= self.tiempo_detencion:
+            return np.array([0.0, self.tiempo_detencion]), np.array([valor, valor])
+        return (np.array([0.0, self.tiempo_detencion, self.tiempo_detencion, tiempo_max]),
+                np.array([valor, valor, 0.0, 0.0]))
+
+    def muestrear(self, num_puntos, tiempo_max=None):
+        """
+        Muestrea la cinemática del pulso en puntos equiespaciados
+
+        Args:
+            num_puntos (int): Número de muestras (incluidos ambos extremos)
+            tiempo_max (float, optional): Último instante (por defecto, el fin del pulso)
+
+        Returns:
+            dict: Arrays 't', 'posicion', 'velocidades', 'fuerzas' y 'fuerzas_g'
+        """
+        if num_puntos < 2:
+            raise ValueError("Hacen falta al menos dos muestras")
+        t = np.linspace(0, self.tiempo_detencion if tiempo_max is None else tiempo_max, num_puntos)
+        # El pulso incluye su instante final: la fuerza se muestra hasta t = Δt inclusive
+        en_pulso = t <= self.tiempo_detencion
+        fuerzas = np.where(en_pulso, self.valor('fuerza'), 0.0)
+        return {
+            't': t,
+            'posicion': self.posicion(t),
+            'velocidades': self.velocidad(t),
+            'fuerzas': fuerzas,
+            'fuerzas_g': np.where(en_pulso, self.valor('g_force'), 0.0)
+        }
+
+def perfiles_simulacion(datos_simulacion):
+    """
+    Construye los perfiles sin y con cinturón de una simulación
+
+    Args:
+        datos_simulacion (dict): Datos con velocidad_ms, masa_cuerpo y los tiempos de detención
+
+    Returns:
+        tuple: (perfil_sin, perfil_con)
+    """
+    velocidad_ms = datos_simulacion['velocidad_ms']
+    masa_cuerpo = datos_simulacion['masa_cuerpo']
+    return (PerfilPulso(datos_simulacion['tiempo_sin_cinturon'], velocidad_ms, masa_cuerpo),
+            PerfilPulso(datos_simulacion['tiempo_con_cinturon'], velocidad_ms, masa_cuerpo))
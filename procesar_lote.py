@@ -0,0 +1,312 @@
+# procesar_lote.py
+# =============================================================================
+# PROCESAR_LOTE.PY - PROCESAMIENTO POR LOTES DESDE LA LÍNEA DE COMANDOS
+# =============================================================================
+# Lee un archivo de escenarios (CSV o Parquet) por bloques, calcula la física
+# de cada bloque de forma vectorizada y escribe los resultados en CSV o
+# Parquet a medida que avanza, con memoria constante. No genera gráficos.
+#
+# Columnas de entrada: masa_cuerpo, velocidad_kmh y, opcionalmente,
+# tiempo_sin_cinturon y tiempo_con_cinturon. Las filas con ambos tiempos se
+# calculan en modo manual y el resto en modo realista.
+#
+# Uso:
+#   python procesar_lote.py escenarios.csv resultados.csv
+#   python procesar_lote.py escenarios.parquet resultados.parquet --tamano-bloque 500000
+
+import argparse
+import csv
+import os
+import sys
+import time
+import numpy as np
+from calculos_fisica import determinar_nivel_riesgo_lote, simular_colision_lote_mixto
+
+COLUMNAS_ENTRADA = ['masa_cuerpo', 'velocidad_kmh', 'tiempo_sin_cinturon', 'tiempo_con_cinturon']
+COLUMNAS_OBLIGATORIAS = ['masa_cuerpo', 'velocidad_kmh']
+# Cifras significativas de los números en la salida CSV (repr exacto es ~2x más lento)
+CIFRAS_CSV = 12
+
+COLUMNAS_SALIDA = [
+    'masa_cuerpo', 'velocidad_kmh', 'valido', 'modo_calculo', 'velocidad_ms',
+    'tiempo_sin_cinturon', 'aceleracion_sin', 'fuerza_sin', 'g_force_sin', 'nivel_riesgo_sin',
+    'tiempo_con_cinturon', 'aceleracion_con', 'fuerza_con', 'g_force_con', 'nivel_riesgo_con'
+]
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ImportError("Para leer o escribir Parquet instala pyarrow: pip install pyarrow")
+
+def detectar_formato(ruta):
+    """
+    Deduce el formato de un archivo a partir de su extensión
+
+    Args:
+        ruta (str): Ruta del archivo
+
+    Returns:
+        str: "csv" o "parquet"
+    """
+    extension = os.path.splitext(ruta)[1].lower()
+    if extension in ('.parquet', '.pq'):
+        return 'parquet'
+    if extension in ('.csv', '.txt'):
+        return 'csv'
+    raise ValueError(f"Formato no reconocido para {ruta} (usa .csv o .parquet)")
+
+def _a_float(texto):
+    try:
+        return float(texto)
+    except ValueError:
+        return np.nan  # vacío o no numérico: el escenario será inválido o realista
+
+def _convertir_columna(textos):
+    try:
+        # Camino rápido: NumPy convierte todos los textos en una sola llamada
+        return np.array([t or 'nan' for t in textos], dtype=np.float64)
+    except ValueError:
+        return np.array([_a_float(t) for t in textos], dtype=np.float64)
+
+def leer_csv_por_bloques(ruta, tamano_bloque):
+    """
+    Lee un CSV de escenarios por bloques
+
+    Args:
+        ruta (str): Ruta del CSV (con encabezado)
+        tamano_bloque (int): Filas por bloque
+
+    Yields:
+        tuple: (columnas, progreso) con columnas como dict de arrays float64
+            y progreso como fracción del archivo leída (0 a 1)
+    """
+    tamano_archivo = os.path.getsize(ruta) or 1
+    # utf-8-sig: las exportaciones de Excel empiezan con BOM, que si no quedaría en el primer encabezado
+    with open(ruta, newline='', encoding='utf-8-sig') as archivo:
+        lector = csv.reader(archivo)
+        encabezado = [c.strip() for c in next(lector, [])]
+        faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in encabezado]
+        if faltantes:
+            raise ValueError(f"Faltan columnas en {ruta}: {', '.join(faltantes)}")
+        indices = {c: encabezado.index(c) for c in COLUMNAS_ENTRADA if c in encabezado}
+
+        filas = []
+        for fila in lector:
+            filas.append(fila)
+            if len(filas) == tamano_bloque:
+                yield _columnas_csv(filas, indices), archivo.buffer.tell() / tamano_archivo
+                filas = []
+        if filas:
+            yield _columnas_csv(filas, indices), 1.0
+
+def _columnas_csv(filas, indices):
+    n = len(filas)
+    columnas = {}
+    for nombre in COLUMNAS_ENTRADA:
+        if nombre not in indices:
+            columnas[nombre] = np.full(n, np.nan)
+            continue
+        i = indices[nombre]
+        columnas[nombre] = _convertir_columna([f[i] if i < len(f) else '' for f in filas])
+    return columnas
+
+def leer_parquet_por_bloques(ruta, tamano_bloque):
+    """
+    Lee un Parquet de escenarios por bloques (requiere pyarrow)
+
+    Args:
+        ruta (str): Ruta del archivo Parquet
+        tamano_bloque (int): Filas por bloque
+
+    Yields:
+        tuple: (columnas, progreso) como leer_csv_por_bloques
+    """
+    pa = _importar_pyarrow()
+    archivo = pa.parquet.ParquetFile(ruta)
+    disponibles = set(archivo.schema_arrow.names)
+    faltantes = [c for c in COLUMNAS_OBLIGATORIAS if c not in disponibles]
+    if faltantes:
+        raise ValueError(f"Faltan columnas en {ruta}: {', '.join(faltantes)}")
+    total = archivo.metadata.num_rows or 1
+    leidas = 0
+    for lote in archivo.iter_batches(batch_size=tamano_bloque, columns=[c for c in COLUMNAS_ENTRADA if c in disponibles]):
+        columnas = {}
+        for nombre in COLUMNAS_ENTRADA:
+            if nombre in disponibles:
+                columna = lote.column(nombre).cast(pa.float64())
+                columnas[nombre] = columna.to_numpy(zero_copy_only=False).astype(np.float64, copy=False)
+            else:
+                columnas[nombre] = np.full(lote.num_rows, np.nan)
+        leidas += lote.num_rows
+        yield columnas, leidas / total
+
+def calcular_bloque(columnas):
+    """
+    Calcula la física de un bloque de escenarios
+
+    Args:
+        columnas (dict): Arrays de entrada (COLUMNAS_ENTRADA)
+
+    Returns:
+        dict: Arrays de salida (COLUMNAS_SALIDA)
+    """
+    usar_tiempos_manuales = ~np.isnan(columnas['tiempo_sin_cinturon']) & ~np.isnan(columnas['tiempo_con_cinturon'])
+    resultado = simular_colision_lote_mixto(
+        columnas['masa_cuerpo'], columnas['velocidad_kmh'],
+        columnas['tiempo_sin_cinturon'], columnas['tiempo_con_cinturon'],
+        usar_tiempos_manuales
+    )
+    salida = {
+        'masa_cuerpo': columnas['masa_cuerpo'],
+        'velocidad_kmh': columnas['velocidad_kmh'],
+        'valido': resultado['valido'],
+        'modo_calculo': resultado['modo_calculo'],
+        'velocidad_ms': resultado['velocidad_ms']
+    }
+    for sufijo in ('sin', 'con'):
+        p = resultado[f'parametros_{sufijo}']
+        salida[f'tiempo_{sufijo}_cinturon'] = p['tiempo']
+        for campo in ('aceleracion', 'fuerza', 'g_force'):
+            salida[f'{campo}_{sufijo}'] = p[campo]
+        salida[f'nivel_riesgo_{sufijo}'] = determinar_nivel_riesgo_lote(p['g_force'])
+    return salida
+
+class EscritorResultados:
+    """
+    Escribe bloques de resultados en CSV o Parquet a medida que se calculan
+    """
+
+    def __init__(self, ruta, formato):
+        """
+        Args:
+            ruta (str): Ruta del archivo de salida
+            formato (str): "csv" o "parquet"
+        """
+        self.formato = formato
+        if formato == 'parquet':
+            self._pa = _importar_pyarrow()
+            esquema = self._pa.schema([
+                (c, self._pa.bool_() if c == 'valido' else
+                    self._pa.string() if c in ('modo_calculo', 'nivel_riesgo_sin', 'nivel_riesgo_con') else
+                    self._pa.float64())
+                for c in COLUMNAS_SALIDA
+            ])
+            self._escritor = self._pa.parquet.ParquetWriter(ruta, esquema)
+        else:
+            self._archivo = open(ruta, 'w', newline='', encoding='utf-8')
+            self._archivo.write(",".join(COLUMNAS_SALIDA) + "\n")
+
+    def escribir(self, salida):
+        """
+        Escribe un bloque de resultados
+
+        Args:
+            salida (dict): Arrays de salida (COLUMNAS_SALIDA)
+        """
+        if self.formato == 'parquet':
+            tabla = self._pa.table({c: salida[c] for c in COLUMNAS_SALIDA}, schema=self._escritor.schema)
+            self._escritor.write_table(tabla)
+            return
+        # Los valores son números o etiquetas fijas sin comas: no hace falta csv.writer,
+        # y unir textos ya formateados es mucho más rápido
+        formato_numero = f"%.{CIFRAS_CSV}g"
+        columnas = []
+        for c in COLUMNAS_SALIDA:
+            valores = salida[c]
+            if valores.dtype == np.float64:
+                # NaN (escenario inválido) se escribe como celda vacía
+                columnas.append(['' if v != v else formato_numero % v for v in valores.tolist()])
+            else:
+                columnas.append(['' if v is None else str(v) for v in valores.tolist()])
+        self._archivo.write("\n".join(map(",".join, zip(*columnas))) + "\n")
+
+    def cerrar(self):
+        """
+        Cierra el archivo de salida
+        """
+        if self.formato == 'parquet':
+            self._escritor.close()
+        else:
+            self._archivo.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *excepcion):
+        self.cerrar()
+
+def procesar_archivo(entrada, salida, tamano_bloque=100_000, mostrar_progreso=True):
+    """
+    Procesa un archivo de escenarios completo por bloques
+
+    Args:
+        entrada (str): Archivo de escenarios (CSV o Parquet)
+        salida (str): Archivo de resultados (CSV o Parquet)
+        tamano_bloque (int): Filas por bloque (la memoria usada es proporcional a esto)
+        mostrar_progreso (bool): Si informar del avance por stderr
+
+    Returns:
+        dict: Filas procesadas, filas inválidas, segundos y filas por segundo
+    """
+    if tamano_bloque <= 0:
+        raise ValueError("El tamaño de bloque debe ser mayor a cero")
+    lector = leer_parquet_por_bloques if detectar_formato(entrada) == 'parquet' else leer_csv_por_bloques
+
+    formato_salida = detectar_formato(salida)
+
+    # Escribir en un temporal y renombrar: un fallo a mitad no deja un archivo incompleto
+    ruta_temporal = f"{salida}.{os.getpid()}.tmp"
+    filas = invalidas = 0
+    inicio = time.perf_counter()
+    try:
+        with EscritorResultados(ruta_temporal, formato_salida) as escritor:
+            for columnas, progreso in lector(entrada, tamano_bloque):
+                resultado = calcular_bloque(columnas)
+                escritor.escribir(resultado)
+                filas += len(resultado['valido'])
+                invalidas += int((~resultado['valido']).sum())
+                if mostrar_progreso:
+                    segundos = time.perf_counter() - inicio
+                    print(f"\r⏳ {progreso:6.1%} | {filas:,} filas | {filas / segundos:,.0f} filas/s",
+                          end='', file=sys.stderr, flush=True)
+        os.replace(ruta_temporal, salida)
+    except BaseException:
+        if os.path.exists(ruta_temporal):
+            os.remove(ruta_temporal)
+        raise
+
+    segundos = time.perf_counter() - inicio
+    if mostrar_progreso:
+        print(file=sys.stderr)
+    return {
+        'filas': filas,
+        'invalidas': invalidas,
+        'segundos': segundos,
+        'filas_por_segundo': filas / segundos if segundos > 0 else float('inf')
+    }
+
+def main():
+    """
+    Punto de entrada por línea de comandos
+    """
+    parser = argparse.ArgumentParser(description="Calcula la física de un archivo de escenarios por bloques")
+    parser.add_argument('entrada', help="Archivo de escenarios (.csv o .parquet)")
+    parser.add_argument('salida', help="Archivo de resultados (.csv o .parquet)")
+    parser.add_argument('--tamano-bloque', type=int, default=100_000, help="Filas por bloque")
+    parser.add_argument('--silencioso', action='store_true', help="No mostrar el progreso")
+    args = parser.parse_args()
+
+    try:
+        resumen = procesar_archivo(args.entrada, args.salida, args.tamano_bloque, not args.silencioso)
+    except (OSError, ValueError, ImportError) as e:
+        print(f"❌ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✅ {resumen['filas']:,} filas en {resumen['segundos']:.2f} s "
+          f"({resumen['filas_por_segundo']:,.0f} filas/s), {resumen['invalidas']:,} inválidas → {args.salida}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# registro_figuras.py
+# =============================================================================
+# REGISTRO_FIGURAS.PY - MÓDULO DE CICLO DE VIDA DE LAS FIGURAS
+# =============================================================================
+# Este módulo lleva la cuenta de las figuras de matplotlib vivas en el proceso
+# y limita cuántas puede haber. Las figuras normales se siguen con referencias
+# débiles (se liberan en cuanto nadie las usa) y se cierran al liberarlas tras
+# renderizarlas. Las figuras plantilla se prestan en exclusiva a quien las pide
+# y, al devolverlas, quedan libres para la siguiente petición de cualquier hilo.
+# Por encima del límite solo se expulsan las plantillas libres, de la más
+# antigua a la más reciente: una figura que alguien todavía usa no se cierra
+# nunca. Si aun así se supera el límite, se recolectan las figuras abandonadas
+# en ciclos de referencias y, si siguen sobrando, solo se cuenta en las métricas.
+
+import gc
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+MAX_FIGURAS_VIVAS = int(os.environ.get("MAX_FIGURAS_VIVAS", 32))
+# Cada plantilla renderizada retiene ~11,5 MB de píxeles: solo se guardan unas pocas libres
+MAX_PLANTILLAS_LIBRES = int(os.environ.get("MAX_PLANTILLAS_LIBRES", 4))
+
+def bytes_figura(fig):
+    """
+    Devuelve los bytes del búfer de píxeles de una figura ya renderizada
+
+    Args:
+        fig (matplotlib.figure.Figure): Figura
+
+    Returns:
+        int: Ancho × alto × 4 del último renderizado Agg (0 si no se ha renderizado)
+    """
+    renderer = getattr(fig.canvas, 'renderer', None)
+    if renderer is None:
+        return 0
+    return int(renderer.width) * int(renderer.height) * 4
+
+def cerrar_figura(fig):
+    """
+    Vacía una figura y suelta su búfer de píxeles
+
+    Args:
+        fig (matplotlib.figure.Figure): Figura a cerrar
+    """
+    fig.clear()
+    # Un lienzo nuevo sin renderizar: el anterior y su búfer quedan sin referencias
+    FigureCanvasAgg(fig)
+    vars(fig).pop('_estado_plantilla', None)
+
+class RegistroFiguras:
+    """
+    Registro acotado de figuras vivas, seguro entre hilos.
+
+    Solo se expulsan plantillas libres, de la menos usada recientemente a la
+    más reciente. Las figuras normales y las plantillas prestadas siguen en
+    manos de quien las pidió y no se cierran nunca desde aquí.
+    limite_superado cuenta los registros que dejaron el total por encima del
+    límite porque todas las figuras estaban en uso.
+    """
+
+    def __init__(self, max_figuras=MAX_FIGURAS_VIVAS, max_plantillas_libres=MAX_PLANTILLAS_LIBRES):
+        """
+        Args:
+            max_figuras (int): Número máximo de figuras vivas antes de expulsar
+            max_plantillas_libres (int): Número máximo de plantillas libres guardadas
+        """
+        if max_figuras < 1 or max_plantillas_libres < 0:
+            raise ValueError("El máximo de figuras debe ser al menos 1 y el de plantillas libres no negativo")
+        self.max_figuras = max_figuras
+        self.max_plantillas_libres = max_plantillas_libres
+        self._figuras = OrderedDict()   # id -> referencia débil, de la más antigua a la más reciente
+        self._libres = OrderedDict()    # id -> plantilla libre (referencia fuerte)
+        self._prestadas = set()         # ids de plantillas prestadas
+        # RLock: el callback de una referencia débil puede saltar dentro de una sección bloqueada
+        self._lock = threading.RLock()
+        self.creadas = 0
+        self.cerradas = 0
+        self.expulsadas = 0
+        self.recicladas = 0
+        self.limite_superado = 0
+
+    def _olvidar(self, clave):
+        with self._lock:
+            self._figuras.pop(clave, None)
+            self._libres.pop(clave, None)
+            self._prestadas.discard(clave)
+
+    def _expulsar_sobrantes(self):
+        # Devuelve las figuras a cerrar; se cierran fuera del lock
+        expulsadas = []
+        while self._libres and (len(self._figuras) > self.max_figuras
+                                or len(self._libres) > self.max_plantillas_libres):
+            clave, fig = self._libres.popitem(last=False)
+            self._figuras.pop(clave, None)
+            self.expulsadas += 1
+            expulsadas.append(fig)
+        return expulsadas
+
+    def registrar(self, fig):
+        """
+        Empieza a seguir una figura recién creada
+
+        Args:
+            fig (matplotlib.figure.Figure): Figura nueva
+        """
+        clave = id(fig)
+        with self._lock:
+            self._figuras[clave] = weakref.ref(fig, lambda _, clave=clave: self._olvidar(clave))
+            self.creadas += 1
+            expulsadas = self._expulsar_sobrantes()
+            excedido = len(self._figuras) > self.max_figuras
+        for figura in expulsadas:
+            cerrar_figura(figura)
+        if excedido:
+            # Las figuras abandonadas sin liberar forman ciclos de referencias:
+            # sus referencias débiles solo mueren al recolectarlas
+            gc.collect()
+            with self._lock:
+                if len(self._figuras) > self.max_figuras:
+                    self.limite_superado += 1
+
+    def prestar_plantilla(self, tipo):
+        """
+        Presta en exclusiva la plantilla libre más reciente de un tipo
+
+        Args:
+            tipo (str): Tipo de plantilla (por ejemplo, "graficos")
+
+        Returns:
+            dict: Estado guardado con guardar_plantilla (incluye 'figura'), o
+                None si no hay ninguna libre
+        """
+        with self._lock:
+            for clave in reversed(self._libres):
+                fig = self._libres[clave]
+                estado = vars(fig).get('_estado_plantilla')
+                if estado is not None and estado['tipo'] == tipo:
+                    del self._libres[clave]
+                    self._prestadas.add(clave)
+                    return estado
+        return None
+
+    def guardar_plantilla(self, tipo, estado):
+        """
+        Convierte una figura registrada en plantilla, prestada a quien la creó
+
+        Args:
+            tipo (str): Tipo de plantilla
+            estado (dict): Estado de la plantilla; 'figura' es la figura. Se
+                guarda en la propia figura y lo devuelve prestar_plantilla.
+        """
+        fig = estado['figura']
+        estado['tipo'] = tipo
+        fig._estado_plantilla = estado
+        with self._lock:
+            self._prestadas.add(id(fig))
+
+    def liberar(self, fig):
+        """
+        Indica que una figura ya se renderizó y no se va a usar más
+
+        Las plantillas vuelven a quedar libres para la siguiente petición; el
+        resto de figuras se cierran.
+
+        Args:
+            fig (matplotlib.figure.Figure): Figura a liberar
+        """
+        clave = id(fig)
+        with self._lock:
+            if clave in self._prestadas and clave in self._figuras:
+                self._prestadas.discard(clave)
+                self._libres[clave] = fig
+                self._figuras.move_to_end(clave)
+                self.recicladas += 1
+                expulsadas = self._expulsar_sobrantes()
+            else:
+                expulsadas = None
+        if expulsadas is None:
+            self.cerrar(fig)
+            return
+        for figura in expulsadas:
+            cerrar_figura(figura)
+
+    def cerrar(self, fig):
+        """
+        Deja de seguir una figura y la cierra
+
+        Args:
+            fig (matplotlib.figure.Figure): Figura a cerrar
+        """
+        clave = id(fig)
+        with self._lock:
+            self._figuras.pop(clave, None)
+            self._libres.pop(clave, None)
+            self._prestadas.discard(clave)
+            self.cerradas += 1
+        cerrar_figura(fig)
+
+    def estadisticas(self):
+        """
+        Devuelve los contadores del registro
+
+        Returns:
+            dict: Figuras vivas, plantillas libres y prestadas, bytes de los
+                búferes de píxeles y contadores de creadas, cerradas,
+                expulsadas, recicladas y limite_superado
+        """
+        with self._lock:
+            figuras = [ref() for ref in self._figuras.values()]
+            estadisticas = {
+                'vivas': sum(fig is not None for fig in figuras),
+                'plantillas_libres': len(self._libres),
+                'plantillas_prestadas': len(self._prestadas),
+                'max_figuras': self.max_figuras,
+                'max_plantillas_libres': self.max_plantillas_libres,
+                'creadas': self.creadas,
+                'cerradas': self.cerradas,
+                'expulsadas': self.expulsadas,
+                'recicladas': self.recicladas,
+                'limite_superado': self.limite_superado
+            }
+        estadisticas['bytes'] = sum(bytes_figura(fig) for fig in figuras if fig is not None)
+        return estadisticas
+
+registro_figuras = RegistroFiguras()
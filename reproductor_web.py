@@ -0,0 +1,326 @@
+# reproductor_web.py
+# =============================================================================
+# REPRODUCTOR_WEB.PY - MÓDULO DEL REPRODUCTOR EN EL NAVEGADOR
+# =============================================================================
+# Este módulo contiene el reproductor que dibuja la animación de la colisión en
+# el navegador a partir de la trayectoria muestreada, sin generar vídeo, y el
+# reproductor de los vídeos en streaming HLS que genera el servidor
+#
+# hls.js se sirve desde la propia aplicación (GET /api/recursos/hls.min.js), no
+# desde un CDN, y solo si su huella coincide con HASH_HLS; la etiqueta <script>
+# lleva esa misma huella en integrity. Paso de instalación: descarga la versión
+# fijada en static/ y la comprueba contra HASH_HLS
+#   python reproductor_web.py
+# Al cambiar VERSION_HLS, se descarga la nueva versión, se comprueba a mano (por
+# ejemplo, con la huella que publica el CDN) y se fija su huella en HASH_HLS:
+#   python reproductor_web.py --fijar
+
+import argparse
+import base64
+import functools
+import hashlib
+import html
+import json
+import os
+import sys
+import urllib.request
+
+# Versión exacta de hls.js: cámbiala junto con HASH_HLS y la copia de static/
+VERSION_HLS = "1.6.15"
+# Huella SRI (sha384) de hls.min.js de VERSION_HLS. Mientras esté vacía no se
+# sirve ninguna copia y solo reproducen los navegadores con HLS nativo (Safari)
+HASH_HLS = ""
+URL_DESCARGA_HLS = f"https://cdn.jsdelivr.net/npm/hls.js@{VERSION_HLS}/dist/hls.min.js"
+RUTA_HLS = os.environ.get(
+    "RUTA_HLS", os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "hls.min.js")
+)
+# La versión en la URL permite al navegador guardarlo en caché sin revalidar
+URL_HLS = f"/api/recursos/hls.min.js?v={VERSION_HLS}"
+
+# Script cargado en <head>: inicializa cada <canvas class="reproductor-colision">
+# que aparezca en la página y lo anima con requestAnimationFrame
+SCRIPT_REPRODUCTOR = """
+<script>
+(function () {
+    function decodificar(payload) {
+        const binario = atob(payload.datos);
+        const bytes = new Uint8Array(binario.length);
+        for (let i = 0; i < binario.length; i++) bytes[i] = binario.charCodeAt(i);
+        const valores = new Float32Array(bytes.buffer);
+        const n = payload.frames;
+        const series = {};
+        payload.campos.forEach(function (campo, k) { series[campo] = valores.subarray(k * n, (k + 1) * n); });
+        return series;
+    }
+
+    function iniciar(canvas) {
+        const texto = canvas.dataset.trayectoria;
+        if (!texto || canvas._trayectoria === texto) return;
+        canvas._trayectoria = texto;
+
+        const p = JSON.parse(texto);
+        const s = decodificar(p);
+        const ctx = canvas.getContext('2d');
+        const W = canvas.width, H = canvas.height;
+        const m = {izq: 60, der: 20, sup: 40, inf: 40};
+        const sx = function (x) { return m.izq + (x - p.xlim[0]) / (p.xlim[1] - p.xlim[0]) * (W - m.izq - m.der); };
+        const sy = function (y) { return m.sup + (1 - (y + 1) / 2) * (H - m.sup - m.inf); };
+        const escalaX = (W - m.izq - m.der) / (p.xlim[1] - p.xlim[0]);
+        const escalaY = (H - m.sup - m.inf) / 2;
+
+        function dibujar(i) {
+            const x = s.posicion[i];
+            ctx.fillStyle = 'white';
+            ctx.fillRect(0, 0, W, H);
+            ctx.fillStyle = '#000';
+            ctx.font = 'bold 16px sans-serif';
+            ctx.textAlign = 'center';
+            ctx.fillText('Movimiento del Cuerpo (' + (p.con_cinturon ? 'Con' : 'Sin') + ' Cinturón)', W / 2, 24);
+
+            // Vehículo
+            ctx.fillStyle = 'rgba(211, 211, 211, 0.5)';
+            ctx.fillRect(sx(-0.5), sy(1), 2 * escalaX, 2 * escalaY);
+            // Obstáculo
+            ctx.strokeStyle = 'rgba(255, 0, 0, 0.7)';
+            ctx.setLineDash([6, 4]);
+            ctx.beginPath();
+            ctx.moveTo(sx(p.obstaculo_x), sy(1));
+            ctx.lineTo(sx(p.obstaculo_x), sy(-1));
+            ctx.stroke();
+            ctx.setLineDash([]);
+            // Cuerpo y cabeza
+            ctx.fillStyle = 'tan';
+            ctx.fillRect(sx(x - 0.1), sy(0.2), 0.2 * escalaX, 0.5 * escalaY);
+            ctx.beginPath();
+            ctx.ellipse(sx(x), sy(0.2), 0.1 * escalaX, 0.15 * escalaY, 0, 0, 2 * Math.PI);
+            ctx.fill();
+            // Cinturón
+            if (p.con_cinturon) {
+                ctx.strokeStyle = 'black';
+                ctx.lineWidth = 3;
+                ctx.beginPath();
+                ctx.moveTo(sx(x - 0.1), sy(0.4));
+                ctx.lineTo(sx(x + 0.1), sy(-0.2));
+                ctx.stroke();
+                ctx.lineWidth = 1;
+            }
+            // Marco del eje
+            ctx.strokeStyle = 'black';
+            ctx.strokeRect(m.izq, m.sup, W - m.izq - m.der, H - m.sup - m.inf);
+            // Información
+            ctx.textAlign = 'left';
+            ctx.font = '13px sans-serif';
+            ctx.fillStyle = 'rgba(255, 255, 255, 0.8)';
+            ctx.fillRect(m.izq + 8, m.sup + 8, 170, 58);
+            ctx.fillStyle = 'black';
+            ctx.fillText('Velocidad: ' + s.velocidad[i].toFixed(1) + ' m/s', m.izq + 14, m.sup + 26);
+            ctx.fillText('Fuerza: ' + Math.round(s.fuerza[i]).toLocaleString('en-US') + ' N', m.izq + 14, m.sup + 43);
+            ctx.fillText('Fuerzas G: ' + s.fuerza_g[i].toFixed(1) + ' G', m.izq + 14, m.sup + 60);
+            ctx.textAlign = 'center';
+            ctx.fillText('Distancia (m)', W / 2, H - 12);
+        }
+
+        let inicio = null;
+        function paso(marca) {
+            // Detener el bucle si el canvas se reemplazó o cambió de trayectoria
+            if (!canvas.isConnected || canvas._trayectoria !== texto) return;
+            if (inicio === null) inicio = marca;
+            // Un segundo de pausa en el último frame antes de repetir
+            const frame = Math.floor((marca - inicio) / 1000 * p.fps) % (p.frames + p.fps);
+            dibujar(Math.min(frame, p.frames - 1));
+            requestAnimationFrame(paso);
+        }
+        requestAnimationFrame(paso);
+    }
+
+    function buscar() {
+        document.querySelectorAll('canvas.reproductor-colision').forEach(iniciar);
+    }
+    new MutationObserver(buscar).observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, attributeFilter: ['data-trayectoria']
+    });
+})();
+</script>
+"""
+
+def generar_html_reproductor(trayectoria_sin, trayectoria_con, ancho=1000, alto=400):
+    """
+    Genera el HTML con los dos lienzos del reproductor en el navegador
+
+    Args:
+        trayectoria_sin (dict): Trayectoria sin cinturón (animacion.generar_trayectoria)
+        trayectoria_con (dict): Trayectoria con cinturón
+        ancho (int): Ancho de cada lienzo en píxeles
+        alto (int): Alto de cada lienzo en píxeles
+
+    Returns:
+        str: Fragmento HTML
+    """
+    lienzos = []
+    for trayectoria in (trayectoria_sin, trayectoria_con):
+        datos = html.escape(json.dumps(trayectoria, separators=(',', ':')), quote=True)
+        lienzos.append(
+            f'<canvas class="reproductor-colision" width="{ancho}" height="{alto}" '
+            f'style="width: 100%; max-width: {ancho}px;" data-trayectoria="{datos}"></canvas>'
+        )
+    return '<div class="reproductores-colision">' + ''.join(lienzos) + '</div>'
+
+# Scripts cargados en <head> para los vídeos en streaming: Safari reproduce HLS
+# de forma nativa y el resto de navegadores usa hls.js (sin la copia local, solo
+# se reproduce de forma nativa). Cada
+# <video class="stream-colision"> empieza desde el primer segmento y sigue la
+# lista mientras el servidor la amplía
+_ATRIBUTOS_INTEGRIDAD_HLS = f' integrity="{HASH_HLS}" crossorigin="anonymous"' if HASH_HLS else ''
+SCRIPT_STREAMS = f'\n<script src="{URL_HLS}"{_ATRIBUTOS_INTEGRIDAD_HLS}></script>' + """
+<script>
+(function () {
+    function iniciar(video) {
+        const url = video.dataset.stream;
+        if (!url || video._stream === url) return;
+        video._stream = url;
+        if (video._hls) {
+            video._hls.destroy();
+            video._hls = null;
+        }
+        if (video.canPlayType('application/vnd.apple.mpegurl')) {
+            video.src = url;
+        } else if (window.Hls && Hls.isSupported()) {
+            // La lista aún en curso parece un directo: empezar por el principio, no por el final
+            const hls = new Hls({startPosition: 0});
+            hls.loadSource(url);
+            hls.attachMedia(video);
+            video._hls = hls;
+        }
+        video.play().catch(function () {});
+    }
+
+    function buscar() {
+        document.querySelectorAll('video.stream-colision').forEach(iniciar);
+    }
+    new MutationObserver(buscar).observe(document.documentElement, {
+        childList: true, subtree: true, attributes: true, attributeFilter: ['data-stream']
+    });
+})();
+</script>
+"""
+
+def generar_html_streams(url_sin, url_con, ancho=1000):
+    """
+    Genera el HTML con los dos vídeos en streaming HLS
+
+    Args:
+        url_sin (str): URL de la lista HLS sin cinturón (api_calculos.url_stream)
+        url_con (str): URL de la lista HLS con cinturón
+        ancho (int): Ancho máximo de cada vídeo en píxeles
+
+    Returns:
+        str: Fragmento HTML
+    """
+    videos = []
+    for titulo, url in (("Sin Cinturón", url_sin), ("Con Cinturón", url_con)):
+        videos.append(
+            f'<figure style="margin: 0 0 12px 0;"><figcaption>Animación: {titulo}</figcaption>'
+            f'<video class="stream-colision" data-stream="{html.escape(url, quote=True)}" controls muted autoplay '
+            f'playsinline loop style="width: 100%; max-width: {ancho}px;"></video></figure>'
+        )
+    return '<div class="streams-colision">' + ''.join(videos) + '</div>'
+
+def integridad_sri(contenido):
+    """
+    Calcula la huella de Subresource Integrity de un archivo
+
+    Args:
+        contenido (bytes): Contenido del archivo
+
+    Returns:
+        str: Valor del atributo integrity ("sha384-...")
+    """
+    return "sha384-" + base64.b64encode(hashlib.sha384(contenido).digest()).decode('ascii')
+
+def hls_verificado(ruta=None):
+    """
+    Indica si la copia local de hls.js coincide con HASH_HLS
+
+    Args:
+        ruta (str, optional): Archivo (por defecto, RUTA_HLS)
+
+    Returns:
+        bool: False si no hay huella fijada, falta el archivo o no coincide
+    """
+    ruta = ruta or RUTA_HLS
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        return False
+    return bool(HASH_HLS) and _integridad_archivo(ruta, estado.st_mtime_ns, estado.st_size) == HASH_HLS
+
+@functools.lru_cache(maxsize=4)
+def _integridad_archivo(ruta, mtime_ns, tamano):
+    # La fecha y el tamaño forman parte de la clave: un archivo sustituido se vuelve a comprobar
+    with open(ruta, 'rb') as archivo:
+        return integridad_sri(archivo.read())
+
+def descargar_hls(ruta=None, integridad_esperada=HASH_HLS):
+    """
+    Descarga la versión fijada de hls.js para servirla desde la aplicación
+
+    El archivo se escribe en un temporal y se renombra al final, así que el
+    servidor nunca sirve una copia a medias.
+
+    Args:
+        ruta (str, optional): Archivo de salida (por defecto, RUTA_HLS)
+        integridad_esperada (str, optional): Huella SRI que debe tener la
+            descarga (por defecto, HASH_HLS); None la acepta sin comprobar,
+            solo para fijar una versión nueva
+
+    Returns:
+        str: Huella SRI de la copia descargada
+
+    Raises:
+        ValueError: Si la descarga no parece hls.js, no hay huella fijada o no coincide
+    """
+    ruta = ruta or RUTA_HLS
+    if integridad_esperada == "":
+        raise ValueError("HASH_HLS no está fijada: descarga con --fijar, comprueba la copia y fija su huella")
+    with urllib.request.urlopen(URL_DESCARGA_HLS, timeout=30) as respuesta:
+        contenido = respuesta.read()
+    if VERSION_HLS.encode('ascii') not in contenido:
+        raise ValueError(f"La descarga no contiene hls.js {VERSION_HLS}")
+    integridad = integridad_sri(contenido)
+    if integridad_esperada is not None and integridad != integridad_esperada:
+        raise ValueError(f"La huella de la descarga ({integridad}) no coincide con HASH_HLS ({integridad_esperada})")
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, 'wb') as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+    return integridad
+
+def main():
+    """
+    Descarga hls.js desde la línea de comandos
+
+    Returns:
+        int: Código de salida
+    """
+    parser = argparse.ArgumentParser(description=f"Descarga hls.js {VERSION_HLS} para servirlo desde la aplicación")
+    parser.add_argument('--salida', default=RUTA_HLS, help="Archivo de salida")
+    parser.add_argument('--fijar', action='store_true',
+                        help="Descargar sin comprobar contra HASH_HLS y mostrar la huella que hay que fijar")
+    args = parser.parse_args()
+    try:
+        integridad = descargar_hls(args.salida, None if args.fijar else HASH_HLS)
+    except (OSError, ValueError) as e:
+        print(f"❌ Error al descargar hls.js: {e}")
+        return 1
+    print(f"✅ hls.js {VERSION_HLS} → {args.salida} ({integridad})")
+    if args.fijar:
+        print(f'   Comprueba la copia y fija en reproductor_web.py: HASH_HLS = "{integridad}"')
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
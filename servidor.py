@@ -0,0 +1,210 @@
+# servidor.py
+# =============================================================================
+# SERVIDOR.PY - MÓDULO DEL SERVIDOR WEB
+# =============================================================================
+# Este módulo monta la interfaz de Gradio sobre una aplicación FastAPI, añade
+# las rutas de disponibilidad y de métricas y la API JSON de cálculos, y
+# precalienta en segundo plano matplotlib y el primer renderizado, para que el
+# servidor responda cuanto antes tras arrancar
+
+import logging
+import threading
+import time
+from contextlib import asynccontextmanager
+import gradio as gr
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, PlainTextResponse
+from metricas import eventos_interfaz, formatear_prometheus
+from api_calculos import router as router_api
+
+# Señal de disponibilidad: se activa cuando termina el precalentamiento
+listo = threading.Event()
+_estado_calentamiento = {'inicio': None, 'fin': None, 'error': None, 'error_tabla': None}
+_hilo_calentamiento = None
+_aviso_colas_emitido = False
+logger = logging.getLogger(__name__)
+
+def calentar():
+    """
+    Abre la tabla precalculada del modo realista (construyéndola si falta),
+    carga matplotlib (y su caché de fuentes), el módulo de animación y hace un
+    renderizado completo fuera de pantalla con los valores por defecto de la
+    interfaz, que además queda guardado en la caché de simulaciones.
+
+    Un fallo con la tabla se anota en 'error_tabla' y no interrumpe el resto.
+    """
+    _estado_calentamiento['inicio'] = time.time()
+    try:
+        from tabla_realista import abrir_tabla
+        abrir_tabla(construir_si_falta=True)
+    except Exception as e:
+        # Sin tabla el modo realista se calcula en vivo; el resto del precalentamiento sigue
+        _estado_calentamiento['error_tabla'] = str(e)
+    try:
+        import graficos
+        import animacion
+        from calculos_fisica import simular_colision_en_cache
+        simular_colision_en_cache(70, 50, False, 0.5, 0.1)
+    except Exception as e:
+        # Un fallo al precalentar no impide servir: el primer usuario pagará la carga
+        _estado_calentamiento['error'] = str(e)
+    finally:
+        _estado_calentamiento['fin'] = time.time()
+        listo.set()
+
+def iniciar_calentamiento():
+    """
+    Lanza el precalentamiento en un hilo en segundo plano (solo la primera vez)
+
+    Returns:
+        threading.Thread: Hilo de precalentamiento
+    """
+    global _hilo_calentamiento
+    if _hilo_calentamiento is None:
+        _hilo_calentamiento = threading.Thread(target=calentar, name='calentamiento', daemon=True)
+        _hilo_calentamiento.start()
+    return _hilo_calentamiento
+
+def estado_disponibilidad():
+    """
+    Devuelve el estado del precalentamiento
+
+    Returns:
+        dict: Si el servidor está listo, duración del precalentamiento y errores
+            (si los hubo) del precalentamiento y de la tabla del modo realista
+    """
+    inicio, fin = _estado_calentamiento['inicio'], _estado_calentamiento['fin']
+    return {
+        'listo': listo.is_set(),
+        'segundos_calentamiento': (fin - inicio) if inicio is not None and fin is not None else None,
+        'error': _estado_calentamiento['error'],
+        'error_tabla': _estado_calentamiento['error_tabla']
+    }
+
+def estadisticas_colas(demo):
+    """
+    Devuelve el estado de las colas de Gradio por grupo de concurrencia
+
+    Los eventos en curso y atendidos se cuentan en los propios manejadores
+    (metricas.eventos_interfaz). Los que esperan solo los conoce la cola interna
+    de Gradio, que no es pública: si falta, se anota una vez en el log y
+    'disponible' queda en False.
+
+    Args:
+        demo (gr.Blocks): Interfaz de Gradio
+
+    Returns:
+        dict: 'disponible' (si se pudo leer la cola interna) y 'grupos' con, por
+            grupo, eventos esperando (None si no se conocen), en curso,
+            atendidos y límite de concurrencia
+    """
+    global _aviso_colas_emitido
+    grupos = eventos_interfaz.estadisticas()
+    colas = getattr(getattr(demo, '_queue', None), 'event_queue_per_concurrency_id', None)
+    try:
+        esperando = {grupo: len(colas[grupo].queue) if grupo in colas else 0 for grupo in grupos}
+        disponible = True
+    except (AttributeError, TypeError):
+        esperando, disponible = {}, False
+        if not _aviso_colas_emitido:
+            _aviso_colas_emitido = True
+            logger.warning("No se pudo leer la cola interna de Gradio: simulador_cola_esperando no se exporta")
+    for grupo, estado in grupos.items():
+        estado['esperando'] = esperando.get(grupo)
+    return {'disponible': disponible, 'grupos': grupos}
+
+def recolectar_metricas(demo):
+    """
+    Reúne los histogramas de etapas, la caché de simulaciones, las figuras vivas,
+    las colas, los trabajos de animación y el precalentamiento en formato de
+    texto de Prometheus
+
+    Args:
+        demo (gr.Blocks): Interfaz de Gradio
+
+    Returns:
+        str: Métricas en formato de texto de Prometheus
+    """
+    from calculos_fisica import cache_simulaciones
+    from cola_animaciones import cola_animaciones
+    from registro_figuras import registro_figuras
+    cache = cache_simulaciones.estadisticas()
+    figuras = registro_figuras.estadisticas()
+    trabajos = cola_animaciones.estadisticas()
+    colas = estadisticas_colas(demo)
+    grupos = colas['grupos']
+    metricas = [
+        ('simulador_cache_entradas', 'gauge', "Entradas en la caché de simulaciones", [({}, cache['entradas'])]),
+        ('simulador_cache_bytes', 'gauge', "Bytes ocupados por la caché de simulaciones", [({}, cache['bytes'])]),
+        ('simulador_cache_aciertos_total', 'counter', "Aciertos de la caché de simulaciones", [({}, cache['aciertos'])]),
+        ('simulador_cache_fallos_total', 'counter', "Fallos de la caché de simulaciones", [({}, cache['fallos'])]),
+        ('simulador_cache_descartes_total', 'counter', "Entradas descartadas por la caché de simulaciones", [({}, cache['descartes'])]),
+        ('simulador_cola_esperando', 'gauge', "Eventos esperando en la cola de Gradio",
+         [({'grupo': grupo}, cola['esperando']) for grupo, cola in grupos.items() if cola['esperando'] is not None]),
+        ('simulador_cola_estadisticas_disponibles', 'gauge', "1 si se pudo leer la cola interna de Gradio (eventos esperando)",
+         [({}, int(colas['disponible']))]),
+        ('simulador_cola_en_curso', 'gauge', "Eventos en ejecución en cada grupo de concurrencia",
+         [({'grupo': grupo}, cola['en_curso']) for grupo, cola in grupos.items()]),
+        ('simulador_cola_atendidos_total', 'counter', "Eventos atendidos en cada grupo de concurrencia",
+         [({'grupo': grupo}, cola['atendidos']) for grupo, cola in grupos.items()]),
+        ('simulador_cola_limite', 'gauge', "Límite de concurrencia de cada grupo de la cola",
+         [({'grupo': grupo}, cola['limite']) for grupo, cola in grupos.items() if cola['limite'] is not None]),
+        ('simulador_figuras_vivas', 'gauge', "Figuras de matplotlib vivas en el proceso", [({}, figuras['vivas'])]),
+        ('simulador_figuras_bytes', 'gauge', "Bytes de los búferes de píxeles de las figuras vivas", [({}, figuras['bytes'])]),
+        ('simulador_figuras_plantillas_libres', 'gauge', "Figuras plantilla libres para reutilizar", [({}, figuras['plantillas_libres'])]),
+        ('simulador_figuras_creadas_total', 'counter', "Figuras creadas", [({}, figuras['creadas'])]),
+        ('simulador_figuras_cerradas_total', 'counter', "Figuras cerradas tras renderizarlas", [({}, figuras['cerradas'])]),
+        ('simulador_figuras_expulsadas_total', 'counter', "Plantillas libres cerradas por superar el límite de figuras vivas", [({}, figuras['expulsadas'])]),
+        ('simulador_figuras_limite_superado_total', 'counter', "Registros de figuras por encima del límite con todas en uso", [({}, figuras['limite_superado'])]),
+        ('simulador_figuras_recicladas_total', 'counter', "Plantillas devueltas para reutilizarlas", [({}, figuras['recicladas'])]),
+        ('simulador_animaciones_en_cola', 'gauge', "Trabajos de animación esperando en la cola", [({}, trabajos['en_cola'])]),
+        ('simulador_animaciones_en_curso', 'gauge', "Trabajos de animación en ejecución", [({}, trabajos['en_curso'])]),
+        ('simulador_animaciones_limite', 'gauge', "Trabajos de animación admitidos a la vez", [({}, trabajos['max_trabajos'])]),
+        ('simulador_animaciones_trabajos_total', 'counter', "Trabajos de animación terminados, por estado",
+         [({'estado': estado}, trabajos[clave]) for estado, clave in
+          (('completado', 'completados'), ('cancelado', 'cancelados'), ('error', 'errores'))]),
+        ('simulador_animaciones_rechazadas_total', 'counter', "Trabajos de animación rechazados con la cola llena",
+         [({}, trabajos['rechazados'])]),
+        ('simulador_animaciones_bajo_carga_total', 'counter', "Trabajos de animación bajados a vista previa por la carga de la cola",
+         [({}, trabajos['bajo_carga'])]),
+        ('simulador_listo', 'gauge', "1 si el precalentamiento terminó", [({}, int(listo.is_set()))])
+    ]
+    return formatear_prometheus(metricas=metricas)
+
+def crear_aplicacion(demo):
+    """
+    Crea la aplicación FastAPI con la interfaz de Gradio montada en la raíz y
+    la API JSON de cálculos en /api.
+    El precalentamiento se lanza al arrancar el servidor.
+
+    Args:
+        demo (gr.Blocks): Interfaz de Gradio ya construida
+
+    Returns:
+        FastAPI: Aplicación lista para servir con uvicorn
+    """
+    @asynccontextmanager
+    async def ciclo_de_vida(app):
+        # El precalentamiento arranca con el servidor (uvicorn directo o gunicorn)
+        iniciar_calentamiento()
+        yield
+
+    app = FastAPI(title="Simulador de Colisión Vehicular", lifespan=ciclo_de_vida)
+
+    @app.get("/salud/vivo")
+    def vivo():
+        return {'vivo': True}
+
+    @app.get("/salud/listo")
+    def disponible():
+        estado = estado_disponibilidad()
+        return JSONResponse(estado, status_code=200 if estado['listo'] else 503)
+
+    # API JSON de cálculos (antes del montaje de Gradio, que ocupa la raíz)
+    app.include_router(router_api)
+
+    @app.get("/metricas")
+    def metricas():
+        return PlainTextResponse(recolectar_metricas(demo), media_type="text/plain; version=0.0.4")
+
+    return gr.mount_gradio_app(app, demo, path="/")
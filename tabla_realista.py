@@ -0,0 +1,270 @@
+# tabla_realista.py
+# =============================================================================
+# TABLA_REALISTA.PY - TABLA PRECALCULADA DEL MODO REALISTA
+# =============================================================================
+# En modo realista las entradas de la interfaz son discretas: 131 masas × 39
+# velocidades. Este módulo precalcula la física de todas ellas (ambos casos de
+# cinturón y el nivel de riesgo) en una tabla float32 guardada como .npy, que
+# se abre con memoria mapeada: los procesos del servidor comparten sus páginas
+# a través de la caché de páginas del sistema y cada consulta es un acceso
+# directo por índice. Las entradas fuera de la grilla y el modo manual se
+# siguen calculando en vivo.
+#
+# Precisión: los valores de la tabla son float32 (~7 cifras significativas,
+# error relativo ≤ 6e-8), suficiente para la interfaz. La API JSON
+# (POST /api/simulacion y /api/simulacion/lote) devuelve siempre los números
+# calculados en vivo en float64 y solo toma de aquí el nivel de riesgo.
+#
+# Junto a la tabla se guarda su versión (RUTA.version): un hash de la grilla,
+# los campos, los umbrales de riesgo y el código de las fórmulas. Si no
+# coincide con la del código actual, la tabla se reconstruye.
+#
+# Uso (paso de construcción; el servidor también la construye al precalentar si falta):
+#   python tabla_realista.py
+#   python tabla_realista.py --salida /ruta/tabla_realista.npy
+
+import argparse
+import hashlib
+import inspect
+import os
+import sys
+import threading
+import time
+import numpy as np
+
+# Grilla de los sliders de la interfaz (extremos incluidos)
+MASA_MIN_KG, MASA_MAX_KG, PASO_MASA_KG = 20, 150, 1
+VELOCIDAD_MIN_KMH, VELOCIDAD_MAX_KMH, PASO_VELOCIDAD_KMH = 10, 200, 5
+NUM_MASAS = (MASA_MAX_KG - MASA_MIN_KG) // PASO_MASA_KG + 1
+NUM_VELOCIDADES = (VELOCIDAD_MAX_KMH - VELOCIDAD_MIN_KMH) // PASO_VELOCIDAD_KMH + 1
+
+# Magnitudes de cada escenario (último eje: los campos de una consulta quedan contiguos)
+CAMPOS_TABLA = ('tiempo_sin', 'aceleracion_sin', 'fuerza_sin', 'g_force_sin', 'nivel_riesgo_sin',
+                'tiempo_con', 'aceleracion_con', 'fuerza_con', 'g_force_con', 'nivel_riesgo_con')
+# Código guardado en los campos nivel_riesgo_*; mismos nombres que determinar_nivel_riesgo_lote
+NIVELES_RIESGO = ('MODERADO', 'ALTO', 'CRÍTICO')
+# float32: ~7 cifras significativas, de sobra para lo que se muestra (ver cabecera)
+DTYPE_TABLA = np.float32
+# Tolerancia relativa al comprobar la tabla contra el cálculo en vivo
+TOLERANCIA_TABLA = 1e-6
+
+RUTA_TABLA_REALISTA = os.environ.get(
+    "RUTA_TABLA_REALISTA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tabla_realista.npy")
+)
+
+_tabla = None
+_tabla_abierta = False
+_lock_tabla = threading.Lock()
+
+def calcular_fila(masa_cuerpo, velocidad_kmh):
+    """
+    Calcula en vivo los campos de la tabla de un escenario
+
+    Args:
+        masa_cuerpo (float): Masa en kg
+        velocidad_kmh (float): Velocidad en km/h
+
+    Returns:
+        list: Valores de CAMPOS_TABLA (los niveles, como índice de NIVELES_RIESGO)
+    """
+    # Importación diferida: calculos_fisica importa este módulo
+    from calculos_fisica import calcular_parametros_fisica, calcular_tiempo_detencion_realista
+    from textos import determinar_nivel_riesgo
+    velocidad_ms = float(velocidad_kmh) * 1000 / 3600
+    fila = []
+    for tipo_impacto in ("sin_cinturon", "con_cinturon"):
+        parametros = calcular_parametros_fisica(
+            masa_cuerpo, velocidad_ms, calcular_tiempo_detencion_realista(velocidad_ms, tipo_impacto)
+        )
+        nivel = determinar_nivel_riesgo(parametros['g_force']).split()[-1]
+        fila += [parametros['tiempo'], parametros['aceleracion'], parametros['fuerza'], parametros['g_force'],
+                 NIVELES_RIESGO.index(nivel)]
+    return fila
+
+def version_tabla():
+    """
+    Calcula la versión de la tabla que corresponde al código actual
+
+    Returns:
+        str: Hash de la grilla, los campos, el tipo, los umbrales de riesgo y
+            el código de las funciones que calculan cada fila
+    """
+    from calculos_fisica import calcular_parametros_fisica, calcular_tiempo_detencion_realista
+    from textos import UMBRAL_G_ALTO, UMBRAL_G_CRITICO, determinar_nivel_riesgo
+    huella = hashlib.sha256(repr((
+        MASA_MIN_KG, MASA_MAX_KG, PASO_MASA_KG, VELOCIDAD_MIN_KMH, VELOCIDAD_MAX_KMH, PASO_VELOCIDAD_KMH,
+        CAMPOS_TABLA, NIVELES_RIESGO, np.dtype(DTYPE_TABLA).str, UMBRAL_G_ALTO, UMBRAL_G_CRITICO
+    )).encode('utf-8'))
+    for funcion in (calcular_fila, calcular_tiempo_detencion_realista, calcular_parametros_fisica, determinar_nivel_riesgo):
+        try:
+            codigo = inspect.getsource(funcion).encode('utf-8')
+        except (OSError, TypeError):
+            # Sin el código fuente (por ejemplo, solo .pyc): el bytecode y sus constantes
+            codigo = funcion.__code__.co_code + repr(funcion.__code__.co_consts[1:]).encode('utf-8')
+        huella.update(codigo)
+    return huella.hexdigest()[:32]
+
+def _ruta_version(ruta):
+    return f"{ruta}.version"
+
+def _escribir_atomico(ruta, escribir):
+    # Escribe en un temporal y lo renombra: quien lo abra a la vez nunca ve un archivo a medias
+    os.makedirs(os.path.dirname(os.path.abspath(ruta)), exist_ok=True)
+    temporal = f"{ruta}.{os.getpid()}.tmp"
+    try:
+        with open(temporal, 'wb') as archivo:
+            escribir(archivo)
+        os.replace(temporal, ruta)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+def construir_tabla(ruta=None):
+    """
+    Precalcula todos los escenarios de la grilla y guarda la tabla
+
+    La tabla se escribe en un archivo temporal y se renombra al final, así
+    que los procesos que la abren a la vez nunca ven un archivo a medias.
+    Después se escribe su versión (ver version_tabla).
+
+    Args:
+        ruta (str, optional): Archivo .npy de salida (por defecto, RUTA_TABLA_REALISTA)
+
+    Returns:
+        np.ndarray: Tabla de forma (NUM_MASAS, NUM_VELOCIDADES, len(CAMPOS_TABLA))
+    """
+    ruta = ruta or RUTA_TABLA_REALISTA
+    tabla = np.empty((NUM_MASAS, NUM_VELOCIDADES, len(CAMPOS_TABLA)), dtype=DTYPE_TABLA)
+    for i in range(NUM_MASAS):
+        for j in range(NUM_VELOCIDADES):
+            tabla[i, j] = calcular_fila(MASA_MIN_KG + i * PASO_MASA_KG, VELOCIDAD_MIN_KMH + j * PASO_VELOCIDAD_KMH)
+    _escribir_atomico(ruta, lambda archivo: np.save(archivo, tabla))
+    version = version_tabla().encode('ascii')
+    _escribir_atomico(_ruta_version(ruta), lambda archivo: archivo.write(version))
+    return tabla
+
+def tabla_vigente(tabla, ruta=None):
+    """
+    Comprueba que una tabla corresponde a la grilla y a las fórmulas actuales
+
+    La versión guardada junto a la tabla debe coincidir con version_tabla():
+    una tabla construida con fórmulas o umbrales anteriores no se usa. Además
+    se comparan las esquinas de la grilla con el cálculo en vivo.
+
+    Args:
+        tabla (np.ndarray): Tabla abierta
+        ruta (str, optional): Archivo de la tabla (por defecto, RUTA_TABLA_REALISTA)
+
+    Returns:
+        bool: True si se puede usar
+    """
+    if tabla.dtype != DTYPE_TABLA or tabla.shape != (NUM_MASAS, NUM_VELOCIDADES, len(CAMPOS_TABLA)):
+        return False
+    try:
+        with open(_ruta_version(ruta or RUTA_TABLA_REALISTA), 'rb') as archivo:
+            version = archivo.read().decode('ascii', 'replace').strip()
+    except OSError:
+        return False
+    if version != version_tabla():
+        return False
+    for i, j in ((0, 0), (0, NUM_VELOCIDADES - 1), (NUM_MASAS - 1, 0), (NUM_MASAS - 1, NUM_VELOCIDADES - 1)):
+        esperado = calcular_fila(MASA_MIN_KG + i * PASO_MASA_KG, VELOCIDAD_MIN_KMH + j * PASO_VELOCIDAD_KMH)
+        if not np.allclose(tabla[i, j], esperado, rtol=TOLERANCIA_TABLA, atol=0):
+            return False
+    return True
+
+def abrir_tabla(construir_si_falta=False):
+    """
+    Abre la tabla con memoria mapeada (solo la primera vez en cada proceso)
+
+    Args:
+        construir_si_falta (bool): Si construirla cuando no existe o no está vigente
+
+    Returns:
+        np.ndarray: Tabla de solo lectura, o None si no hay tabla utilizable
+    """
+    global _tabla, _tabla_abierta
+    if _tabla_abierta and (_tabla is not None or not construir_si_falta):
+        return _tabla
+    with _lock_tabla:
+        if _tabla_abierta and (_tabla is not None or not construir_si_falta):
+            return _tabla
+        tabla = None
+        try:
+            tabla = np.load(RUTA_TABLA_REALISTA, mmap_mode='r')
+            if not tabla_vigente(tabla):
+                tabla = None
+        except (OSError, ValueError):
+            tabla = None
+        if tabla is None and construir_si_falta:
+            construir_tabla()
+            tabla = np.load(RUTA_TABLA_REALISTA, mmap_mode='r')
+        # Vista ndarray de la misma memoria mapeada: indexar un np.memmap cuesta ~6 veces más
+        _tabla = tabla.view(np.ndarray) if tabla is not None else None
+        _tabla_abierta = True
+    return _tabla
+
+def _indice(valor, minimo, paso, cantidad):
+    # Índice de la grilla, o None si el valor no cae exactamente en un punto
+    if isinstance(valor, bool) or not isinstance(valor, (int, float)):
+        return None
+    posicion = (valor - minimo) / paso
+    indice = round(posicion)
+    if abs(posicion - indice) > 1e-9 or not 0 <= indice < cantidad:
+        return None
+    return indice
+
+def buscar_realista(masa_cuerpo, velocidad_kmh):
+    """
+    Devuelve la física precalculada de un escenario en modo realista
+
+    Args:
+        masa_cuerpo (float): Masa en kg
+        velocidad_kmh (float): Velocidad en km/h
+
+    Returns:
+        dict: 'tiempo_sin_cinturon', 'tiempo_con_cinturon', 'parametros_sin' y
+            'parametros_con' (como calcular_parametros_fisica) y
+            'nivel_riesgo_sin' y 'nivel_riesgo_con'; None si el escenario está
+            fuera de la grilla o no hay tabla
+    """
+    i = _indice(masa_cuerpo, MASA_MIN_KG, PASO_MASA_KG, NUM_MASAS)
+    j = _indice(velocidad_kmh, VELOCIDAD_MIN_KMH, PASO_VELOCIDAD_KMH, NUM_VELOCIDADES)
+    if i is None or j is None:
+        return None
+    tabla = abrir_tabla()
+    if tabla is None:
+        return None
+    (tiempo_sin, aceleracion_sin, fuerza_sin, g_force_sin, nivel_sin,
+     tiempo_con, aceleracion_con, fuerza_con, g_force_con, nivel_con) = tabla[i, j].tolist()
+    return {
+        'tiempo_sin_cinturon': tiempo_sin,
+        'tiempo_con_cinturon': tiempo_con,
+        'parametros_sin': {'aceleracion': aceleracion_sin, 'fuerza': fuerza_sin, 'g_force': g_force_sin, 'tiempo': tiempo_sin},
+        'parametros_con': {'aceleracion': aceleracion_con, 'fuerza': fuerza_con, 'g_force': g_force_con, 'tiempo': tiempo_con},
+        'nivel_riesgo_sin': NIVELES_RIESGO[int(nivel_sin)],
+        'nivel_riesgo_con': NIVELES_RIESGO[int(nivel_con)]
+    }
+
+def main():
+    """
+    Construye la tabla desde la línea de comandos
+
+    Returns:
+        int: Código de salida
+    """
+    parser = argparse.ArgumentParser(description="Precalcula la tabla del modo realista")
+    parser.add_argument('--salida', default=RUTA_TABLA_REALISTA, help="Archivo .npy de salida")
+    args = parser.parse_args()
+    inicio = time.perf_counter()
+    try:
+        tabla = construir_tabla(args.salida)
+    except OSError as e:
+        print(f"❌ Error al guardar la tabla: {e}")
+        return 1
+    print(f"✅ Tabla realista: {NUM_MASAS} masas × {NUM_VELOCIDADES} velocidades, "
+          f"{tabla.nbytes / 1024:.0f} KB en {(time.perf_counter() - inicio) * 1000:.0f} ms → {args.salida}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
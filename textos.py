@@ -3,6 +3,8 @@
 # =============================================================================
 # Este módulo contiene todas las funciones para generar análisis textuales
 
+from perfil_pulso import perfiles_simulacion
+
 def generar_explicacion_modo_calculo(datos):
     """
     Genera la explicación específica según el modo de cálculo utilizado
@@ -75,6 +77,10 @@ def calcular_factores_comparacion(datos):
         'reduccion_g_pct': ((abs(p_sin['g_force']) - abs(p_con['g_force'])) / abs(p_sin['g_force'])) * 100
     }
 
+# Umbrales de fuerza G de los niveles de riesgo
+UMBRAL_G_CRITICO = 50
+UMBRAL_G_ALTO = 20
+
 def determinar_nivel_riesgo(g_force):
     """
     Determina el nivel de riesgo basado en las fuerzas G
@@ -85,9 +91,9 @@ def determinar_nivel_riesgo(g_force):
     Returns:
         str: Nivel de riesgo con emoji
     """
-    if abs(g_force) > 50:
+    if abs(g_force) > UMBRAL_G_CRITICO:
         return '🔴 CRÍTICO'
-    elif abs(g_force) > 20:
+    elif abs(g_force) > UMBRAL_G_ALTO:
         return '🟡 ALTO'
     else:
         return '🟢 MODERADO'
@@ -102,23 +108,22 @@ def generar_seccion_resultados(datos):
     Returns:
         str: Texto con los resultados formateados
     """
-    p_sin = datos['parametros_sin']
-    p_con = datos['parametros_con']
-    t_sin = datos['tiempo_sin_cinturon']
-    t_con = datos['tiempo_con_cinturon']
+    perfil_sin, perfil_con = perfiles_simulacion(datos)
     
     return f"""
 #### 🔴 **SIN Cinturón de Seguridad:**
-- ⏱️ Tiempo de detención: **{t_sin:.3f} segundos**
-- 💥 Fuerza de impacto: **{abs(p_sin['fuerza']):,.0f} Newtons**
-- 📈 Aceleración: **{abs(p_sin['aceleracion']):.1f} m/s²**
-- 🌍 **Fuerzas G:** **{abs(p_sin['g_force']):.1f} G**
+- ⏱️ Tiempo de detención: **{perfil_sin.tiempo_detencion:.3f} segundos**
+- 💥 Fuerza de impacto: **{perfil_sin.valor('fuerza'):,.0f} Newtons**
+- 📈 Aceleración: **{perfil_sin.valor('aceleracion'):.1f} m/s²**
+- 🌍 **Fuerzas G:** **{perfil_sin.valor('g_force'):.1f} G**
+- 📏 Distancia de detención: **{perfil_sin.distancia_detencion:.2f} m**
 
 #### 🔵 **CON Cinturón de Seguridad:**
-- ⏱️ Tiempo de detención: **{t_con:.3f} segundos**
-- 💥 Fuerza de impacto: **{abs(p_con['fuerza']):,.0f} Newtons**  
-- 📈 Aceleración: **{abs(p_con['aceleracion']):.1f} m/s²**
-- 🌍 **Fuerzas G:** **{abs(p_con['g_force']):.1f} G**
+- ⏱️ Tiempo de detención: **{perfil_con.tiempo_detencion:.3f} segundos**
+- 💥 Fuerza de impacto: **{perfil_con.valor('fuerza'):,.0f} Newtons**  
+- 📈 Aceleración: **{perfil_con.valor('aceleracion'):.1f} m/s²**
+- 🌍 **Fuerzas G:** **{perfil_con.valor('g_force'):.1f} G**
+- 📏 Distancia de detención: **{perfil_con.distancia_detencion:.2f} m**
 """
 
 def generar_seccion_analisis_resultados(datos, factores):
@@ -140,12 +145,13 @@ def generar_seccion_analisis_resultados(datos, factores):
     factor_reduccion_aceleracion = factores['factor_reduccion_aceleracion']
     factor_reduccion_tiempo = factores['factor_reduccion_tiempo']
     reduccion_g_pct = factores['reduccion_g_pct']
+    impulso = perfiles_simulacion(datos)[0].impulso
     
     return f"""
 #### 🎯 **IV. Análisis de Resultados - Principio Físico Fundamental:**
 
 **📈 Interpretación de las Gráficas:**
-- **Área bajo la curva:** Ambas tienen la misma área (mismo impulso: m × Δv)
+- **Área bajo la curva:** Ambas tienen la misma área (mismo impulso: m × Δv = {impulso:,.0f} N·s)
 - **Altura del pico:** Sin cinturón es **{factor_reduccion_fuerza:.1f}x más alta**
 - **Duración:** Con cinturón dura **{factor_reduccion_tiempo:.1f}x más tiempo**
 
@@ -167,55 +173,201 @@ Al aumentar Δt de **{t_sin:.3f}s** a **{t_con:.3f}s**, automáticamente:
 El cinturón de seguridad salva vidas no por "sujetarte", sino por aumentar el tiempo de desaceleración, lo que reduce dramáticamente las fuerzas destructivas según las leyes fundamentales de la física.
 """
 
-def generar_analisis_completo(datos):
+def generar_seccion_respuesta_ocupante(datos):
     """
-    Genera el análisis completo combinando todas las secciones
+    Genera la sección del modelo temporal del cinturón (solo si se calculó)
     
     Args:
         datos (dict): Diccionario con todos los datos de la simulación
     
     Returns:
-        str: Texto completo del análisis
+        str: Texto con los picos del modelo, o cadena vacía
     """
-    velocidad_kmh = datos['velocidad_kmh']
-    velocidad_ms = datos['velocidad_ms']
-    masa_cuerpo = datos['masa_cuerpo']
-    modo_calculo = datos['modo_calculo']
-    p_sin = datos['parametros_sin']
-    p_con = datos['parametros_con']
+    respuesta = datos.get('respuesta_ocupante')
+    if respuesta is None:
+        return ""
+    r_sin, r_con = respuesta['sin'], respuesta['con']
     
-    factores = calcular_factores_comparacion(datos)
-    explicacion_modo = generar_explicacion_modo_calculo(datos)
-    resultados = generar_seccion_resultados(datos)
-    analisis_resultados = generar_seccion_analisis_resultados(datos, factores)
+    return f"""
+---
+
+#### 🧷 **Modelo Temporal del Cinturón (resorte-amortiguador):**
+| | Sin cinturón | Con cinturón |
+|---|---|---|
+| 💥 Fuerza pico | **{r_sin['fuerza_maxima']:,.0f} N** | **{r_con['fuerza_maxima']:,.0f} N** |
+| 🌍 Fuerzas G pico | **{r_sin['g_maxima']:.1f} G** | **{r_con['g_maxima']:.1f} G** |
+| ⏱️ Instante del pico | {r_sin['tiempo_pico']:.3f} s | {r_con['tiempo_pico']:.3f} s |
+| 🫁 Deflexión del tórax | {r_sin['deflexion_maxima_torax'] * 1000:.0f} mm | {r_con['deflexion_maxima_torax'] * 1000:.0f} mm |
+| ↔️ Desplazamiento hacia delante | {r_sin['desplazamiento_maximo'] * 100:.0f} cm | {r_con['desplazamiento_maximo'] * 100:.0f} cm |
+
+Las curvas de evolución temporal muestran este modelo: el vehículo frena con un pulso
+senoidal y el cuerpo queda retenido por la banda (con holgura y limitador de carga) o,
+sin cinturón, por el golpe contra el volante.
+"""
+
+def generar_seccion_condiciones(datos):
+    """
+    Genera el encabezado con las condiciones del impacto
     
+    Args:
+        datos (dict): Diccionario con todos los datos de la simulación
+    
+    Returns:
+        str: Texto con velocidad, masa y modo de cálculo
+    """
     return f"""
 ### 📊 Análisis de Simulación de Colisión
 
 **Condiciones del impacto:**
-- Velocidad inicial: **{velocidad_kmh} km/h** ({velocidad_ms:.1f} m/s)
-- Masa del cuerpo: **{masa_cuerpo} kg**
-- Modo de cálculo: **{modo_calculo.upper()}**
+- Velocidad inicial: **{datos['velocidad_kmh']} km/h** ({datos['velocidad_ms']:.1f} m/s)
+- Masa del cuerpo: **{datos['masa_cuerpo']} kg**
+- Modo de cálculo: **{datos['modo_calculo'].upper()}**
+"""
 
+def generar_seccion_resumen(datos, factores):
+    """
+    Genera el resumen cuantitativo final con los niveles de riesgo
+    
+    Args:
+        datos (dict): Diccionario con todos los datos de la simulación
+        factores (dict): Factores de comparación calculados
+    
+    Returns:
+        str: Texto con el resumen cuantitativo
+    """
+    p_sin = datos['parametros_sin']
+    p_con = datos['parametros_con']
+    
+    return f"""
+#### 🏆 **Resumen Cuantitativo:**
+- **Extensión del tiempo:** **{factores['factor_reduccion_tiempo']:.1f}x mayor**
+- **Reducción de fuerza:** **{factores['reduccion_fuerza_pct']:.1f}%**
+- **Reducción de aceleración:** **{factores['reduccion_aceleracion_pct']:.1f}%**
+- **Reducción de fuerzas G:** **{factores['reduccion_g_pct']:.1f}%**
+- **Nivel de riesgo sin cinturón:** {determinar_nivel_riesgo(p_sin['g_force'])}
+- **Nivel de riesgo con cinturón:** {determinar_nivel_riesgo(p_con['g_force'])}
+
+> **⚠️ Referencia médica:** Fuerzas G superiores a 50G son típicamente letales para humanos.
+"""
+
+def unir_secciones_analisis(condiciones, explicacion_modo, resultados, respuesta_ocupante, analisis_resultados, resumen):
+    """
+    Une las secciones ya generadas en el texto completo del análisis
+    
+    Args:
+        condiciones, explicacion_modo, resultados, respuesta_ocupante,
+        analisis_resultados, resumen (str): Secciones en orden de aparición
+    
+    Returns:
+        str: Texto completo del análisis
+    """
+    return f"""{condiciones}
 {explicacion_modo}
 
 ---
 
 {resultados}
-
+{respuesta_ocupante}
 ---
 
 {analisis_resultados}
 
 ---
+{resumen}"""
 
-#### 🏆 **Resumen Cuantitativo:**
-- **Extensión del tiempo:** **{factores['factor_reduccion_tiempo']:.1f}x mayor**
-- **Reducción de fuerza:** **{factores['reduccion_fuerza_pct']:.1f}%**
-- **Reducción de aceleración:** **{factores['reduccion_aceleracion_pct']:.1f}%**
-- **Reducción de fuerzas G:** **{factores['reduccion_g_pct']:.1f}%**
-- **Nivel de riesgo sin cinturón:** {determinar_nivel_riesgo(p_sin['g_force'])}
-- **Nivel de riesgo con cinturón:** {determinar_nivel_riesgo(p_con['g_force'])}
+def generar_analisis_completo(datos):
+    """
+    Genera el análisis completo combinando todas las secciones
+    
+    Args:
+        datos (dict): Diccionario con todos los datos de la simulación
+    
+    Returns:
+        str: Texto completo del análisis
+    """
+    factores = calcular_factores_comparacion(datos)
+    
+    return unir_secciones_analisis(
+        generar_seccion_condiciones(datos),
+        generar_explicacion_modo_calculo(datos),
+        generar_seccion_resultados(datos),
+        generar_seccion_respuesta_ocupante(datos),
+        generar_seccion_analisis_resultados(datos, factores),
+        generar_seccion_resumen(datos, factores)
+    )
 
-> **⚠️ Referencia médica:** Fuerzas G superiores a 50G son típicamente letales para humanos.
-"""
\ No newline at end of file
+def generar_resumen_vista_previa(datos):
+    """
+    Genera el resumen numérico breve que se muestra mientras se dibuja el gráfico
+    
+    Args:
+        datos (dict): Diccionario con todos los datos de la simulación
+    
+    Returns:
+        str: Texto con los resultados y los niveles de riesgo
+    """
+    p_sin = datos['parametros_sin']
+    p_con = datos['parametros_con']
+    
+    return f"""
+### ⚡ Vista previa: {datos['velocidad_kmh']} km/h, {datos['masa_cuerpo']} kg
+{generar_seccion_resultados(datos)}
+- **Nivel de riesgo:** sin cinturón {determinar_nivel_riesgo(p_sin['g_force'])} · con cinturón {determinar_nivel_riesgo(p_con['g_force'])}
+
+⏳ *Generando el gráfico y el análisis completos...*
+"""
+
+def generar_resumen_monte_carlo(resultado):
+    """
+    Genera el resumen de una simulación Monte Carlo
+    
+    Args:
+        resultado (dict): Salida de monte_carlo.ejecutar_monte_carlo
+    
+    Returns:
+        str: Texto con las estadísticas, los cuantiles y las probabilidades de riesgo
+    """
+    if resultado['validas'] == 0:
+        return "❌ Error: Ningún escenario muestreado es válido; revisa las distribuciones"
+    e = resultado['estadisticas']
+    c = resultado['cuantiles']
+    x = resultado['excedencias']
+    modo = "MANUAL (tiempos muestreados)" if resultado['distribuciones']['tiempo_sin_cinturon'] else "REALISTA"
+    
+    def fila_cuantiles(nombre, magnitud, formato):
+        valores = " | ".join(formato.format(c[magnitud][q]) for q in sorted(c[magnitud]))
+        return f"| {nombre} | {formato.format(e[magnitud]['media'])} ± {formato.format(e[magnitud]['desviacion'])} | {valores} |"
+    
+    def probabilidad(caso, umbral):
+        p = x[caso][umbral]
+        return f"**{p['probabilidad'] * 100:.2f}%** (± {p['error_estandar'] * 100:.2f})"
+    
+    encabezado_cuantiles = " | ".join(f"P{q * 100:g}" for q in sorted(c['g_sin']))
+    
+    return f"""
+### 🎲 Análisis Monte Carlo
+
+**Muestras:** {resultado['muestras']:,} ({resultado['validas']:,} válidas) en {resultado['segundos']:.2f} s · **Semilla:** `{resultado['semilla']}` · **Modo de cálculo:** {modo}
+
+**Población simulada:**
+- Masa del cuerpo: {e['masa_cuerpo']['media']:.1f} ± {e['masa_cuerpo']['desviacion']:.1f} kg (de {e['masa_cuerpo']['minimo']:.1f} a {e['masa_cuerpo']['maximo']:.1f})
+- Velocidad: {e['velocidad_kmh']['media']:.1f} ± {e['velocidad_kmh']['desviacion']:.1f} km/h (de {e['velocidad_kmh']['minimo']:.1f} a {e['velocidad_kmh']['maximo']:.1f})
+
+#### 📈 **Distribución de resultados (media ± desviación y percentiles):**
+| Magnitud | Media | {encabezado_cuantiles} |
+|---|---|{"---|" * len(c['g_sin'])}
+{fila_cuantiles("🌍 Fuerzas G sin cinturón", 'g_sin', "{:.1f}")}
+{fila_cuantiles("🌍 Fuerzas G con cinturón", 'g_con', "{:.1f}")}
+{fila_cuantiles("💥 Fuerza sin cinturón (N)", 'fuerza_sin', "{:,.0f}")}
+{fila_cuantiles("💥 Fuerza con cinturón (N)", 'fuerza_con', "{:,.0f}")}
+
+#### ⚠️ **Probabilidad de superar los umbrales de riesgo:**
+| | Sin cinturón | Con cinturón |
+|---|---|---|
+| 🟡 Más de {UMBRAL_G_ALTO}G (riesgo ALTO o mayor) | {probabilidad('sin', UMBRAL_G_ALTO)} | {probabilidad('con', UMBRAL_G_ALTO)} |
+| 🔴 Más de {UMBRAL_G_CRITICO}G (riesgo CRÍTICO) | {probabilidad('sin', UMBRAL_G_CRITICO)} | {probabilidad('con', UMBRAL_G_CRITICO)} |
+
+Los percentiles tienen un error relativo menor al 0,5% (bosquejo de cuantiles); el
+valor entre paréntesis es el error estándar de la probabilidad, en puntos porcentuales.
+Con la misma semilla y las mismas distribuciones se repiten exactamente las mismas muestras.
+"""